@@ -0,0 +1,165 @@
+"""KB storage benchmark: legacy plain-text layout vs compressed bodies + contentless FTS.
+
+Builds the same synthetic corpus in both layouts and reports on-disk size (after a WAL
+checkpoint), bulk insert time and search_kb latency. The legacy layout is the pre-compression
+schema (kb_docs.content TEXT, kb_fts storing its own copy).
+
+    python benchmarks/kb_storage_bench.py --sizes 10000 100000
+    python benchmarks/kb_storage_bench.py --quick
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT))
+
+LEGACY_SCHEMA = (
+    """
+    CREATE TABLE kb_docs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        source_url TEXT,
+        title TEXT,
+        content TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX idx_kb_url ON kb_docs(source_url)",
+    "CREATE VIRTUAL TABLE kb_fts USING fts5(topic, title, content, url, doc_id UNINDEXED)",
+)
+LEGACY_SEARCH = """
+    SELECT d.id, d.topic, d.title, d.source_url, d.content, d.created_at,
+           bm25(kb_fts, 2.0, 1.5, 1.0, 0.5, 0.0) AS score
+    FROM kb_fts JOIN kb_docs d ON d.id = kb_fts.doc_id
+    WHERE kb_fts MATCH ?
+    ORDER BY score
+    LIMIT ?
+"""
+
+
+def _vocab(n: int = 3000, seed: int = 7) -> List[str]:
+    rnd = random.Random(seed)
+    letters = "etaoinshrdlucmfwypvbgkqjxz"
+    weights = [12, 9, 8, 8, 7, 7, 6, 6, 6, 4, 4, 3, 3, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1]
+    return ["".join(rnd.choices(letters, weights, k=rnd.randint(2, 10))) for _ in range(n)]
+
+
+def _chunks(n: int, vocab: List[str], chars: int = 1100, seed: int = 11) -> List[str]:
+    # Zipf-ish word frequencies so compression and FTS posting lists look like real prose.
+    rnd = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    out = []
+    for _ in range(n):
+        words = rnd.choices(vocab, weights, k=chars // 6)
+        out.append(" ".join(w + ("." if k % 15 == 14 else "") for k, w in enumerate(words))[:chars])
+    return out
+
+
+def _size(con, path: Path) -> int:
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return sum(p.stat().st_size for p in path.parent.glob(path.name + "*"))
+
+
+def _latency(fn: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    fn(queries[0])
+    samples = []
+    for q in queries:
+        t = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - t) * 1000.0)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 3), "p95_ms": round(samples[int(0.95 * (len(samples) - 1))], 3)}
+
+
+def bench(n: int, scratch: Path, vocab: List[str], queries: List[str], limit: int) -> Dict[str, dict]:
+    import sqlite3
+
+    import thelocalai.db as db
+    from thelocalai.config import DB_PATH
+
+    chunks = _chunks(n, vocab)
+    rows = [("bench", f"https://bench.local/{i // 8}", f"doc {i // 8}", c) for i, c in enumerate(chunks)]
+    out: Dict[str, dict] = {}
+
+    legacy_path = scratch / f"legacy-{n}.db"
+    con = sqlite3.connect(legacy_path)
+    con.execute("PRAGMA journal_mode=WAL")
+    for stmt in LEGACY_SCHEMA:
+        con.execute(stmt)
+    started = time.perf_counter()
+    for topic, url, title, content in rows:
+        cur = con.execute(
+            "INSERT INTO kb_docs(topic,source_url,title,content,created_at) VALUES(?,?,?,?,'x')", (topic, url, title, content)
+        )
+        con.execute("INSERT INTO kb_fts(topic,title,content,url,doc_id) VALUES(?,?,?,?,?)", (topic, title, content, url, cur.lastrowid))
+    con.commit()
+    insert_s = time.perf_counter() - started
+    out["legacy"] = {
+        "bytes": _size(con, legacy_path),
+        "insert_s": round(insert_s, 2),
+        **_latency(lambda q: con.execute(LEGACY_SEARCH, (db.fts_query(q), limit)).fetchall(), queries),
+    }
+    con.close()
+
+    for p in DB_PATH.parent.glob(DB_PATH.name + "*"):
+        p.unlink()
+    con = db.db_connect()
+    started = time.perf_counter()
+    for i in range(0, len(rows), 8):
+        topic, url, title, _ = rows[i]
+        db.kb_add_doc(con, topic, url, title, "", chunks=[r[3] for r in rows[i : i + 8]], commit=False)
+    con.commit()
+    insert_s = time.perf_counter() - started
+    out["compressed"] = {
+        "bytes": _size(con, DB_PATH),
+        "insert_s": round(insert_s, 2),
+        **_latency(lambda q: db.search_kb(con, q, limit=limit), queries),
+    }
+    con.close()
+    return out
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="chunk counts")
+    p.add_argument("--quick", action="store_true", help="2k and 10k chunks")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--limit", type=int, default=20, help="top-k per search")
+    p.add_argument("--json", type=Path, help="write results here")
+    args = p.parse_args(argv)
+    sizes = [2_000, 10_000] if args.quick else args.sizes
+
+    scratch = tempfile.TemporaryDirectory(prefix="thelocalai-kbbench-")
+    # Must be set before thelocalai.config is imported.
+    os.environ["THELOCALAI_DATA_DIR"] = scratch.name
+    vocab = _vocab()
+    rnd = random.Random(3)
+    queries = [" ".join(rnd.choices(vocab[:600], k=3)) for _ in range(args.queries)]
+
+    results = {}
+    print(f"{'chunks':>8} {'layout':<11} {'size MB':>9} {'insert s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for n in sizes:
+        r = bench(n, Path(scratch.name), vocab, queries, args.limit)
+        results[str(n)] = r
+        for layout, m in r.items():
+            print(f"{n:>8} {layout:<11} {m['bytes'] / 1e6:>9.1f} {m['insert_s']:>9.2f} {m['p50_ms']:>8.2f} {m['p95_ms']:>8.2f}")
+        print(f"{'':>8} size ratio {r['compressed']['bytes'] / r['legacy']['bytes']:.2f}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    scratch.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
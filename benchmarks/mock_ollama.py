@@ -0,0 +1,246 @@
+"""Offline stand-in for the parts of the Ollama HTTP API TheLocalAI uses.
+
+Serves /api/tags, /api/show, /api/generate (streaming and non-streaming),
+/api/embeddings, plus the saved HTML pages in benchmarks/fixtures under /pages/.
+Latency and token rate are configurable so benchmarks are repeatable without a GPU.
+
+    python benchmarks/mock_ollama.py --port 11555 --load-ms 0 --prompt-tps 2000 --eval-tps 40
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+MODELS = {
+    "gemma3:4b": {"parameter_size": "4.3B", "quantization_level": "Q4_K_M", "family": "gemma3", "context_length": 131072},
+    "qwen2.5:0.5b": {"parameter_size": "494.03M", "quantization_level": "Q4_K_M", "family": "qwen2", "context_length": 32768},
+    "nomic-embed-text": {"parameter_size": "137M", "quantization_level": "F16", "family": "nomic-bert", "context_length": 2048},
+}
+# Relative speed: the configured token rates apply to a 4B model; smaller models run faster.
+MODEL_SPEED = {"gemma3:4b": 1.0, "qwen2.5:0.5b": 6.0, "nomic-embed-text": 10.0}
+
+# Fixed replies for the router's classification and rewrite prompts (matched by substring).
+CANNED_REPLIES = {
+    "Reply with exactly one word": "SHORT",
+    "Reply with the query only": "sourdough bulk fermentation time",
+}
+
+
+@dataclass
+class MockConfig:
+    load_ms: float = 0.0  # one-off cold load per model
+    base_latency_ms: float = 5.0  # added to every request
+    prompt_tps: float = 2000.0  # prompt-eval tokens per second
+    eval_tps: float = 40.0  # generated tokens per second
+    reply_tokens: int = 48
+    embed_dim: int = 64
+    parallel: int = 1  # like OLLAMA_NUM_PARALLEL: concurrent generations, the rest queue
+    loaded: set = field(default_factory=set)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _embedding(text: str, dim: int) -> list[float]:
+    vec = [0.0] * dim
+    for word in text.lower().split():
+        h = int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16)
+        vec[h % dim] += 1.0 if (h >> 8) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    server: "MockOllamaServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, status: int, obj: dict) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}") if n else {}
+
+    def do_GET(self):
+        cfg = self.server.cfg
+        if self.path == "/api/tags":
+            models = [
+                {
+                    "name": name,
+                    "digest": hashlib.sha256(name.encode()).hexdigest(),
+                    "size": 1_000_000,
+                    "details": {k: v for k, v in meta.items() if k != "context_length"},
+                }
+                for name, meta in MODELS.items()
+            ]
+            self._json(200, {"models": models})
+            return
+        if self.path.startswith("/pages/"):
+            name = self.path[len("/pages/") :].split("?")[0]
+            page = FIXTURES / name
+            if "/" in name or not page.is_file():
+                self._json(404, {"error": "no such fixture"})
+                return
+            time.sleep(cfg.base_latency_ms / 1000.0)
+            body = page.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        cfg = self.server.cfg
+        req = self._body()
+        model = req.get("model") or req.get("name") or ""
+        if self.path == "/api/show":
+            meta = MODELS.get(model)
+            if not meta:
+                self._json(404, {"error": f"model '{model}' not found"})
+                return
+            family = meta["family"]
+            self._json(200, {"details": meta, "model_info": {f"{family}.context_length": meta["context_length"]}})
+            return
+        if self.path == "/api/embeddings":
+            time.sleep(cfg.base_latency_ms / 1000.0)
+            self._json(200, {"embedding": _embedding(req.get("prompt", ""), cfg.embed_dim)})
+            return
+        if self.path == "/api/generate":
+            if model not in MODELS:
+                self._json(404, {"error": f"model '{model}' not found"})
+                return
+            with self.server.slots:
+                self._generate(req, model)
+            return
+        self._json(404, {"error": "not found"})
+
+    def _generate(self, req: dict, model: str) -> None:
+        cfg = self.server.cfg
+        load_ns = 0
+        with self.server.lock:
+            cold = model not in cfg.loaded
+            cfg.loaded.add(model)
+        if cold and cfg.load_ms:
+            time.sleep(cfg.load_ms / 1000.0)
+            load_ns = int(cfg.load_ms * 1e6)
+
+        prompt = req.get("prompt", "")
+        speed = MODEL_SPEED.get(model, 1.0)
+        prompt_tokens = _tokens(prompt)
+        prompt_s = prompt_tokens / (cfg.prompt_tps * speed)
+        time.sleep(cfg.base_latency_ms / 1000.0 + prompt_s)
+
+        if not prompt:
+            self._json(200, {"model": model, "response": "", "done": True, "load_duration": load_ns})
+            return
+
+        n = min(int((req.get("options") or {}).get("num_predict") or cfg.reply_tokens), cfg.reply_tokens)
+        words = [f"tok{i}" for i in range(n)]
+        for needle, reply in CANNED_REPLIES.items():
+            if needle in prompt:
+                words = reply.split()[:n]
+                n = len(words)
+                break
+        eval_tps = cfg.eval_tps * speed
+        stats = {
+            "done": True,
+            "load_duration": load_ns,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_s * 1e9),
+            "eval_count": n,
+            "eval_duration": int(n / eval_tps * 1e9),
+        }
+
+        if not req.get("stream", True):
+            time.sleep(n / eval_tps)
+            self._json(200, {"model": model, "response": " ".join(words), **stats})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def _chunk(obj: dict) -> None:
+            data = json.dumps(obj).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        for i, w in enumerate(words):
+            time.sleep(1.0 / eval_tps)
+            _chunk({"model": model, "response": (" " if i else "") + w, "done": False})
+        _chunk({"model": model, "response": "", **stats})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, cfg: Optional[MockConfig] = None):
+        super().__init__(addr, MockOllamaHandler)
+        self.cfg = cfg or MockConfig()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max(1, self.cfg.parallel))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock(cfg: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0) -> MockOllamaServer:
+    srv = MockOllamaServer((host, port), cfg)
+    threading.Thread(target=srv.serve_forever, name="mock-ollama", daemon=True).start()
+    return srv
+
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=11555)
+    p.add_argument("--load-ms", type=float, default=0.0)
+    p.add_argument("--latency-ms", type=float, default=5.0)
+    p.add_argument("--prompt-tps", type=float, default=2000.0)
+    p.add_argument("--eval-tps", type=float, default=40.0)
+    p.add_argument("--reply-tokens", type=int, default=48)
+    p.add_argument("--parallel", type=int, default=1)
+    a = p.parse_args(argv)
+    cfg = MockConfig(
+        load_ms=a.load_ms,
+        base_latency_ms=a.latency_ms,
+        prompt_tps=a.prompt_tps,
+        eval_tps=a.eval_tps,
+        reply_tokens=a.reply_tokens,
+        parallel=a.parallel,
+    )
+    srv = MockOllamaServer((a.host, a.port), cfg)
+    print(f"mock ollama on {srv.base_url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
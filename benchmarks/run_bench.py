@@ -0,0 +1,241 @@
+"""Offline throughput/latency benchmarks for TheLocalAI's hot paths.
+
+Starts the mock Ollama server from ``mock_ollama.py``, points the app at it and at a
+scratch data dir, then drives build_prompt, the DB helpers, fetch_page_text and
+generate_reply (blocking and streaming, optionally concurrent). Results go to
+benchmarks/results/<timestamp>.json; ``--compare`` flags regressions against an
+earlier run.
+
+    python benchmarks/run_bench.py --quick
+    python benchmarks/run_bench.py --compare benchmarks/results/baseline.json --tolerance 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+RESULTS_DIR = HERE / "results"
+
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(HERE))
+
+from mock_ollama import FIXTURES, MockConfig, start_mock  # noqa: E402
+
+WORDS = (
+    "sourdough starter hydration flour water salt oven proof crumb crust asyncio event loop task "
+    "coroutine await future queue python sqlite index query latency memory cache model prompt"
+).split()
+
+
+def _sentence(i: int, n: int = 24) -> str:
+    return " ".join(WORDS[(i * 7 + k * 3) % len(WORDS)] for k in range(n)) + "."
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def measure(fn: Callable[[int], object], iterations: int, *, concurrency: int = 1, warmup: int = 1) -> dict:
+    for i in range(warmup):
+        fn(-1 - i)
+    samples: List[float] = []
+    lock = threading.Lock()
+
+    def _one(i: int) -> None:
+        t = time.perf_counter()
+        fn(i)
+        ms = (time.perf_counter() - t) * 1000.0
+        with lock:
+            samples.append(ms)
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(iterations):
+            _one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(_one, range(iterations)))
+    wall = time.perf_counter() - started
+    samples.sort()
+    return {
+        "n": len(samples),
+        "concurrency": concurrency,
+        "ops_per_s": round(len(samples) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(_percentile(samples, 0.50), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "p99_ms": round(_percentile(samples, 0.99), 3),
+    }
+
+
+def run(args) -> Dict[str, dict]:
+    scale = 0.2 if args.quick else 1.0
+
+    def n(full: int) -> int:
+        return max(3, int(full * scale))
+
+    cfg = MockConfig(
+        base_latency_ms=args.latency_ms,
+        prompt_tps=args.prompt_tps,
+        eval_tps=args.eval_tps,
+        reply_tokens=args.reply_tokens,
+        parallel=args.parallel,
+    )
+    mock = start_mock(cfg)
+    scratch = tempfile.TemporaryDirectory(prefix="thelocalai-bench-")
+    # Must be set before thelocalai.config is imported.
+    os.environ["THELOCALAI_OLLAMA_BASE"] = mock.base_url
+    os.environ["THELOCALAI_DATA_DIR"] = scratch.name
+    os.environ["OLLAMA_NUM_PARALLEL"] = str(args.parallel)
+
+    from thelocalai.chat_logic import generate_reply
+    from thelocalai.config import ensure_data_dir
+    from thelocalai.db import db_connect, kb_add_doc, record_turn, search_kb, search_turns
+    from thelocalai.integrations import build_prompt, fetch_page_text
+    from thelocalai.models import model_registry
+    from thelocalai.passages import select_passages
+    from thelocalai.sessions import chat_engine
+
+    ensure_data_dir()
+    con = db_connect()
+    model_registry().refresh()
+
+    results: Dict[str, dict] = {}
+
+    def report(name: str, r: dict) -> None:
+        results[name] = r
+        print(f"{name:<28} {r['ops_per_s']:>10.1f} ops/s  p50 {r['p50_ms']:>9.2f}  p95 {r['p95_ms']:>9.2f}  p99 {r['p99_ms']:>9.2f} ms")
+
+    memory = "\n".join(f"- fact_{i}: {_sentence(i, 8)}" for i in range(20))
+    history = "\n".join(_sentence(i) for i in range(40))
+    kb = "\n\n".join(_sentence(i, 60) for i in range(20))
+    report(
+        "build_prompt",
+        measure(lambda i: build_prompt(memory, "how do I keep my starter alive?", kb, kb, "sourdough", True, history=history), n(2000)),
+    )
+
+    report("db.record_turn", measure(lambda i: record_turn(con, f"s{i % 8}", "user", _sentence(i)), n(2000)))
+    report("db.search_turns", measure(lambda i: search_turns(con, WORDS[i % len(WORDS)] + " latency", limit=10), n(500)))
+    report(
+        "db.kb_add_doc",
+        measure(lambda i: kb_add_doc(con, "bench", f"https://bench.local/{i}", f"doc {i}", " ".join(_sentence(i + k, 30) for k in range(12))), n(200)),
+    )
+    report("db.search_kb", measure(lambda i: search_kb(con, WORDS[i % len(WORDS)] + " crumb", limit=20), n(500)))
+
+    pages = sorted(p.name for p in FIXTURES.glob("*.html"))
+    report("fetch_page_text", measure(lambda i: fetch_page_text(f"{mock.base_url}/pages/{pages[i % len(pages)]}"), n(60)))
+
+    texts = [{"text": fetch_page_text(f"{mock.base_url}/pages/{name}")[1]} for name in pages]
+    queries = ["how long should sourdough bulk fermentation take", "asyncio gather cancel tasks timeout", "latest news headlines"]
+    report("web.select_passages", measure(lambda i: select_passages(queries[i % len(queries)], texts, 9000), n(200)))
+
+    def _chat(stream: bool, long: bool = False) -> Callable[[int], object]:
+        # Short questions go through the router's intent check; long ones go straight to the selected model.
+        def _go(i: int):
+            c = db_connect()
+            try:
+                return generate_reply(
+                    c,
+                    args.model,
+                    f"tell me about {WORDS[i % len(WORDS)]} please" + (" " + _sentence(i) if long else ""),
+                    num_predict=args.reply_tokens,
+                    temperature=0.5,  # above the answer-cache threshold: measure the model path
+                    session_id=f"bench-{i % 4}",
+                    on_token=(lambda tok: None) if stream else None,
+                )
+            finally:
+                c.close()
+
+        return _go
+
+    report("generate_reply", measure(_chat(False), n(20)))
+    report("generate_reply.stream", measure(_chat(True), n(20)))
+    report("generate_reply.long", measure(_chat(False, long=True), n(20)))
+    if args.concurrency > 1:
+        report(f"generate_reply.c{args.concurrency}", measure(_chat(False), n(20), concurrency=args.concurrency))
+
+        # Independent sessions through the engine: the limiter keeps Ollama at --parallel requests.
+        engine = chat_engine()
+
+        def _session_turn(i: int):
+            return engine.chat(
+                f"user-{i % args.concurrency}",
+                args.model,
+                f"tell me about {WORDS[i % len(WORDS)]} please " + _sentence(i),
+                num_predict=args.reply_tokens,
+                temperature=0.5,
+            )
+
+        report(f"engine.sessions.c{args.concurrency}", measure(_session_turn, n(40), concurrency=args.concurrency))
+        stats = engine.stats()
+        print(f"{'':<28} limiter {stats['limiter']}")
+
+    con.close()
+    mock.shutdown()
+    scratch.cleanup()
+    return results
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if base[key] and cur[key] > base[key] * (1.0 + tolerance):
+                regressions.append(f"{name} {key}: {base[key]:.2f} -> {cur[key]:.2f} ms")
+        if base["ops_per_s"] and cur["ops_per_s"] < base["ops_per_s"] / (1.0 + tolerance):
+            regressions.append(f"{name} ops/s: {base['ops_per_s']:.1f} -> {cur['ops_per_s']:.1f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--quick", action="store_true", help="fewer iterations, for CI")
+    p.add_argument("--model", default="gemma3:4b")
+    p.add_argument("--latency-ms", type=float, default=2.0)
+    p.add_argument("--prompt-tps", type=float, default=20000.0)
+    p.add_argument("--eval-tps", type=float, default=400.0)
+    p.add_argument("--reply-tokens", type=int, default=32)
+    p.add_argument("--parallel", type=int, default=1, help="mock OLLAMA_NUM_PARALLEL")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--out", type=Path, help="default: benchmarks/results/<timestamp>.json")
+    p.add_argument("--compare", type=Path, help="baseline results file")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression is reported")
+    args = p.parse_args(argv)
+
+    results = run(args)
+    out = args.out or RESULTS_DIR / time.strftime("%Y%m%d-%H%M%S.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    meta = {"python": sys.version.split()[0], "quick": args.quick, "mock": {k: getattr(args, k) for k in ("latency_ms", "prompt_tps", "eval_tps", "reply_tokens", "parallel")}}
+    out.write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+    print(f"wrote {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8")).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        if regressions:
+            return 1
+        print(f"no regressions vs {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
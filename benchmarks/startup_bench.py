@@ -0,0 +1,111 @@
+"""Cold-start benchmark for TheLocalAI.
+
+Measures the import cost of the UI entry point with ``-X importtime`` and, when a
+display is available, time-to-first-paint and time-to-interactive of ``main.py``.
+
+    python benchmarks/startup_bench.py --runs 5 --budget-ms 400 --json startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that should only load on first use, never during startup.
+LAZY_MODULES = ("requests", "numpy", "bs4", "ddgs", "vosk", "sounddevice", "pyttsx3", "psutil")
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(target: str = "thelocalai.app") -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if m:
+            rows.append({"module": m.group(4), "self_us": int(m.group(1)), "cumulative_us": int(m.group(2)), "depth": len(m.group(3)) // 2})
+    total_us = next((r["cumulative_us"] for r in rows if r["module"] == target), sum(r["self_us"] for r in rows if r["depth"] == 0))
+    loaded = {r["module"].split(".")[0] for r in rows}
+    return {
+        "target": target,
+        "total_ms": total_us / 1000.0,
+        "top_self": sorted(rows, key=lambda r: r["self_us"], reverse=True)[:15],
+        "eager_optional": sorted(m for m in LAZY_MODULES if m in loaded),
+    }
+
+
+def has_display() -> bool:
+    return os.name == "nt" or sys.platform == "darwin" or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def ui_startup_once(timeout: float = 60.0) -> dict:
+    env = dict(os.environ, THELOCALAI_STARTUP_TRACE="exit")
+    spawned = time.time()
+    proc = subprocess.run([sys.executable, "main.py"], cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            marks = json.loads(line[len("STARTUP ") :])
+            return {
+                "interpreter_ms": (marks["t0"] - spawned) * 1000.0,
+                "first_paint_ms": (marks["first_paint"] - spawned) * 1000.0,
+                "interactive_ms": (marks["interactive"] - spawned) * 1000.0,
+            }
+    raise RuntimeError(f"main.py did not report startup marks (exit {proc.returncode}): {proc.stderr[-400:]}")
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--budget-ms", type=float, default=0.0, help="fail if the median import time exceeds this")
+    p.add_argument("--json", type=Path, help="write results to this file")
+    args = p.parse_args(argv)
+
+    profiles = [import_profile() for _ in range(max(1, args.runs))]
+    import_ms = statistics.median(pr["total_ms"] for pr in profiles)
+    result: dict = {
+        "python": sys.version.split()[0],
+        "import_ms_median": import_ms,
+        "eager_optional": profiles[-1]["eager_optional"],
+        "top_self": profiles[-1]["top_self"],
+    }
+
+    print(f"import thelocalai.app: median {import_ms:.1f} ms over {len(profiles)} runs")
+    for r in profiles[-1]["top_self"][:10]:
+        print(f"  {r['self_us'] / 1000.0:8.2f} ms  {r['module']}")
+    if result["eager_optional"]:
+        print("  eagerly imported optional backends: " + ", ".join(result["eager_optional"]))
+
+    if has_display():
+        runs = [ui_startup_once() for _ in range(max(1, args.runs))]
+        for key in ("interpreter_ms", "first_paint_ms", "interactive_ms"):
+            result[key + "_median"] = statistics.median(r[key] for r in runs)
+        print(f"first paint: median {result['first_paint_ms_median']:.0f} ms")
+        print(f"interactive: median {result['interactive_ms_median']:.0f} ms")
+    else:
+        print("no display: skipped first-paint/interactive measurement")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.budget_ms and import_ms > args.budget_ms:
+        print(f"FAIL: import time {import_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,28 +1,97 @@
 from __future__ import annotations
 
-import logging
+import time
 
-import tkinter as tk
+_T0 = time.time()
 
-from thelocalai.app import TheLocalAIApp
-from thelocalai.config import APP_TITLE
-from thelocalai.runtime import install_exception_hooks, setup_logging
-from thelocalai.security import acquire_single_instance_lock
+import argparse  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
 
+from thelocalai.config import API_HOST, API_PORT, API_WORKERS, APP_TITLE, THEME  # noqa: E402
+from thelocalai.runtime import install_exception_hooks, setup_logging  # noqa: E402
+
+# Set by benchmarks/startup_bench.py: "1" prints startup marks, "exit" also closes once interactive.
+STARTUP_TRACE_ENV = "THELOCALAI_STARTUP_TRACE"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog=APP_TITLE)
+    p.add_argument("--headless", action="store_true", help="serve the chat pipeline over a local HTTP/JSON API instead of the UI")
+    p.add_argument("--host", default=API_HOST)
+    p.add_argument("--port", type=int, default=API_PORT)
+    p.add_argument("--workers", type=int, default=API_WORKERS)
+    p.add_argument("message", nargs="*", help="message to send (forwarded to the running instance if there is one)")
+    return p.parse_args(argv)
+
+
+def run_headless(args: argparse.Namespace) -> None:
+    from thelocalai.server import serve
+
+    serve(args.host, args.port, workers=args.workers)
+
+
+def run_ui(message: str = "") -> None:
+    import tkinter as tk
 
-def main():
-    setup_logging()
     log = logging.getLogger("thelocalai")
-    install_exception_hooks(log)
-    acquire_single_instance_lock()
     log.info("Starting %s", APP_TITLE)
+    marks = {"t0": _T0}
 
+    # Paint a bare window first; the app modules load while it is already on screen.
     root = tk.Tk()
-    TheLocalAIApp(root)
+    root.title(APP_TITLE)
+    root.geometry("1100x820")
+    root.configure(bg=THEME["bg"])
+    splash = tk.Label(root, text=f"{APP_TITLE} loading…", bg=THEME["bg"], fg=THEME["green_dim"], font=("Consolas", 12))
+    splash.pack(expand=True)
+    root.update()
+    marks["first_paint"] = time.time()
+
+    from thelocalai.app import TheLocalAIApp
+
+    splash.destroy()
+    app = TheLocalAIApp(root)
+    if message:
+        root.after(400, lambda: app.submit_external(message))
+
+    def _interactive():
+        marks["interactive"] = time.time()
+        log.info(
+            "Startup: first paint %.0f ms, interactive %.0f ms",
+            (marks["first_paint"] - _T0) * 1000,
+            (marks["interactive"] - _T0) * 1000,
+        )
+        trace = os.environ.get(STARTUP_TRACE_ENV, "")
+        if trace:
+            print("STARTUP " + json.dumps(marks), flush=True)
+        if trace == "exit":
+            app.on_close()
+
+    root.after_idle(_interactive)
     root.mainloop()
 
     log.info("%s closed", APP_TITLE)
 
 
+def main(argv=None):
+    args = parse_args(argv)
+    message = " ".join(args.message).strip()
+    if not args.headless:
+        from thelocalai.security import acquire_single_instance_lock
+
+        # A second launch forwards its message over the lock socket and exits before Tk is loaded,
+        # and before logging starts, so only the running instance writes (and rotates) the log files.
+        acquire_single_instance_lock(message)
+    setup_logging()
+    log = logging.getLogger("thelocalai")
+    install_exception_hooks(log, popups=not args.headless)
+    if args.headless:
+        run_headless(args)
+    else:
+        run_ui(message)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Keep everything the tests write (model cache, traces, spool files) out of the real data dir.
+# Must happen before thelocalai.config is imported.
+os.environ.setdefault("THELOCALAI_DATA_DIR", tempfile.mkdtemp(prefix="thelocalai-tests-"))
+
+import pytest  # noqa: E402
+
+import thelocalai.db as db  # noqa: E402
+
+
+@pytest.fixture
+def con(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "memory.db")
+    con = db.db_connect()
+    yield con
+    con.close()
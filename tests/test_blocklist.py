@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+
+import thelocalai.blocklist as blocklist
+from thelocalai.blocklist import Blocklist
+
+
+def test_suffix_wildcard_and_allow_rules():
+    bl = Blocklist(
+        [
+            "facebook.com",
+            "*.medium.com",
+            "ads.*.example.org",
+            "||tracker.net^",
+            "0.0.0.0 hosts-entry.io",
+            "@@news.facebook.com",
+            "not a rule",
+        ]
+    )
+    assert len(bl) == 6
+    assert bl.is_blocked("facebook.com") and bl.is_blocked("m.facebook.com")
+    assert not bl.is_blocked("news.facebook.com") and not bl.is_blocked("notfacebook.com")
+    assert bl.is_blocked("de.medium.com") and not bl.is_blocked("medium.com")
+    assert bl.is_blocked("ads.eu.example.org") and not bl.is_blocked("ads.example.org")
+    assert bl.is_blocked("cdn.tracker.net") and bl.is_blocked("hosts-entry.io")
+
+
+def test_blocklist_file_is_reloaded_when_it_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(blocklist, "BLOCKLIST_CHECK_SECONDS", 0.0)
+    path = tmp_path / "blocklist.txt"
+    path.write_text("first.example\n", encoding="utf-8")
+    reloader = blocklist._Reloader(path)
+    assert reloader.get().is_blocked("www.first.example")
+
+    path.write_text("second.example\n", encoding="utf-8")
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 5))
+    current = reloader.get()
+    assert current.is_blocked("second.example") and not current.is_blocked("first.example")
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import thelocalai.chat_logic as chat_logic
+import thelocalai.db as db
+import thelocalai.tracing as tracing
+from thelocalai.chat_logic import _answer_cache_key, _history_command, generate_reply
+
+
+def test_isolated_history_commands_only_see_own_session(con):
+    db.record_turn(con, "api-1", "user", "the tide tables for Otago")
+    db.record_turn(con, "api-2", "user", "the tide tables for Nelson")
+
+    listing = _history_command(con, "history", "", scope="api-1")
+    assert "api-1" in listing and "api-2" not in listing
+    hits = _history_command(con, "history", "tide", scope="api-1")
+    assert "Otago" in hits and "Nelson" not in hits
+    assert "Nelson" not in _history_command(con, "session", "api-2", scope="api-1")
+    assert "Nelson" in _history_command(con, "session", "api-2")
+
+
+def test_answer_cache_key_is_scoped(con):
+    shared = _answer_cache_key(con, "m", "a question", 100, 0.2)
+    assert _answer_cache_key(con, "m", "a question", 100, 0.2, "api-1") != shared
+    assert _answer_cache_key(con, "m", "a question", 100, 0.2, "api-1") != _answer_cache_key(con, "m", "a question", 100, 0.2, "api-2")
+
+
+def test_repeated_question_is_answered_from_the_cache(con, monkeypatch):
+    calls = []
+
+    def fake_generate(model, prompt, **kwargs):
+        calls.append(prompt)
+        return "Paris."
+
+    monkeypatch.setattr(chat_logic, "ollama_generate", fake_generate)
+    monkeypatch.setattr(chat_logic, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", False)
+
+    ask = dict(num_predict=64, temperature=0.1)
+    first = generate_reply(con, "m", "What is the capital of France?", session_id="s1", **ask)
+    again = generate_reply(con, "m", "what is the capital  of france?", session_id="s1", **ask)
+    other = generate_reply(con, "m", "What is the capital of France?", session_id="s2", **ask)
+
+    assert len(calls) == 1
+    assert not first.cached and again.cached and other.cached
+    assert again.assistant == other.assistant == "Paris."
+
+    generate_reply(con, "m", "Why is that?", session_id="s1", **ask)
+    generate_reply(con, "m", "Why is that?", session_id="s1", **ask)
+    assert len(calls) == 3
+
+
+def test_isolated_sessions_stay_out_of_unscoped_retrieval(con):
+    db.record_turn(con, "desktop", "user", "my garden gets tomato blight every summer")
+    db.record_turn(con, "api-1", "user", "our tomato supplier invoice is overdue", isolated=True)
+
+    history, _ = chat_logic.retrieve_context(con, "tomato", session_id="desktop-2")
+    assert "blight" in history and "invoice" not in history
+    assert "invoice" not in _history_command(con, "history", "tomato")
+    assert "api-1" not in _history_command(con, "history", "")
+    assert "invoice" not in _history_command(con, "session", "api-1")
+
+    history, _ = chat_logic.retrieve_context(con, "tomato", session_id="api-1", isolate_history=True)
+    assert "invoice" in history and "blight" not in history
+
+
+class _Registry:
+    def __init__(self, models):
+        self.models = models
+
+    def names(self):
+        return sorted(self.models)
+
+    def get(self, name):
+        params, family = self.models[name]
+        return SimpleNamespace(params_b=params, family=family)
+
+    def profile(self, name, num_predict=256):
+        return SimpleNamespace(num_ctx=4096, num_predict=num_predict, prompt_chars=8000)
+
+
+def test_cheap_tasks_route_to_the_smallest_resident_model(monkeypatch):
+    registry = _Registry({"big:27b": (27.0, "gemma3"), "tiny:0.5b": (0.5, "qwen2"), "embed": (0.1, "nomic-bert")})
+    monkeypatch.setattr(chat_logic, "model_registry", lambda: registry)
+    monkeypatch.setattr(chat_logic, "ROUTER_SMALL_MODEL", "")
+
+    assert chat_logic.small_model_for("big:27b") == "tiny:0.5b"
+    intent = chat_logic.resolve_route("intent", "big:27b", 512, 0.7)
+    assert (intent.model, intent.num_predict, intent.temperature) == ("tiny:0.5b", 3, 0.0)
+    assert chat_logic.resolve_route("intent", "tiny:0.5b", 512, 0.7) is None  # no smaller model to use
+
+    calls = []
+
+    def fake_generate(model, prompt, **kwargs):
+        calls.append((model, kwargs["num_ctx"]))
+        return "SHORT"
+
+    monkeypatch.setattr(chat_logic, "ollama_generate", fake_generate)
+    trace = tracing.begin_trace("chat")
+    with tracing.use_trace(trace):
+        assert chat_logic._is_short_followup("thanks!", "big:27b", 512, 0.7)
+    assert calls == [("tiny:0.5b", 4096)]
+    assert [s.name for s in trace.spans] == ["route.intent"]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import sqlite3
+
+import thelocalai.db as db
+
+
+def test_session_topics_do_not_evict_memory(con, monkeypatch):
+    monkeypatch.setattr(db, "MAX_MEMORY_ROWS", 5)
+    db.upsert_memory(con, "user_name", "Sam")
+    for i in range(20):
+        db.set_last_topic(con, f"topic {i}", f"session-{i}")
+    db.set_last_topic(con, "desktop topic")
+
+    assert "user_name: Sam" in db.load_memory_latest_per_key(con)
+    assert db.get_last_topic(con, "session-19") == "topic 19"
+    assert db.get_last_topic(con) == "desktop topic"
+    assert con.execute("SELECT COUNT(*) FROM last_topic WHERE scope != ''").fetchone()[0] == 5
+
+
+def test_memory_is_scoped_per_isolated_session(con):
+    db.extract_memory(con, "my name is Sam")
+    db.extract_memory(con, "my name is Alex", "api-1")
+
+    assert "user_name: Sam" in db.load_memory_latest_per_key(con)
+    assert "user_name: Alex" in db.load_memory_latest_per_key(con, "api-1")
+    assert db.load_memory_latest_per_key(con, "api-2") == ""
+
+
+def test_turns_round_trip_page_and_search(con):
+    ids = [db.record_turn(con, "s1", "user", f"question number {i}") for i in range(10)]
+    db.record_turn(
+        con, "s1", "assistant", "Volcanic soil drains well.", model="m", latency_ms=420, prompt_chars=900, sources=["https://a.example"]
+    )
+
+    newest = db.list_turns(con, session_id="s1", limit=3)
+    assert [t["role"] for t in newest] == ["user", "user", "assistant"]
+    assert newest[-1]["sources"] == ["https://a.example"] and newest[-1]["latency_ms"] == 420
+    older = db.list_turns(con, session_id="s1", before_id=newest[0]["id"], limit=3)
+    assert [t["id"] for t in older] == ids[5:8]
+
+    hits = db.search_turns(con, 'volcanic "soil" OR-drains (')
+    assert [h["content"] for h in hits] == ["Volcanic soil drains well."]
+    assert db.search_turns(con, "???") == []
+
+
+def test_kb_chunks_are_stored_compressed_and_replaced_cleanly(con):
+    text = "Kea are alpine parrots from the South Island. " * 40
+    ids = db.kb_add_doc(con, "birds", "https://a.example/kea", "Kea", text)
+    body = con.execute("SELECT body FROM kb_docs WHERE id = ?", (ids[0],)).fetchone()[0]
+    assert isinstance(body, bytes) and len(body) < len(db.unpack_text(body)) // 4
+
+    hit = db.search_kb(con, "alpine parrots")[0]
+    assert hit["content"].startswith("Kea are alpine parrots") and hit["url"] == "https://a.example/kea"
+
+    # Re-adding a URL replaces its chunks; the contentless index must forget the old text.
+    db.kb_add_doc(con, "birds", "https://a.example/kea", "Kea", "Kea nest in rock crevices.")
+    assert db.search_kb(con, "alpine") == []
+    assert [d["content"] for d in db.search_kb(con, "crevices")] == ["Kea nest in rock crevices."]
+
+
+def test_legacy_uncompressed_kb_is_migrated_with_ids_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "legacy.db")
+    legacy = sqlite3.connect(db.DB_PATH)
+    legacy.execute(
+        "CREATE TABLE kb_docs (id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, source_url TEXT,"
+        " title TEXT, content TEXT NOT NULL, created_at TEXT NOT NULL)"
+    )
+    legacy.execute("CREATE VIRTUAL TABLE kb_fts USING fts5(topic, title, content, url)")
+    legacy.execute("INSERT INTO kb_docs VALUES (7, 'birds', 'u', 'Takahe', 'Takahe were rediscovered in 1948.', 'x')")
+    legacy.execute("INSERT INTO kb_fts(rowid,topic,title,content,url) VALUES (7, 'birds', 'Takahe', 'Takahe were rediscovered in 1948.', 'u')")
+    legacy.commit()
+    legacy.close()
+
+    con = db.db_connect()
+    try:
+        assert "content" not in {r[1] for r in con.execute("PRAGMA table_info(kb_docs)")}
+        hits = db.search_kb(con, "rediscovered")
+        assert [(h["id"], h["content"]) for h in hits] == [(7, "Takahe were rediscovered in 1948.")]
+    finally:
+        con.close()
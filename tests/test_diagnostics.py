@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from thelocalai.app import TheLocalAIApp
+
+
+class _Widget:
+    def __init__(self, cls: str, children=()):
+        self._cls = cls
+        self._children = list(children)
+
+    def winfo_class(self):
+        return self._cls
+
+    def winfo_children(self):
+        return self._children
+
+
+class _Canvas:
+    def find_withtag(self, tag):
+        return (1, 2, 3)
+
+    def find_all(self):
+        return (1, 2, 3, 4)
+
+
+def test_diagnostics_report_builds():
+    chat = SimpleNamespace(
+        line_count=12,
+        spooled_entries=3,
+        text=SimpleNamespace(count=lambda *args: (456,)),
+    )
+    app = SimpleNamespace(
+        root=_Widget("Tk", [_Widget("Frame", [_Widget("Text")]), _Widget("Canvas")]),
+        chat=chat,
+        matrix_canvas=_Canvas(),
+        dispatcher=SimpleNamespace(qsize=lambda: 0, wakeups=5, delivered=9),
+    )
+    report = TheLocalAIApp._diagnostics_report(app)
+    assert "ChatLog: 12 lines, 456 chars in widget, 3 entries spooled" in report
+    assert "Tk widgets: 4" in report
+    assert "Matrix canvas: 3 matrix items, 4 total" in report
+    assert "MainThread" in report
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import thelocalai.db as db
+import thelocalai.embeddings as embeddings
+import thelocalai.integrations as integrations
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    monkeypatch.setattr(embeddings, "_disabled_reason", None)
+    monkeypatch.setattr(embeddings, "_failures", 0)
+    monkeypatch.setattr(embeddings, "_retry_at", 0.0)
+    monkeypatch.setattr(embeddings, "_cache", {"key": None, "ids": [], "mat": None})
+
+
+class _EmbedStub(BaseHTTPRequestHandler):
+    # Texts about cats point one way, everything else the other; fail_next makes the next calls 500.
+    fail_next = 0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if _EmbedStub.fail_next:
+            _EmbedStub.fail_next -= 1
+            status, body = 500, {"error": "server overloaded"}
+        else:
+            catty = any(w in req["prompt"].lower() for w in ("cat", "kitten", "feline"))
+            status, body = 200, {"embedding": [1.0, 0.0] if catty else [0.0, 1.0]}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def embed_stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EmbedStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(integrations, "OLLAMA_EMBED_URL", f"http://127.0.0.1:{server.server_port}/api/embeddings")
+    _EmbedStub.fail_next = 0
+    yield _EmbedStub
+    server.shutdown()
+    server.server_close()
+
+
+def test_hybrid_search_fuses_lexical_and_semantic_ranks(con, embed_stub):
+    db.kb_add_doc(con, "pets", "u1", "Kittens", "A kitten is a young cat.")
+    db.kb_add_doc(con, "pets", "u2", "Hunters", "Felines hunt at night.")
+    db.kb_add_doc(con, "pets", "u3", "Dogs", "Dogs bark at night.")
+    assert embeddings.embed_pending(con) == 3
+
+    titles = [d["title"] for d in embeddings.hybrid_search_kb(con, "kitten")]
+    # Both rankers agree on the first; the second is a semantic-only match; the dog is neither.
+    assert titles == ["Kittens", "Hunters"]
+
+    # "night" matches two docs lexically and neither semantically.
+    assert {d["title"] for d in embeddings.hybrid_search_kb(con, "night")} == {"Hunters", "Dogs"}
+
+
+def test_hybrid_search_falls_back_to_bm25_during_backoff(con, embed_stub, monkeypatch):
+    db.kb_add_doc(con, "pets", "u1", "Kittens", "A kitten is a young cat.")
+    db.kb_add_doc(con, "pets", "u2", "Hunters", "Felines hunt at night.")
+    assert embeddings.embed_pending(con) == 2
+
+    embed_stub.fail_next = 1
+    assert [d["title"] for d in embeddings.hybrid_search_kb(con, "kitten")] == ["Kittens"]
+    assert embeddings._failures == 1 and embeddings._disabled_reason is None
+    assert not embeddings.embeddings_available()
+    # While backing off the endpoint is not called at all.
+    assert [d["title"] for d in embeddings.hybrid_search_kb(con, "kitten")] == ["Kittens"]
+
+    monkeypatch.setattr(embeddings, "_retry_at", 0.0)
+    assert [d["title"] for d in embeddings.hybrid_search_kb(con, "kitten")] == ["Kittens", "Hunters"]
+    assert embeddings._failures == 0
+
+
+def _fail_with(monkeypatch, message):
+    def embed(model, text):
+        raise RuntimeError(message)
+
+    monkeypatch.setattr(embeddings, "ollama_embed", embed)
+
+
+def test_transient_error_backs_off_then_recovers(monkeypatch):
+    _fail_with(monkeypatch, "Read timed out")
+    assert embeddings.embed_text("hello") is None
+    assert embeddings._disabled_reason is None
+    assert not embeddings.embeddings_available()
+
+    monkeypatch.setattr(embeddings, "_retry_at", 0.0)
+    monkeypatch.setattr(embeddings, "ollama_embed", lambda model, text: [3.0, 4.0])
+    assert list(embeddings.embed_text("hello")) == pytest.approx([0.6, 0.8])
+    assert embeddings._failures == 0
+
+
+def test_missing_model_disables_for_the_run(monkeypatch):
+    _fail_with(monkeypatch, 'Ollama embeddings error (nomic-embed-text) 404: model "nomic-embed-text" not found')
+    assert embeddings.embed_text("hello") is None
+    assert embeddings._disabled_reason
+    monkeypatch.setattr(embeddings, "_retry_at", 0.0)
+    assert not embeddings.embeddings_available()
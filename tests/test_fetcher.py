@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import thelocalai.fetcher as fetcher
+from thelocalai.fetcher import FetchError, FetchScheduler
+
+
+class _Throttled(Exception):
+    def __init__(self, retry_after: str):
+        super().__init__("429")
+        self.response = SimpleNamespace(status_code=429, headers={"Retry-After": retry_after})
+
+
+def test_long_cooldown_fails_queued_fetch_fast(monkeypatch):
+    monkeypatch.setattr(fetcher, "WEB_RESPECT_ROBOTS", False)
+    calls = []
+
+    def stub(url):
+        calls.append(url)
+        raise _Throttled("300")
+
+    sched = FetchScheduler(fetch=stub, persist=False, retries=2)
+    with pytest.raises(FetchError):
+        sched.submit("https://slow.example/a").result(timeout=5)
+
+    started = time.monotonic()
+    with pytest.raises(FetchError, match="rate limited"):
+        sched.submit("https://slow.example/b").result(timeout=5)
+    assert time.monotonic() - started < 1.0
+    assert calls == ["https://slow.example/a"]
+
+
+def test_robots_txt_is_fetched_once_per_host(monkeypatch):
+    import thelocalai.integrations as integrations
+
+    robots_calls = []
+
+    class _Session:
+        def get(self, url, timeout):
+            robots_calls.append(url)
+            time.sleep(0.2)
+            return SimpleNamespace(status_code=200, text="User-agent: *\nDisallow: /private\n")
+
+    monkeypatch.setattr(fetcher, "WEB_RESPECT_ROBOTS", True)
+    monkeypatch.setattr(integrations, "http_session", lambda: _Session())
+    sched = FetchScheduler(fetch=lambda url: ("t", url), persist=False, workers=2, burst=2, max_inflight=2)
+
+    ok = sched.submit("https://site.example/a")
+    refused = sched.submit("https://site.example/private/b")
+    assert ok.result(timeout=5) == ("t", "https://site.example/a")
+    with pytest.raises(FetchError, match="robots"):
+        refused.result(timeout=5)
+    assert robots_calls == ["https://site.example/robots.txt"]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+import thelocalai.integrations as integrations
+
+
+class _Response:
+    status_code = 200
+
+    def iter_lines(self):
+        for tok in ("Hel", "lo", "!"):
+            yield json.dumps({"response": tok}).encode()
+        yield json.dumps({"response": "", "done": True}).encode()
+
+
+def test_sink_errors_propagate_unchanged(monkeypatch):
+    session = SimpleNamespace(post=lambda *args, **kwargs: _Response())
+    monkeypatch.setattr(integrations, "http_session", lambda: session)
+
+    @contextmanager
+    def slot():
+        yield
+
+    monkeypatch.setattr(integrations, "ollama_limiter", lambda: SimpleNamespace(slot=slot))
+
+    def on_token(tok):
+        raise BrokenPipeError("client went away")
+
+    with pytest.raises(BrokenPipeError):
+        integrations.ollama_generate("m", "p", num_predict=8, temperature=0.0, on_token=on_token)
+
+
+def test_warmup_sends_an_empty_prompt_with_keep_alive(monkeypatch):
+    sent = []
+
+    def post(url, json, timeout):
+        sent.append((url, json))
+        return SimpleNamespace(status_code=200, json=lambda: {"done": True, "load_duration": 2_500_000_000})
+
+    monkeypatch.setattr(integrations, "http_session", lambda: SimpleNamespace(post=post))
+
+    assert integrations.ollama_warmup("m", "30m", num_ctx=8192) == 2500
+    url, payload = sent[0]
+    assert url == integrations.OLLAMA_GEN_URL
+    assert payload == {"model": "m", "prompt": "", "stream": False, "keep_alive": "30m", "options": {"num_ctx": 8192}}
+
+
+def test_warmup_reports_ollama_errors(monkeypatch):
+    response = SimpleNamespace(status_code=404, text="", json=lambda: {"error": "model 'm' not found"})
+    monkeypatch.setattr(integrations, "http_session", lambda: SimpleNamespace(post=lambda *a, **k: response))
+
+    with pytest.raises(RuntimeError, match="not found"):
+        integrations.ollama_warmup("m")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+import thelocalai.db as db
+from thelocalai.kb_ingest import ingest_path
+
+
+def _urls(con) -> set:
+    return {r[0] for r in con.execute("SELECT DISTINCT source_url FROM kb_docs")}
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.mark.parametrize("change", ["delete", "edit"])
+def test_duplicate_takes_over_when_indexed_copy_goes_away(tmp_path, con, change):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    body = "Tide tables list the height of the water at each port. " * 20
+    _write(docs / "a.txt", body)
+    _write(docs / "b.txt", body)
+
+    stats = ingest_path(str(docs), workers=1, con=con)
+    assert (stats.indexed, stats.duplicates) == (1, 1)
+    indexed = next(Path(p).name for p, row in db.kb_files_under(con, str(docs)).items() if row[3])
+    other = "b.txt" if indexed == "a.txt" else "a.txt"
+
+    if change == "delete":
+        os.remove(docs / indexed)
+    else:
+        _write(docs / indexed, "Completely different notes about sourdough starters. " * 10)
+
+    stats = ingest_path(str(docs), workers=1, con=con)
+    assert (docs / other).as_uri() in _urls(con)
+    assert stats.unchanged == 0
+    assert db.kb_file_by_sha1(con, db.kb_files_under(con, str(docs))[str(docs / other)][2]) == str(docs / other)
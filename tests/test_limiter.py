@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from thelocalai.limiter import FairLimiter
+
+
+def test_freed_slots_go_round_robin_across_sessions():
+    limiter = FairLimiter(1)
+    order = []
+    holder = threading.Event()
+
+    def hold():
+        with limiter.slot("busy"):
+            holder.wait()
+
+    def ask(sid, tag):
+        with limiter.slot(sid):
+            order.append(tag)
+
+    first = threading.Thread(target=hold)
+    first.start()
+    while limiter.stats()["active"] == 0:
+        time.sleep(0.001)
+
+    # The busy session queues three requests before the quiet one asks once.
+    threads = []
+    for sid, tag in (("busy", "b1"), ("busy", "b2"), ("busy", "b3"), ("quiet", "q1")):
+        t = threading.Thread(target=ask, args=(sid, tag))
+        t.start()
+        threads.append(t)
+        while sum(limiter.stats()["waiting"].values()) < len(threads):
+            time.sleep(0.001)
+
+    holder.set()
+    for t in [first, *threads]:
+        t.join(5)
+    assert order == ["b1", "q1", "b2", "b3"]
+    assert limiter.stats()["active"] == 0 and limiter.stats()["queued"] == 4
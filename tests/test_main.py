@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+import main
+import thelocalai.security as security
+
+
+def test_forwarding_launch_exits_before_logging_starts(monkeypatch):
+    forwarded = []
+
+    def forward_and_exit(message=""):
+        forwarded.append(message)
+        sys.exit(0)
+
+    def no_logging(**kwargs):
+        raise AssertionError("logging configured in a forwarding launch")
+
+    monkeypatch.setattr(security, "acquire_single_instance_lock", forward_and_exit)
+    monkeypatch.setattr(main, "setup_logging", no_logging)
+
+    with pytest.raises(SystemExit):
+        main.main(["what", "time", "is", "it"])
+    assert forwarded == ["what time is it"]
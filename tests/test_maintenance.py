@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sqlite3
+
+import thelocalai.db as db
+from thelocalai.config import MAINT_VACUUM_PAGES
+from thelocalai.maintenance import MaintenanceWorker, convert_to_incremental, run_maintenance
+
+
+def test_incremental_vacuum_frees_pages(con):
+    assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    con.execute("CREATE TABLE filler (blob BLOB)")
+    con.executemany("INSERT INTO filler VALUES (zeroblob(4000))", [()] * 3000)
+    con.commit()
+    con.execute("DELETE FROM filler")
+    con.commit()
+    free = con.execute("PRAGMA freelist_count").fetchone()[0]
+    assert free > 100
+
+    res = run_maintenance(con)
+
+    assert res["freed_pages"] == min(free, MAINT_VACUUM_PAGES)
+    assert con.execute("PRAGMA freelist_count").fetchone()[0] == free - res["freed_pages"]
+
+
+def test_convert_to_incremental_respects_size_guard(tmp_path):
+    con = sqlite3.connect(tmp_path / "legacy.db")
+    try:
+        con.execute("CREATE TABLE filler (blob BLOB)")
+        con.executemany("INSERT INTO filler VALUES (zeroblob(4000))", [()] * 100)
+        con.commit()
+        assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+        assert not convert_to_incremental(con, max_bytes=1024)
+        assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+        assert convert_to_incremental(con, max_bytes=None)
+        assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert not convert_to_incremental(con, max_bytes=None)
+    finally:
+        con.close()
+
+
+def test_worker_converts_a_legacy_database_before_its_first_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "memory.db")
+    legacy = sqlite3.connect(db.DB_PATH)
+    legacy.execute("CREATE TABLE filler (blob BLOB)")
+    legacy.commit()
+    legacy.close()
+
+    MaintenanceWorker()._prepare()
+
+    con = sqlite3.connect(db.DB_PATH)
+    try:
+        assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    finally:
+        con.close()
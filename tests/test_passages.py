@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from thelocalai.passages import select_passages, split_passages
+
+NAV = "Home. Products. Pricing. Blog. Careers. Contact us. Sign in. " * 20
+ANSWER = "The Rakaia river is braided and carries glacial silt from the Southern Alps to the coast."
+
+
+def test_relevant_passage_deep_in_the_page_is_selected():
+    page = {"text": NAV + " " + "Filler about unrelated matters here. " * 60 + ANSWER}
+    chosen = select_passages("rakaia river silt", [page], budget=400)
+    assert any("Rakaia river is braided" in p for p in chosen[0])
+    assert sum(len(p) for p in chosen[0]) <= 400
+
+
+def test_near_duplicate_passages_across_sources_are_dropped():
+    pages = [{"text": ANSWER}, {"text": ANSWER + " Mirrored."}, {"text": "The Rakaia has a long gorge upstream."}]
+    chosen = select_passages("rakaia river", pages, budget=2000)
+    assert len([i for i in (0, 1) if i in chosen]) == 1
+    assert 2 in chosen
+
+
+def test_no_matching_terms_falls_back_to_the_head_of_each_page():
+    pages = [{"text": "First sentence. " + "More text. " * 300}]
+    chosen = select_passages("zeppelin", pages, budget=800)
+    assert chosen[0][0].startswith("First sentence.")
+
+
+def test_windows_overlap_by_one_sentence():
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    windows = split_passages(text, window=200)
+    assert len(windows) > 1
+    for a, b in zip(windows, windows[1:]):
+        assert a.rsplit(". ", 1)[-1].rstrip(".") in b
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import thelocalai.server as server
+from thelocalai.chat_logic import ChatResult
+
+
+class _Engine:
+    def __init__(self):
+        self.calls = []
+
+    def chat(self, session_id, model, message, *, num_predict, temperature, on_token=None):
+        self.calls.append((session_id, message))
+        if on_token is not None:
+            for tok in ("Hi", " there"):
+                on_token(tok)
+        return ChatResult("Hi there", [], model=model)
+
+    def stats(self):
+        return {"sessions": []}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    engine = _Engine()
+    monkeypatch.setattr(server, "chat_engine", lambda: engine)
+    httpd = server.PooledHTTPServer(("127.0.0.1", 0), server.ApiHandler, workers=2)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", engine
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(url, obj):
+    req = urllib.request.Request(url, data=json.dumps(obj).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=5) as r:
+        return r.headers.get("Content-Type"), r.read().decode()
+
+
+def test_chat_returns_json_and_streams_ndjson(api):
+    base, engine = api
+    ctype, body = _post(base + "/api/chat", {"message": "hello", "session_id": "s1"})
+    assert ctype == "application/json" and json.loads(body)["assistant"] == "Hi there"
+
+    ctype, body = _post(base + "/api/chat", {"message": "hello", "session_id": "s2", "stream": True})
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert ctype == "application/x-ndjson"
+    assert [line.get("delta") for line in lines[:-1]] == ["Hi", " there"]
+    assert lines[-1]["done"] and lines[-1]["assistant"] == "Hi there"
+    assert engine.calls == [("s1", "hello"), ("s2", "hello")]
+
+
+def test_chat_rejects_bad_requests(api):
+    base, _ = api
+    for payload in ({"message": ""}, {"message": "hi", "temperature": "warm"}):
+        with pytest.raises(urllib.error.HTTPError) as e:
+            _post(base + "/api/chat", payload)
+        assert e.value.code == 400
+
+
+def test_headless_mode_does_not_import_tk():
+    code = "import sys, main, thelocalai.server; main.run_headless; assert 'tkinter' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True, timeout=60, cwd=Path(__file__).resolve().parents[1])
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+
+import thelocalai.runtime as runtime
+import thelocalai.tracing as tracing
+from thelocalai.tracing import begin_trace, finish_trace, record_span, span, stage_percentiles, use_trace
+
+
+def test_spans_are_recorded_on_the_active_trace():
+    trace = begin_trace("chat", model="m")
+    with use_trace(trace):
+        with span("retrieval", hits=3):
+            pass
+        record_span("tts.speak", 12.5)
+    with span("outside"):
+        pass
+    finish_trace(trace)
+
+    names = [s.name for s in trace.spans]
+    assert names == ["retrieval", "tts.speak", "total"]
+    assert trace.spans[0].attrs == {"hits": 3}
+    assert trace.to_dict()["attrs"] == {"model": "m"}
+    assert stage_percentiles()["tts.speak"][2] >= 1
+
+
+def test_finished_traces_are_written_off_the_calling_thread(tmp_path, monkeypatch):
+    for name in ("LOG_PATH", "LOG_JSON_PATH", "TRACE_PATH"):
+        monkeypatch.setattr(runtime, name, tmp_path / f"{name.lower()}.out")
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    monkeypatch.setattr(runtime.sys, "stdout", None)
+    writers = []
+    monkeypatch.setattr(runtime.TraceLineFormatter, "format", _recording_format(writers))
+
+    runtime.setup_logging()
+    try:
+        trace = begin_trace("chat")
+        finish_trace(trace)
+    finally:
+        runtime.shutdown_logging()
+        for name in ("thelocalai", runtime.TRACE_LOGGER):
+            logging.getLogger(name).handlers.clear()
+
+    lines = (tmp_path / "trace_path.out").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["trace_id"] for line in lines] == [trace.trace_id]
+    assert writers and threading.current_thread().name not in writers
+    assert trace.trace_id not in (tmp_path / "log_path.out").read_text(encoding="utf-8")
+
+
+def _recording_format(writers):
+    original = runtime.TraceLineFormatter.format
+
+    def format(self, record):
+        writers.append(threading.current_thread().name)
+        return original(self, record)
+
+    return format
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import itertools
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import thelocalai.ui_components as ui
+from thelocalai.ui_components import ChatLog, MatrixPowerScheduler, MatrixRain, UiDispatcher
+
+
+class _FakeTk:
+    # Enough of a Tk widget for the logic in ui_components: after() records timers instead of running them.
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.timers: dict = {}
+        self.bindings: dict = {}
+
+    def after(self, ms, fn):
+        tid = f"after#{next(self._ids)}"
+        self.timers[tid] = (ms, fn)
+        return tid
+
+    def after_idle(self, fn):
+        return self.after(0, fn)
+
+    def after_cancel(self, tid):
+        self.timers.pop(tid, None)
+
+    def bind(self, event, fn, add=None):
+        self.bindings.setdefault(event, []).append(fn)
+
+    def winfo_width(self):
+        return 10
+
+    def winfo_height(self):
+        return 10
+
+    def delete(self, *tags):
+        pass
+
+
+def test_matrix_pauses_per_reason_and_resumes_slowly():
+    canvas = _FakeTk()
+    matrix = MatrixRain(canvas)
+    matrix.start()
+    assert len(canvas.timers) == 1 and matrix.power_state == "full"
+
+    matrix.pause("hidden")
+    matrix.pause("load")
+    assert matrix.paused and not canvas.timers
+    matrix.resume("hidden")
+    assert matrix.paused and not canvas.timers  # still paused for load
+
+    matrix.resume("load")
+    assert not matrix.paused and len(canvas.timers) == 1
+    assert matrix.fps < matrix.base_fps  # ramps back up instead of jumping to full rate
+
+
+def test_matrix_throttle_caps_fps_until_cleared():
+    matrix = MatrixRain(_FakeTk())
+    matrix.throttle("idle", True)
+    assert matrix.fps == matrix.degraded_fps and matrix.power_state == "degraded(idle)"
+    matrix.avg_dt_ms = 0.0
+    for _ in range(20):
+        matrix._adapt()
+    assert matrix.fps == matrix.degraded_fps
+
+    matrix.throttle("idle", False)
+    for _ in range(20):
+        matrix._adapt()
+    assert matrix.fps == matrix.base_fps and matrix.power_state == "full"
+
+
+def test_power_scheduler_pauses_under_load_with_hysteresis(monkeypatch):
+    root, canvas = _FakeTk(), _FakeTk()
+    matrix = MatrixRain(canvas)
+    scheduler = MatrixPowerScheduler(root, matrix)
+
+    for load, paused in ((0.95, True), (0.75, True), (0.5, False)):
+        monkeypatch.setattr(ui, "system_load_ratio", lambda: load)
+        scheduler._check()
+        assert matrix.paused is paused
+
+
+def _spool_only_chatlog(max_entries: int) -> ChatLog:
+    # The spool is plain file bookkeeping; no Text widget is needed to exercise it.
+    log = ChatLog.__new__(ChatLog)
+    log._spool = tempfile.TemporaryFile()
+    log._spool_offsets = []
+    log._spool_first = 0
+    log._spooled = 0
+    log.spool_max_entries = max_entries
+    return log
+
+
+def test_chatlog_spool_is_bounded_and_pages_back_in_order():
+    log = _spool_only_chatlog(max_entries=200)
+    for i in range(1000):
+        log._spool_append(f"line {i}\n", "user" if i % 2 else "assistant")
+        log._spool_trim()
+
+    kept = log._spooled - log._spool_first
+    assert 200 <= kept <= 250
+    log._spool.seek(0, 2)
+    assert log._spool.tell() < 250 * 64
+
+    page = log._spool_read(log._spool_first, log._spool_first + 3)
+    assert [t for t, _ in page] == [f"line {i}\n" for i in range(log._spool_first, log._spool_first + 3)]
+    assert log._spool_read(998, 1000) == [("line 998\n", "assistant"), ("line 999\n", "user")]
+
+
+def _dispatch_root(threaded: bool) -> _FakeTk:
+    root = _FakeTk()
+    root.tk = SimpleNamespace(eval=lambda script: "1" if threaded else "0")
+    root.events = []
+    root.event_generate = lambda name, when=None: root.events.append(name)
+    return root
+
+
+def test_dispatcher_wakes_once_and_delivers_a_batch():
+    root = _dispatch_root(threaded=True)
+    batches = []
+    d = UiDispatcher(root, batches.append)
+    assert not any(ms for ms, _ in root.timers.values())  # no polling timer with a threaded Tcl
+
+    workers = [threading.Thread(target=d.put, args=(i,)) for i in range(20)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert root.events == [UiDispatcher.EVENT]
+
+    d._on_wake()
+    assert sorted(batches[0]) == list(range(20)) and len(batches) == 1
+    d.put("next")
+    assert len(root.events) == 2
+
+
+def test_dispatcher_polls_without_a_threaded_tcl():
+    root = _dispatch_root(threaded=False)
+    batches = []
+    d = UiDispatcher(root, batches.append)
+    d.put("a")
+    assert not root.events
+
+    (poll_id,) = [tid for tid, (ms, _) in root.timers.items() if ms]
+    root.timers.pop(poll_id)[1]()
+    assert batches == [["a"]]
+    d.close()
+    assert not [tid for tid, (ms, _) in root.timers.items() if ms]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from thelocalai.voice import TTS
+from thelocalai.voice_worker import SpeechToTextProxy, VoiceProcess
+
+
+def _reader_for(vp: VoiceProcess, exitcode: int):
+    # Stand in for a started voice process: the test plays the worker's end of the pipe.
+    parent, child = multiprocessing.Pipe()
+    proc = SimpleNamespace(join=lambda timeout=None: None, exitcode=exitcode, is_alive=lambda: False)
+    vp._proc, vp._conn = proc, parent
+    reader = threading.Thread(target=vp._reader, args=(proc, parent), daemon=True)
+    reader.start()
+    return child, reader
+
+
+def test_reader_routes_replies_text_and_a_crash():
+    vp = VoiceProcess()
+    heard, exits = [], []
+    vp.on_text, vp.on_exit = heard.append, exits.append
+    answered, orphaned = Future(), Future()
+    vp._pending.update({1: answered, 2: orphaned})
+
+    worker, reader = _reader_for(vp, exitcode=-11)
+    worker.send(("reply", 1, {"enabled": True, "listening": True}))
+    worker.send(("stt", "hello there"))
+    worker.close()  # the audio backend crashed
+    reader.join(5)
+
+    assert answered.result(timeout=1) == {"enabled": True, "listening": True}
+    assert heard == ["hello there"]
+    with pytest.raises(RuntimeError, match="exited"):
+        orphaned.result(timeout=1)
+    assert exits == [-11]
+
+
+def test_stt_proxy_reports_not_listening_when_the_process_does_not_answer():
+    process = SimpleNamespace(request=lambda *args, **kwargs: None, on_text=None)
+    stt = SpeechToTextProxy(process, model_dir="vosk-model", on_text=print)
+    assert stt.start_listening() is False and not stt.listening
+
+
+def test_tts_splits_long_text_on_sentences():
+    text = " ".join(f"Sentence {i} says something." for i in range(100))
+    parts = TTS._chunk(text, max_len=120)
+    assert all(len(p) <= 120 for p in parts)
+    assert " ".join(parts) == text
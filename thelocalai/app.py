@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-import queue
 import threading
 import time
 import traceback
@@ -10,16 +9,67 @@ from typing import Optional
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 
-from .chat_logic import ChatResult, generate_reply
-from .config import APP_TITLE, DEFAULT_MODEL, DEFAULT_NUM_PREDICT, DEFAULT_TEMPERATURE, DEV_SESSION_MINUTES, GEN_WATCHDOG_SECONDS, MAX_USER_CHARS, THEME, VOSK_MODEL_DIR
+from .chat_logic import ChatResult, generate_reply, small_model_for
+from .config import (
+    APP_TITLE,
+    DEFAULT_MODEL,
+    DEFAULT_NUM_PREDICT,
+    DEFAULT_TEMPERATURE,
+    DEV_SESSION_MINUTES,
+    DIAG_RSS_INTERVAL_MS,
+    GEN_WATCHDOG_SECONDS,
+    MAX_USER_CHARS,
+    THEME,
+    UI_TELEMETRY_BUSY_MS,
+    UI_TELEMETRY_IDLE_MS,
+    VOSK_MODEL_DIR,
+)
 from .db import db_connect, db_counts_fast
-from .integrations import ollama_list_models
-from .security import dev_auth_check_password, dev_auth_is_configured, dev_auth_set_password, release_single_instance_lock
+from .diagnostics import (
+    fmt_size,
+    gc_summary,
+    rss_history,
+    stop_tracemalloc,
+    thread_inventory,
+    thread_name_counts,
+    widget_counts,
+)
+from .integrations import ollama_warmup
+from .maintenance import describe as describe_maintenance, maintenance_worker, start_maintenance
+from .models import model_registry
+from .runtime import new_session_id
+from .security import (
+    dev_auth_check_password,
+    dev_auth_is_configured,
+    dev_auth_set_password,
+    release_single_instance_lock,
+    serve_instance_ipc,
+)
+from .tracing import Trace, begin_trace, finish_trace, stage_percentiles
 from .ui_builder import build_ui, configure_ttk
+from .ui_components import DiagnosticsWindow, UiDispatcher
 from .voice import SpeechToText, TTS
+from .voice_worker import SpeechToTextProxy, TTSProxy, make_stt, make_tts, shutdown_voice_process, voice_process
 
 log = logging.getLogger("thelocalai")
 
+TELEMETRY_STAGES = (
+    "memory.extract",
+    "db.load",
+    "retrieval",
+    "web.search",
+    "web.fetch",
+    "prompt.build",
+    "llm.cache",
+    "llm.load",
+    "llm.prompt_eval",
+    "llm.eval",
+    "ui.render",
+    "db.maintenance",
+    "tts.speak",
+    "total",
+)
+
 
 class TheLocalAIApp:
     def __init__(self, root: tk.Tk):
@@ -30,11 +80,16 @@ class TheLocalAIApp:
 
         self.closing = False
         self.is_processing = False
-        self.q: "queue.Queue[ChatResult | Exception | tuple[str, str]]" = queue.Queue()
+        self._external_pending: list[str] = []
+        # Items are ChatResult, Exception or (kind, payload) tuples.
+        self.dispatcher = UiDispatcher(root, self._dispatch)
 
         self._dev_unlocked_until: Optional[float] = None
         self._dev_after: Optional[str] = None
+        self._diag_window: Optional[DiagnosticsWindow] = None
+        self._rss_after: Optional[str] = None
 
+        self.session_id = new_session_id()
         self.num_predict = DEFAULT_NUM_PREDICT
         self.temperature = DEFAULT_TEMPERATURE
 
@@ -44,11 +99,19 @@ class TheLocalAIApp:
 
         self._last_llm_started: Optional[float] = None
         self._last_llm_ms: Optional[int] = None
+        self._last_llm_cached = False
+        self._cache_hits = 0
+        self._active_trace: Optional[Trace] = None
+
+        # model name -> "loading" | "ready" | "error"; load_ms is the last measured cold load.
+        self.model_state: dict[str, str] = {}
+        self.model_load_ms: dict[str, int] = {}
 
         self.voice_enabled_var = tk.BooleanVar(value=False)
         self.mic_listen_var = tk.BooleanVar(value=False)
-        self.tts: Optional[TTS] = None
-        self.stt: Optional[SpeechToText] = None
+        self._mic_starting = False
+        self.tts: Optional[TTS | TTSProxy] = None
+        self.stt: Optional[SpeechToText | SpeechToTextProxy] = None
 
         self.root.report_callback_exception = self._tk_report_callback_exception
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -62,17 +125,17 @@ class TheLocalAIApp:
         self.chat.write(f"* {APP_TITLE} - Offline AI Assistant (+ optional web learning)", "system")
         self.chat.write(f"* Default model: {DEFAULT_MODEL}", "system")
         self.chat.write("* Commands: web: <query> | learn: <topic> | kb: <query> | kbclear", "system")
-        self.chat.write("* Extra: type `about` or `memorytopics`", "system")
+        self.chat.write("* Extra: type `about` or `memorytopics` | history | history: <search> | session: <id>", "system")
         self.chat.write("* Enter to send. Shift+Enter for new line.", "system")
         self.chat.write("* Tip: You can select + copy chat text now (Ctrl+C).", "system")
 
         self.root.after(150, lambda: self.input.focus_set())
-        self.root.after(80, self.poll)
         self.root.after(250, self._start_matrix)
 
         self._schedule_telemetry()
-        self._schedule_watchdog()
-        self.root.after(120, self._stt_poll)
+        start_maintenance()
+
+        serve_instance_ipc(self._on_ipc_request)
 
     def _tk_report_callback_exception(self, exc, val, tb):
         log.error("Tkinter callback exception:\n%s", "".join(traceback.format_exception(exc, val, tb)))
@@ -85,7 +148,7 @@ class TheLocalAIApp:
         if self.tts is not None:
             return True
         try:
-            self.tts = TTS()
+            self.tts = make_tts()
             return True
         except Exception as e:
             self.tts = None
@@ -101,23 +164,29 @@ class TheLocalAIApp:
         else:
             self.chat.write("[VOICE] TTS disabled.", "system")
 
+    def _stt_unavailable(self) -> None:
+        self.chat.write(
+            "[VOICE] Mic (STT) unavailable. Fix steps:\n"
+            "1) Install deps:\n"
+            "   pip install vosk sounddevice numpy\n"
+            "2) Download + unzip a Vosk model into:\n"
+            f"   {VOSK_MODEL_DIR}\n"
+            "   (folder must contain: conf/, am/, graph/ ...)\n"
+            "\nTip: After fixing, restart the app.",
+            "error",
+        )
+
     def _ensure_stt(self) -> bool:
         if self.stt is not None:
             return self.stt.enabled
-        self.stt = SpeechToText(VOSK_MODEL_DIR)
+        self.stt = make_stt(VOSK_MODEL_DIR, lambda text: self.dispatcher.put(("stt", text)))
         if not self.stt.enabled:
-            self.chat.write(
-                "[VOICE] Mic (STT) unavailable. Fix steps:\n"
-                "1) Install deps:\n"
-                "   pip install vosk sounddevice numpy\n"
-                "2) Download + unzip a Vosk model into:\n"
-                f"   {VOSK_MODEL_DIR}\n"
-                "   (folder must contain: conf/, am/, graph/ ...)\n"
-                "\nTip: After fixing, restart the app.",
-                "error",
-            )
+            self._stt_unavailable()
             return False
-        self.chat.write(f"[VOICE] Mic (STT) ready. Vosk model: {VOSK_MODEL_DIR}", "system")
+        if isinstance(self.stt, SpeechToTextProxy):
+            voice_process().on_exit = lambda code: self.dispatcher.put(("voice_exit", code))
+        else:
+            self.chat.write(f"[VOICE] Mic (STT) ready. Vosk model: {VOSK_MODEL_DIR}", "system")
         return True
 
     def _toggle_mic_listen(self):
@@ -125,11 +194,23 @@ class TheLocalAIApp:
             if not self._ensure_stt() or not self.stt:
                 self.mic_listen_var.set(False)
                 return
-            if not self.stt.start_listening():
-                self.mic_listen_var.set(False)
-                self.chat.write("[VOICE] Failed to start microphone. Check mic permissions + sounddevice.", "error")
+            if self._mic_starting:
                 return
-            self.chat.write("[VOICE] Mic listening ON. Speak a sentence; it will auto-send.", "system")
+            # Opening the mic can take seconds (the voice process loads Vosk on first listen), so it
+            # runs off the Tk thread and reports back through the dispatcher.
+            self._mic_starting = True
+            stt = self.stt
+            self.chat.write("[VOICE] Starting microphone...", "system")
+
+            def _worker():
+                try:
+                    ok = stt.start_listening()
+                except Exception:
+                    log.exception("Mic start failed")
+                    ok = False
+                self.dispatcher.put(("mic_started", ok))
+
+            threading.Thread(target=_worker, name="mic-start", daemon=True).start()
         else:
             if self.stt:
                 try:
@@ -138,21 +219,59 @@ class TheLocalAIApp:
                     pass
             self.chat.write("[VOICE] Mic listening OFF.", "system")
 
-    def _stt_poll(self):
-        if self.closing:
+    def _on_mic_started(self, ok: bool):
+        self._mic_starting = False
+        if not self.stt:
             return
-        if self.stt and self.stt.listening and not self.is_processing:
-            try:
-                while True:
-                    text = self.stt.in_q.get_nowait().strip()
-                    if not text:
-                        continue
-                    self.input.delete("1.0", tk.END)
-                    self.input.insert("1.0", text)
-                    self.on_send()
-            except queue.Empty:
-                pass
-        self.root.after(120, self._stt_poll)
+        if not self.mic_listen_var.get():
+            # Switched off while the start was in flight.
+            if ok:
+                self.stt.stop_listening()
+            return
+        if not ok:
+            self.mic_listen_var.set(False)
+            if not self.stt.enabled:
+                # The voice process only finds out about Vosk when asked to listen.
+                self._stt_unavailable()
+            else:
+                self.chat.write("[VOICE] Failed to start microphone. Check mic permissions + sounddevice.", "error")
+            return
+        self.chat.write("[VOICE] Mic listening ON. Speak a sentence; it will auto-send.", "system")
+
+    def _on_stt_text(self, text: str):
+        text = text.strip()[:MAX_USER_CHARS]
+        if not text or not (self.stt and self.stt.listening):
+            return
+        if self.is_processing:
+            self._external_pending.append(text)
+            return
+        self.input.delete("1.0", tk.END)
+        self.input.insert("1.0", text)
+        self.on_send()
+
+    def _on_ipc_request(self, req: dict):
+        # Runs on the IPC thread; hand over to the Tk loop via the dispatcher.
+        self.dispatcher.put(("ipc", req.get("text", "") if req.get("cmd") == "message" else ""))
+
+    def _raise_window(self):
+        try:
+            self.root.deiconify()
+            self.root.lift()
+            self.root.focus_force()
+        except Exception:
+            pass
+
+    def submit_external(self, text: str):
+        text = (text or "").strip()[:MAX_USER_CHARS]
+        if not text:
+            return
+        if self.is_processing:
+            self._external_pending.append(text)
+            self.chat.write("* Queued message from another launch.", "system")
+            return
+        self.input.delete("1.0", tk.END)
+        self.input.insert("1.0", text)
+        self.on_send()
 
     def _on_matrix_resize(self, _evt=None):
         if self.closing:
@@ -173,27 +292,68 @@ class TheLocalAIApp:
         if not self.closing:
             self.root.update_idletasks()
             self.matrix.start()
+            self.matrix_power.start()
 
     def _clear_chat(self):
         self.chat.clear()
-        self.chat.write("* Chat cleared.", "system")
+        self.session_id = new_session_id()
+        self.chat.write(f"* Chat cleared. New session: {self.session_id}", "system")
 
     def set_status(self, txt: str):
         self.status.set(txt)
         self.root.update_idletasks()
 
     def refresh_models(self, initial: bool = False):
+        registry = model_registry()
+        if initial and registry.names():
+            # Show the cached list right away; the refresh below updates it in the background.
+            self.dispatcher.put(("models", "|".join(registry.names())))
+
         def _worker():
-            models = ollama_list_models()
+            try:
+                models = registry.refresh()
+            except Exception as e:
+                log.warning("Model registry refresh failed: %s", e)
+                models = []
             if not models:
-                self.q.put(("error", "Could not load models from Ollama. Is Ollama running?"))
+                self.dispatcher.put(("error", "Could not load models from Ollama. Is Ollama running?"))
                 return
-            self.q.put(("models", "|".join(models)))
+            self.dispatcher.put(("models", "|".join(models)))
 
         threading.Thread(target=_worker, daemon=True).start()
         if not initial:
             self.chat.write("* Refreshing model list...", "system")
 
+    def _on_model_selected(self, _evt=None):
+        self.warmup_model(self.model_var.get().strip())
+
+    def warmup_model(self, model: str):
+        if not model or self.closing or self.model_state.get(model) in {"loading", "ready"}:
+            self._show_model_state()
+            return
+        self.model_state[model] = "loading"
+        self._show_model_state()
+
+        def _worker():
+            try:
+                ms = ollama_warmup(model, num_ctx=model_registry().profile(model).num_ctx or None)
+                self.dispatcher.put(("warmup", f"{model}|ready|{ms}"))
+            except Exception as e:
+                log.warning("Model warm-up failed for %s: %s", model, e)
+                self.dispatcher.put(("warmup", f"{model}|error|{e}"))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def _show_model_state(self):
+        model = self.model_var.get().strip()
+        state = self.model_state.get(model, "")
+        if state == "ready" and model in self.model_load_ms:
+            self.model_state_var.set(f"ready (load {self.model_load_ms[model] / 1000:.1f}s)")
+        elif state == "loading":
+            self.model_state_var.set("loading…")
+        else:
+            self.model_state_var.set(state)
+
     def _enter_send(self, _event):
         self.on_send()
         return "break"
@@ -220,35 +380,51 @@ class TheLocalAIApp:
         self.matrix.set_low_power(True)
 
         self._last_llm_started = time.perf_counter()
+        self._schedule_watchdog()
+        self._schedule_telemetry()
         model = self.model_var.get().strip() or DEFAULT_MODEL
-        threading.Thread(target=self._worker_chat, args=(model, message), daemon=True).start()
-
-    def _worker_chat(self, model: str, message: str):
+        if self.model_state.get(model) == "loading":
+            self.set_status("Waiting for model to load...")
+        self._active_trace = begin_trace("chat", model=model, session_id=self.session_id)
+        threading.Thread(
+            target=self._worker_chat,
+            args=(model, message, self.session_id, self._active_trace),
+            daemon=True,
+        ).start()
+
+    def _worker_chat(self, model: str, message: str, session_id: str, trace: Trace):
         con = None
         try:
             if self.closing:
                 return
             con = db_connect()
-            self.q.put(generate_reply(con, model, message, num_predict=self.num_predict, temperature=self.temperature))
+            self.dispatcher.put(
+                generate_reply(
+                    con,
+                    model,
+                    message,
+                    num_predict=self.num_predict,
+                    temperature=self.temperature,
+                    session_id=session_id,
+                    trace=trace,
+                    allow_local_files=True,
+                )
+            )
         except Exception as e:
             log.exception("Worker error")
-            self.q.put(e)
+            self.dispatcher.put(e)
         finally:
             if con:
                 con.close()
 
-    def poll(self):
+    def _dispatch(self, items: list):
         if self.closing:
             return
 
-        for _ in range(10):
-            try:
-                item = self.q.get_nowait()
-            except queue.Empty:
-                break
-
+        for item in items:
             if isinstance(item, Exception):
                 self.chat.write(f"[ERROR] {item}", "error")
+                self._finish_active_trace(error=str(item))
                 self._unlock_ui_after_task()
                 continue
 
@@ -258,21 +434,54 @@ class TheLocalAIApp:
                     self.chat.write(f"[ERROR] {payload}", "error")
                 elif kind == "models":
                     models = payload.split("|") if payload else [DEFAULT_MODEL]
+                    changed = list(self.model_combo["values"]) != models
                     self.model_combo["values"] = models
                     if self.model_var.get() not in models:
                         self.model_var.set(DEFAULT_MODEL if DEFAULT_MODEL in models else models[0])
-                    self.chat.write(f"* Models loaded: {len(models)}", "system")
+                    if changed:
+                        self.chat.write(f"* Models loaded: {len(models)}", "system")
+                    self.warmup_model(self.model_var.get().strip())
+                    # Keep the router's small model resident too, so cheap routes never pay a cold load.
+                    small = small_model_for(self.model_var.get().strip())
+                    if small:
+                        self.warmup_model(small)
+                elif kind == "warmup":
+                    model, state, detail = (payload.split("|", 2) + ["", ""])[:3]
+                    self.model_state[model] = state
+                    if state == "ready":
+                        self.model_load_ms[model] = int(detail or 0)
+                        log.info("Model %s ready (load %s ms)", model, detail)
+                    self._show_model_state()
+                elif kind == "ipc":
+                    self._raise_window()
+                    self.submit_external(payload)
+                elif kind == "stt":
+                    self._on_stt_text(payload)
+                elif kind == "mic_started":
+                    self._on_mic_started(payload)
+                elif kind == "voice_exit":
+                    if self.stt:
+                        self.stt.listening = False
+                    self.mic_listen_var.set(False)
+                    self.chat.write(f"[VOICE] Voice process stopped (exit code {payload}); it restarts on next use.", "error")
                 continue
 
             assert isinstance(item, ChatResult)
+            if item.model and self.model_state.get(item.model) != "ready":
+                self.model_state[item.model] = "ready"
+                self._show_model_state()
             if item.stored:
                 self.chat.write(f"[MEMORY] {item.stored}", "system")
 
+            render_started = time.perf_counter()
             txt = (item.assistant or "").strip()
             low = txt.lower()
             if ("don't have a voice" in low) or ("doesnt have a voice" in low) or ("doesn't have a voice" in low):
                 txt = "Voice is handled by the app. If you enable 'Voice (TTS)', I can speak responses aloud. The model itself only outputs text."
             self.chat.write(f"{APP_TITLE}: {txt}", "assistant")
+            self.chat.flush()
+            if self._active_trace is not None:
+                self._active_trace.add("ui.render", (time.perf_counter() - render_started) * 1000.0, start=render_started)
 
             if self.voice_enabled_var.get() and self._ensure_tts() and self.tts:
                 self.tts.speak(txt)
@@ -280,32 +489,63 @@ class TheLocalAIApp:
             if self._last_llm_started is not None:
                 self._last_llm_ms = int((time.perf_counter() - self._last_llm_started) * 1000)
                 self._last_llm_started = None
+            self._last_llm_cached = item.cached
+            self._cache_hits += int(item.cached)
 
+            self._finish_active_trace()
             self._unlock_ui_after_task()
 
-        self.root.after(80, self.poll)
+    def _finish_active_trace(self, error: str = ""):
+        trace, self._active_trace = self._active_trace, None
+        if trace is None:
+            return
+        if error:
+            trace.attrs["error"] = error[:300]
+        finish_trace(trace)
 
     def _unlock_ui_after_task(self):
         self.is_processing = False
+        self._cancel_timer("_watchdog_after")
         self.matrix.set_low_power(False)
         self.set_status("Ready")
+        if self._external_pending and not self.closing:
+            self.root.after_idle(lambda: self.submit_external(self._external_pending.pop(0)))
+
+    def _cancel_timer(self, attr: str):
+        timer = getattr(self, attr)
+        setattr(self, attr, None)
+        if timer:
+            try:
+                self.root.after_cancel(timer)
+            except Exception:
+                pass
 
     def _schedule_telemetry(self):
+        # Fast while a request is in flight, slow when idle, skipped while minimized.
+        self._cancel_timer("_telemetry_after")
         if self.closing:
             return
-        self._update_telemetry()
-        self._telemetry_after = self.root.after(700, self._schedule_telemetry)
+        try:
+            visible = self.root.state() != "iconic"
+        except Exception:
+            visible = True
+        if visible:
+            self._update_telemetry()
+        delay = UI_TELEMETRY_BUSY_MS if self.is_processing else UI_TELEMETRY_IDLE_MS
+        self._telemetry_after = self.root.after(delay, self._schedule_telemetry)
 
     def _update_telemetry(self):
-        qsize = self.q.qsize()
+        qsize = self.dispatcher.qsize()
         threads = threading.active_count()
-        mem_rows, kb_docs = db_counts_fast()
+        mem_rows, kb_docs, turns = db_counts_fast()
         fps = getattr(self.matrix, "fps", 0)
         avg_dt = getattr(self.matrix, "avg_dt_ms", 0.0)
         last_dt = getattr(self.matrix, "last_dt_ms", 0.0)
         llm_ms = self._last_llm_ms if self._last_llm_ms is not None else "-"
         proc_state = "YES" if self.is_processing else "NO"
         matrix_items = len(self.matrix_canvas.find_withtag("matrix"))
+        load = self.matrix_power.load_ratio
+        load_txt = f"{load * 100:.0f}%" if load is not None else "-"
 
         voice_state = "OFF"
         if self.voice_enabled_var.get():
@@ -320,43 +560,79 @@ class TheLocalAIApp:
         self.tlm_text.set(
             "Telemetry\n"
             f"- Processing: {proc_state} (age: {age})\n"
-            f"- Queue: {qsize}\n"
+            f"- Queue: {qsize} (wakeups {self.dispatcher.wakeups}, items {self.dispatcher.delivered})\n"
             f"- Threads: {threads}\n"
-            f"- DB: memory={mem_rows}  kb_docs={kb_docs}\n"
+            f"- DB: memory={mem_rows}  kb_docs={kb_docs}  turns={turns}\n"
+            f"- DB upkeep: {describe_maintenance(maintenance_worker().last)}\n"
             f"- Voice: {voice_state}\n"
             f"- Matrix: FPS={fps} | dt(avg/last)={avg_dt:.1f}/{last_dt:.1f} ms\n"
-            f"- Matrix items: {matrix_items}\n"
-            f"- Last LLM: {llm_ms} ms\n"
+            f"- Matrix items: {matrix_items} | {self.matrix.power_state}\n"
+            f"- System load: {load_txt}\n"
+            f"- Last LLM: {llm_ms} ms{' (cached)' if self._last_llm_cached else ''} | cache hits: {self._cache_hits}\n"
+            + self._stage_telemetry()
         )
 
+    def _stage_telemetry(self) -> str:
+        stats = stage_percentiles()
+        if not stats:
+            return ""
+        lines = ["Stages p50/p95 ms (n)"]
+        for name in TELEMETRY_STAGES:
+            if name in stats:
+                p50, p95, n = stats[name]
+                lines.append(f"- {name}: {p50:.0f}/{p95:.0f} ({n})")
+        routes = sorted(name for name in stats if name.startswith("route."))
+        if routes:
+            lines.append("Routes p50/p95 ms (n)")
+            for name in routes:
+                p50, p95, n = stats[name]
+                lines.append(f"- {name[6:]}: {p50:.0f}/{p95:.0f} ({n})")
+        return "\n".join(lines) + "\n"
+
     def _schedule_watchdog(self):
+        # One-shot per request: fires only if the reply has not arrived by the deadline.
+        self._cancel_timer("_watchdog_after")
         if self.closing:
             return
-        self._watchdog_tick()
-        self._watchdog_after = self.root.after(1000, self._schedule_watchdog)
+        self._watchdog_after = self.root.after(int(GEN_WATCHDOG_SECONDS * 1000) + 50, self._watchdog_tick)
 
     def _watchdog_tick(self):
+        self._watchdog_after = None
         if not self.is_processing or self._last_llm_started is None:
             return
         elapsed = time.perf_counter() - self._last_llm_started
-        if elapsed > GEN_WATCHDOG_SECONDS:
-            log.error("Watchdog: generation exceeded %ss, unlocking UI.", GEN_WATCHDOG_SECONDS)
-            self.chat.write("[ERROR] Generation timed out / hung. UI unlocked. Check Ollama + logs.", "error")
-            self._last_llm_started = None
-            self._unlock_ui_after_task()
+        if elapsed < GEN_WATCHDOG_SECONDS:
+            self._watchdog_after = self.root.after(int((GEN_WATCHDOG_SECONDS - elapsed) * 1000) + 50, self._watchdog_tick)
+            return
+        log.error("Watchdog: generation exceeded %ss, unlocking UI.", GEN_WATCHDOG_SECONDS)
+        self.chat.write("[ERROR] Generation timed out / hung. UI unlocked. Check Ollama + logs.", "error")
+        self._last_llm_started = None
+        self._finish_active_trace(error="watchdog timeout")
+        self._unlock_ui_after_task()
 
     def _dev_is_unlocked(self) -> bool:
         return self._dev_unlocked_until is not None and time.time() < self._dev_unlocked_until
 
     def _dev_tick(self):
-        self.dev_state.set("DEV" if self._dev_is_unlocked() else "STOCK")
-        if self._dev_after:
-            self.root.after_cancel(self._dev_after)
-        self._dev_after = self.root.after(1000, self._dev_tick)
+        # Scheduled only while unlocked, for the moment the unlock expires.
+        self._cancel_timer("_dev_after")
+        unlocked = self._dev_is_unlocked()
+        self.dev_state.set("DEV" if unlocked else "STOCK")
+        if unlocked and self._dev_unlocked_until is not None:
+            remaining_ms = int((self._dev_unlocked_until - time.time()) * 1000)
+            self._dev_after = self.root.after(max(50, remaining_ms + 50), self._dev_tick)
+        elif self._dev_unlocked_until is not None:
+            self._dev_unlocked_until = None
+            self._cancel_timer("_rss_after")
+            self._close_diagnostics()
+            self.chat.write("* Dev Mode session expired.", "system")
 
     def lock_dev_mode(self):
         self._dev_unlocked_until = None
+        self._cancel_timer("_dev_after")
         self.dev_state.set("STOCK")
+        self._cancel_timer("_rss_after")
+        self._close_diagnostics()
         self.chat.write("* Dev Mode locked.", "system")
 
     def unlock_dev_mode(self):
@@ -380,23 +656,79 @@ class TheLocalAIApp:
 
         self._dev_unlocked_until = time.time() + (DEV_SESSION_MINUTES * 60)
         self.chat.write(f"* Dev Mode unlocked for {DEV_SESSION_MINUTES} minutes.", "system")
-        self.dev_state.set("DEV")
+        self._dev_tick()
+        self._cancel_timer("_rss_after")
+        self._rss_tick()
+
+    def _rss_tick(self):
+        # The only RSS sampler: a fixed period while Dev Mode is unlocked keeps growth/h meaningful.
+        self._rss_after = None
+        if self.closing or not self._dev_is_unlocked():
+            return
+        rss_history.sample()
+        self._rss_after = self.root.after(DIAG_RSS_INTERVAL_MS, self._rss_tick)
+
+    def open_diagnostics(self):
+        if not self._dev_is_unlocked():
+            self.chat.write("* Diagnostics need Dev Mode (Unlock Dev).", "system")
+            return
+        if self._diag_window is not None:
+            self._diag_window.lift()
+            return
+        self._diag_window = DiagnosticsWindow(self.root, self._diagnostics_report, on_destroy=self._diagnostics_closed)
+
+    def _diagnostics_closed(self):
+        self._diag_window = None
+        # tracemalloc roughly doubles allocation cost; never leave it running without the panel.
+        stop_tracemalloc()
+
+    def _close_diagnostics(self):
+        if self._diag_window is not None:
+            self._diag_window.close()
+
+    def _diagnostics_report(self) -> str:
+        # Counters for the things that grow over a long session: Tk widgets and canvas items,
+        # the chat log, dispatcher backlog, threads (refresh_models, fetch pools) and the Python heap.
+        rss = rss_history.samples[-1][1] if rss_history.samples else None
+        growth = rss_history.growth_per_hour()
+        widgets = widget_counts(self.root)
+        chat_chars = self.chat.text.count("1.0", "end", "chars")
+        lines = [
+            f"RSS: {fmt_size(rss) if rss is not None else '-'} "
+            f"({'-' if growth is None else ('+' if growth >= 0 else '-') + fmt_size(abs(growth))}/h over {len(rss_history.samples)} samples)",
+            f"Tk widgets: {sum(widgets.values())} ("
+            + ", ".join(f"{name}={n}" for name, n in widgets.most_common(8))
+            + ")",
+            f"Matrix canvas: {len(self.matrix_canvas.find_withtag('matrix'))} matrix items, "
+            f"{len(self.matrix_canvas.find_all())} total",
+            f"ChatLog: {self.chat.line_count} lines, {chat_chars[0] if chat_chars else 0} chars in widget, "
+            f"{self.chat.spooled_entries} entries spooled",
+            f"Dispatcher: queue {self.dispatcher.qsize()}, wakeups {self.dispatcher.wakeups}, items {self.dispatcher.delivered}",
+            f"Python: {gc_summary()}",
+            "",
+            f"Threads ({threading.active_count()}): "
+            + ", ".join(f"{name}={n}" for name, n in sorted(thread_name_counts().items())),
+        ]
+        lines += [f"  {line}" for line in thread_inventory()]
+        return "\n".join(lines) + "\n"
 
     def on_close(self):
         self.closing = True
+        self._close_diagnostics()
 
-        for timer in [self._telemetry_after, self._watchdog_after, self._matrix_resize_after, self._dev_after]:
-            try:
-                if timer:
-                    self.root.after_cancel(timer)
-            except Exception:
-                pass
+        for attr in ("_telemetry_after", "_watchdog_after", "_matrix_resize_after", "_dev_after", "_rss_after"):
+            self._cancel_timer(attr)
+        self.dispatcher.close()
+        maintenance_worker().stop()
 
         if self.stt:
             self.stt.stop_listening()
         if self.tts:
             self.tts.shutdown()
+        shutdown_voice_process()
+        self.matrix_power.stop()
         self.matrix.stop()
+        self.chat.close()
 
         release_single_instance_lock()
 
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import BLOCKED_DOMAINS, BLOCKLIST_CHECK_SECONDS, BLOCKLIST_PATH
+
+log = logging.getLogger("thelocalai")
+
+# Accepted line formats (one rule per line, "#" or "!" starts a comment):
+#   example.com            example.com and every subdomain
+#   *.example.com          subdomains only
+#   ads.*.example.com      "*" matches exactly one label
+#   ||example.com^         adblock-style domain anchor, same as example.com
+#   0.0.0.0 example.com    hosts-file entry, same as example.com
+#   @@news.example.com     allow: overrides a block on a shorter suffix
+_HOSTS_PREFIX = re.compile(r"^(?:0\.0\.0\.0|127\.0\.0\.1|::1?)\s+")
+_LABEL = re.compile(r"^(?:\*|[a-z0-9_](?:[a-z0-9_-]*[a-z0-9_])?)$")
+
+
+@dataclass(frozen=True)
+class Rule:
+    pattern: str
+    allow: bool
+    subdomains_only: bool
+
+
+class _Node:
+    __slots__ = ("children", "rule")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.rule: Optional[Rule] = None
+
+
+def parse_rule(line: str) -> Optional[Tuple[List[str], Rule]]:
+    line = line.split("#", 1)[0].strip().lower()
+    if not line or line.startswith("!"):
+        return None
+    allow = line.startswith("@@")
+    if allow:
+        line = line[2:]
+    line = _HOSTS_PREFIX.sub("", line)
+    if line.startswith("||"):
+        line = line[2:]
+    line = line.rstrip("^").strip(".")
+    if line.startswith("www."):
+        line = line[4:]
+    subdomains_only = line.startswith("*.")
+    if subdomains_only:
+        line = line[2:]
+    labels = line.split(".")
+    if not line or not all(_LABEL.match(lb) for lb in labels):
+        return None
+    return list(reversed(labels)), Rule(line if not subdomains_only else "*." + line, allow, subdomains_only)
+
+
+class Blocklist:
+    # Rules live in a trie keyed by reversed labels (com -> example -> ads), so a lookup walks at
+    # most one path per host label, plus one "*" branch per level when wildcards are present.
+    def __init__(self, rules: Iterable[str] = ()):
+        self._root = _Node()
+        self.size = 0
+        for r in rules:
+            self.add(r)
+
+    def add(self, line: str) -> bool:
+        parsed = parse_rule(line)
+        if parsed is None:
+            return False
+        labels, rule = parsed
+        node = self._root
+        for lb in labels:
+            node = node.children.setdefault(lb, _Node())
+        # On a duplicate pattern, an allow rule wins.
+        if node.rule is None or rule.allow:
+            if node.rule is None:
+                self.size += 1
+            node.rule = rule
+        return True
+
+    def match(self, host: str) -> Optional[Rule]:
+        # The most specific (deepest) matching rule decides; allow beats block at equal depth.
+        host = (host or "").lower().strip(".")
+        if not host:
+            return None
+        labels = list(reversed(host.split(".")))
+        best: Optional[Rule] = None
+        best_depth = -1
+        frontier = [self._root]
+        for depth, lb in enumerate(labels, 1):
+            nxt = [c for node in frontier for c in (node.children.get(lb), node.children.get("*")) if c is not None]
+            for child in nxt:
+                r = child.rule
+                if r is None or (r.subdomains_only and depth == len(labels)):
+                    continue
+                if depth > best_depth or (depth == best_depth and r.allow):
+                    best, best_depth = r, depth
+            if not nxt:
+                break
+            frontier = nxt
+        return best
+
+    def is_blocked(self, host: str) -> bool:
+        r = self.match(host)
+        return r is not None and not r.allow
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def load_blocklist(path: Path = BLOCKLIST_PATH) -> Blocklist:
+    bl = Blocklist(BLOCKED_DOMAINS)
+    try:
+        bad = 0
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not bl.add(line) and line.split("#", 1)[0].strip() and not line.lstrip().startswith("!"):
+                    bad += 1
+        if bad:
+            log.warning("Blocklist %s: skipped %d unparseable lines", path, bad)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log.warning("Could not read blocklist %s: %s", path, e)
+    return bl
+
+
+class _Reloader:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked = float("-inf")
+        self._current = Blocklist(BLOCKED_DOMAINS)
+
+    def get(self) -> Blocklist:
+        now = time.monotonic()
+        if now - self._checked < BLOCKLIST_CHECK_SECONDS:
+            return self._current
+        with self._lock:
+            if now - self._checked < BLOCKLIST_CHECK_SECONDS:
+                return self._current
+            self._checked = now
+            try:
+                mtime: Optional[float] = self.path.stat().st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                # Build off to the side and swap, so readers never see a half-built trie.
+                started = time.perf_counter()
+                self._current = load_blocklist(self.path)
+                self._mtime = mtime
+                log.info(
+                    "Blocklist loaded: %d rules in %.0f ms", len(self._current), (time.perf_counter() - started) * 1000
+                )
+        return self._current
+
+
+_reloader = _Reloader(BLOCKLIST_PATH)
+
+
+def blocklist() -> Blocklist:
+    return _reloader.get()
@@ -1,14 +1,62 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import re
 import sqlite3
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
 
-from .config import ABOUT_TEXT, WEB_ENABLED, WEB_MAX_PAGES_TO_READ, WEB_MAX_RESULTS
-from .db import extract_memory, get_last_topic, kb_clear, list_memory_keys, load_memory_latest_per_key
-from .integrations import build_prompt, ddg_search, fetch_page_text_with_retries, ollama_generate
-from .runtime import cap, is_blocked_url
+from .config import (
+    ABOUT_TEXT,
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_TEMPERATURE,
+    RETRIEVAL_CANDIDATES,
+    RETRIEVAL_HALF_LIFE_HOURS,
+    RETRIEVAL_HISTORY_BUDGET,
+    RETRIEVAL_ITEM_CHARS,
+    RETRIEVAL_KB_BUDGET,
+    RETRIEVAL_RECENT_TURNS,
+    RETRIEVAL_TOP_K,
+    ROUTER_ENABLED,
+    ROUTER_FOLLOWUP_MAX_CHARS,
+    ROUTER_SMALL_MAX_PARAMS_B,
+    ROUTER_SMALL_MODEL,
+    ROUTES,
+    WEB_CONTEXT_BUDGET,
+    WEB_ENABLED,
+    WEB_FETCH_WAIT_SECONDS,
+    WEB_LEARN_CHARS_PER_PAGE,
+    WEB_MAX_PAGES_TO_READ,
+    WEB_MAX_RESULTS,
+)
+from .db import (
+    answer_cache_get,
+    answer_cache_put,
+    content_fingerprint,
+    extract_memory,
+    get_last_topic,
+    kb_add_doc,
+    kb_clear,
+    list_memory_keys,
+    list_sessions,
+    list_turns,
+    load_memory_latest_per_key,
+    record_turn,
+    search_kb,
+    search_turns,
+    set_last_topic,
+)
+from .embeddings import hybrid_search_kb, schedule_embedding
+from .fetcher import fetch_scheduler
+from .integrations import build_prompt, ddg_search, ollama_generate
+from .maintenance import activity
+from .models import model_registry
+from .passages import select_passages
+from .runtime import cap, domain_of, is_blocked_url
+from .tracing import Trace, begin_trace, current_trace, finish_trace, span, use_trace
 
 log = logging.getLogger("thelocalai")
 
@@ -17,30 +65,421 @@ log = logging.getLogger("thelocalai")
 class ChatResult:
     assistant: str
     stored: list[dict]
+    model: Optional[str] = None
+    prompt_chars: Optional[int] = None
+    sources: list[str] = field(default_factory=list)
+    latency_ms: Optional[int] = None
+    trace_id: Optional[str] = None
+    cached: bool = False
+    route: str = ""
 
 
-def generate_reply(con: sqlite3.Connection, model: str, message: str, *, num_predict: int, temperature: float) -> ChatResult:
-    stored = extract_memory(con, message)
-    memory = load_memory_latest_per_key(con)
-    last_topic = get_last_topic(con)
+@dataclass
+class Route:
+    name: str
+    model: str
+    num_predict: int
+    temperature: float
+
+
+def small_model_for(selected: str) -> str:
+    # The router's resident small model, or "" when there is none distinct from the selected one.
+    if not ROUTER_ENABLED:
+        return ""
+    registry = model_registry()
+    names = registry.names()
+    if ROUTER_SMALL_MODEL:
+        small = ROUTER_SMALL_MODEL if ROUTER_SMALL_MODEL in names else ""
+    else:
+        best: Optional[tuple[float, str]] = None
+        for name in names:
+            info = registry.get(name)
+            if info is None or "embed" in name.lower() or "bert" in (info.family or "").lower():
+                continue
+            params = info.params_b
+            if params and params <= ROUTER_SMALL_MAX_PARAMS_B and (best is None or params < best[0]):
+                best = (params, name)
+        small = best[1] if best else ""
+    return "" if small == selected else small
+
+
+def resolve_route(name: str, selected: str, num_predict: int, temperature: float) -> Optional[Route]:
+    spec = ROUTES.get(name) if ROUTER_ENABLED else None
+    if spec is None:
+        return None
+    model = spec.get("model", "selected")
+    if model == "selected":
+        model = selected
+    elif model == "small":
+        model = small_model_for(selected)
+        if not model:
+            return None
+    return Route(
+        name,
+        model,
+        int(spec.get("num_predict", num_predict)),
+        float(spec.get("temperature", temperature)),
+    )
+
+
+def _route_generate(route: Route, prompt: str, **kwargs) -> str:
+    # Every call for a model sends that model's num_ctx; a different value makes Ollama reload it.
+    kwargs.setdefault("num_ctx", model_registry().profile(route.model).num_ctx or None)
+    with span(f"route.{route.name}", model=route.model):
+        return ollama_generate(route.model, prompt, num_predict=route.num_predict, temperature=route.temperature, **kwargs)
+
+
+def _is_short_followup(message: str, selected: str, num_predict: int, temperature: float) -> bool:
+    intent = resolve_route("intent", selected, num_predict, temperature)
+    if intent is None or resolve_route("followup", selected, num_predict, temperature) is None:
+        return False
+    prompt = (
+        "Classify the user's message. Reply with exactly one word.\n"
+        "SHORT: a greeting, thanks, yes/no question, quick fact, or a brief follow-up to the previous answer.\n"
+        "LONG: anything needing explanation, code, steps, analysis or creative writing.\n\n"
+        f"Message: {message.strip()}\nAnswer:"
+    )
+    try:
+        return _route_generate(intent, prompt).strip().upper().startswith("SHORT")
+    except Exception as e:
+        log.warning("Intent routing failed, using the selected model: %s", e)
+        return False
+
+
+def _rewrite_web_query(arg: str, last_topic: str, selected: str, num_predict: int, temperature: float) -> str:
+    # Only worth a model call for long or referential requests; short ones are already queries.
+    words = re.findall(r"\w+", arg.lower())
+    referential = bool({"it", "this", "that", "they", "them", "those", "these"} & set(words))
+    if len(words) <= 6 and not referential:
+        return arg
+    route = resolve_route("web_query", selected, num_predict, temperature)
+    if route is None:
+        return arg
+    prompt = (
+        "Rewrite the request as a concise web search query of at most 8 words. "
+        "Reply with the query only.\n"
+        + (f"Previous topic: {last_topic}\n" if last_topic and referential else "")
+        + f"Request: {arg}\nQuery:"
+    )
+    try:
+        query = _route_generate(route, prompt).strip().splitlines()[0].strip(" \"'`")
+    except Exception as e:
+        log.warning("Web query rewrite failed: %s", e)
+        return arg
+    return query[:120] if len(query) >= 3 else arg
+
+
+def _format_turns(turns: list[dict], *, width: int = 240) -> str:
+    lines = []
+    for t in turns:
+        lines.append(f"#{t['id']} [{t['session_id']}] {t['created_at'][:19]} {t['role']}: {cap(t['content'], width)}")
+    return "\n".join(lines)
+
+
+def _ingest_command(con: sqlite3.Connection, arg: str) -> str:
+    from .kb_ingest import ingest_path
+
+    path = arg.strip().strip("\"'")
+    try:
+        with span("kb.ingest"):
+            stats = ingest_path(path, con=con)
+    except OSError as e:
+        return f"Could not ingest {path}: {e}"
+    if stats.chunks:
+        schedule_embedding()
+    return stats.summary()
+
+
+def _history_command(
+    con: sqlite3.Connection, c: str, arg: str, *, before_id: Optional[int] = None, scope: Optional[str] = None
+) -> str:
+    # With a scope (an isolated session) only that session's own turns are visible; without one
+    # (the desktop) the turns of isolated sessions are not.
+    if c == "history":
+        if not arg:
+            sessions = list_sessions(con, limit=15, session_id=scope)
+            if not sessions:
+                return "No conversation history stored yet."
+            return "Recent sessions:\n" + "\n".join(
+                f"- {s['session_id']} ({s['turns']} turns, started {s['started_at'][:19]})" for s in sessions
+            )
+        hits = search_turns(con, arg, limit=15, before_id=before_id, session_id=scope)
+        return _format_turns(hits) if hits else "No matching turns."
+    if scope and arg != scope:
+        return f"No turns stored for session {arg}."
+    turns = list_turns(con, session_id=arg, before_id=before_id, limit=60, include_isolated=bool(scope))
+    return _format_turns(turns, width=2000) if turns else f"No turns stored for session {arg}."
+
+
+def _answer_cache_key(
+    con: sqlite3.Connection,
+    model: str,
+    message: str,
+    num_predict: int,
+    temperature: float,
+    scope: Optional[str] = None,
+    last_topic: str = "",
+) -> str:
+    # The normalized message, not the prompt: a re-ask always carries the first ask in its
+    # retrieved history, so a prompt key would never repeat.
+    h = hashlib.sha256()
+    norm = " ".join(message.lower().split())
+    parts = (scope or "", model, str(int(num_predict)), f"{float(temperature):.3f}", content_fingerprint(con), last_topic, norm)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _cacheable_message(message: str) -> bool:
+    # "why?" or "tell me more about it" only mean something next to the conversation before
+    # them, which the key leaves out.
+    words = re.findall(r"\w+", message.lower())
+    return len(words) >= 3 and not ({"it", "this", "that", "they", "them", "those", "these"} & set(words))
+
+
+def _recency_weight(created_at: str, now: datetime) -> float:
+    try:
+        age_h = (now - datetime.fromisoformat(created_at)).total_seconds() / 3600.0
+    except Exception:
+        return 0.5
+    return 0.5 ** (max(0.0, age_h) / RETRIEVAL_HALF_LIFE_HOURS)
+
+
+def _pack(items: list[tuple[float, str]], budget: int, top_k: int) -> list[str]:
+    out: list[str] = []
+    seen: set[str] = set()
+    used = 0
+    for _, text in sorted(items, key=lambda it: it[0], reverse=True):
+        key = text.lower()
+        if key in seen:
+            continue
+        if used + len(text) > budget:
+            continue
+        out.append(text)
+        seen.add(key)
+        used += len(text) + 1
+        if len(out) >= top_k:
+            break
+    return out
+
+
+def retrieve_context(
+    con: sqlite3.Connection,
+    message: str,
+    *,
+    session_id: str,
+    before_id: Optional[int] = None,
+    kb_hybrid: bool = False,
+    isolate_history: bool = False,
+) -> tuple[str, str]:
+    # bm25 relevance weighted by recency, packed greedily into fixed budgets. The last few
+    # turns of this session always go in so short follow-ups still resolve.
+    now = datetime.now(timezone.utc)
+
+    recent = list_turns(con, session_id=session_id, before_id=before_id, limit=RETRIEVAL_RECENT_TURNS)
+    recent_ids = {t["id"] for t in recent}
+    recent_lines = [f"{t['role']}: {cap(t['content'], RETRIEVAL_ITEM_CHARS)}" for t in recent]
+    budget = RETRIEVAL_HISTORY_BUDGET - sum(len(x) + 1 for x in recent_lines)
+
+    turn_items: list[tuple[float, str]] = []
+    try:
+        hits = search_turns(
+            con,
+            message,
+            limit=RETRIEVAL_CANDIDATES,
+            before_id=before_id,
+            session_id=session_id if isolate_history else None,
+        )
+    except sqlite3.Error as e:
+        log.warning("turn retrieval failed: %s", e)
+        hits = []
+    for t in hits:
+        if t["id"] in recent_ids:
+            continue
+        score = -t["score"] * (0.35 + 0.65 * _recency_weight(t["created_at"], now))
+        if t["session_id"] == session_id:
+            score *= 1.25
+        text = f"[{t['created_at'][:10]}] {t['role']}: {cap(t['content'], RETRIEVAL_ITEM_CHARS)}"
+        turn_items.append((score, text))
+
+    history_parts = []
+    related = _pack(turn_items, max(0, budget), RETRIEVAL_TOP_K)
+    if related:
+        history_parts.append("Related earlier turns:\n" + "\n".join(related))
+    if recent_lines:
+        history_parts.append("Recent turns in this session:\n" + "\n".join(recent_lines))
+
+    kb_items: list[tuple[float, str]] = []
+    try:
+        if kb_hybrid:
+            docs = hybrid_search_kb(con, message, limit=RETRIEVAL_CANDIDATES)
+        else:
+            docs = search_kb(con, message, limit=RETRIEVAL_CANDIDATES)
+    except sqlite3.Error as e:
+        log.warning("kb retrieval failed: %s", e)
+        docs = []
+    for d in docs:
+        # bm25 is lower-is-better; fused hybrid scores are higher-is-better.
+        relevance = d["score"] if kb_hybrid else -d["score"]
+        score = relevance * (0.75 + 0.25 * _recency_weight(d["created_at"], now))
+        head = f"[{d.get('title') or d.get('topic') or 'KB'}] {d.get('url') or ''}".strip()
+        kb_items.append((score, head + "\n" + cap(d["content"], RETRIEVAL_ITEM_CHARS)))
+
+    kb_parts = _pack(kb_items, RETRIEVAL_KB_BUDGET, RETRIEVAL_TOP_K)
+    return "\n\n".join(history_parts), "\n\n".join(kb_parts)
+
+
+def generate_reply(
+    con: sqlite3.Connection,
+    model: str,
+    message: str,
+    *,
+    num_predict: int,
+    temperature: float,
+    session_id: str = "default",
+    on_token: Optional[Callable[[str], None]] = None,
+    trace: Optional[Trace] = None,
+    isolate_history: bool = False,
+    allow_local_files: bool = False,
+) -> ChatResult:
+    # A caller-supplied trace is left open so the caller can add UI/TTS spans before finishing it.
+    own_trace = trace is None
+    if trace is None:
+        trace = begin_trace("chat", model=model, session_id=session_id)
+    started = time.perf_counter()
+    try:
+        with use_trace(trace), activity():
+            with span("db.record_turn"):
+                turn_id = record_turn(con, session_id, "user", message, isolated=isolate_history)
+            result = _generate(
+                con,
+                model,
+                message,
+                num_predict=num_predict,
+                temperature=temperature,
+                session_id=session_id,
+                turn_id=turn_id,
+                on_token=on_token,
+                isolate_history=isolate_history,
+                allow_local_files=allow_local_files,
+            )
+            result.latency_ms = int((time.perf_counter() - started) * 1000)
+            result.trace_id = trace.trace_id
+            try:
+                record_turn(
+                    con,
+                    session_id,
+                    "assistant",
+                    result.assistant,
+                    model=result.model,
+                    latency_ms=result.latency_ms,
+                    prompt_chars=result.prompt_chars,
+                    sources=result.sources,
+                    isolated=isolate_history,
+                )
+            except sqlite3.Error:
+                log.exception("Failed to record assistant turn")
+        return result
+    finally:
+        if own_trace:
+            finish_trace(trace)
+
+
+def _generate(
+    con: sqlite3.Connection,
+    model: str,
+    message: str,
+    *,
+    num_predict: int,
+    temperature: float,
+    session_id: str,
+    turn_id: Optional[int],
+    on_token: Optional[Callable[[str], None]] = None,
+    isolate_history: bool = False,
+    allow_local_files: bool = False,
+) -> ChatResult:
+    # Isolated sessions get their own memory facts, last topic, history commands and cache entries.
+    scope = session_id if isolate_history else None
+    with span("memory.extract"):
+        stored = extract_memory(con, message, scope)
+    with span("db.load"):
+        memory = load_memory_latest_per_key(con, scope)
+        last_topic = get_last_topic(con, scope)
 
     cmd = message.strip().lower()
     if cmd == "about":
         return ChatResult(ABOUT_TEXT, stored)
     if cmd in {"memorytopics", "memory topics", "memory_topics"}:
-        keys = list_memory_keys(con)
+        keys = list_memory_keys(con, scope)
         text = "No personal memory stored yet." if not keys else "Stored memory keys:\n- " + "\n- ".join(keys)
         return ChatResult(text, stored)
     if cmd == "kbclear":
         kb_clear(con)
         return ChatResult("Knowledge base cleared.", stored)
+    m = re.match(r"kb\s+ingest\s+(.+)$", message.strip(), re.IGNORECASE)
+    if m:
+        # Reads arbitrary paths on this machine, so only the desktop UI (and the CLI) may use it.
+        if not allow_local_files:
+            return ChatResult("kb ingest is only available in the desktop app or via python -m thelocalai.kb_ingest.", stored)
+        return ChatResult(_ingest_command(con, m.group(1)), stored)
+
+    if cmd == "history":
+        return ChatResult(_history_command(con, "history", "", before_id=turn_id, scope=scope), stored)
 
-    m = re.search(r"\b(learn|web|kb)\s*:\s*(.+)$", message, re.IGNORECASE)
+    # Only a leading "cmd:" is a command; "summarize Roman history: key dates" is a normal message.
+    m = re.match(r"\s*(learn|web|kb|history|session)\s*:\s*(.+)$", message, re.IGNORECASE | re.DOTALL)
     c = (m.group(1).lower().strip() if m else "")
     arg = (m.group(2).strip() if m else "")
 
+    if c in {"history", "session"}:
+        return ChatResult(_history_command(con, c, arg, before_id=turn_id, scope=scope), stored)
+
+    if c in {"learn", "web", "kb"} and arg:
+        set_last_topic(con, arg, scope)
+
+    # Looked up before retrieval and web work so a re-ask (or a mic double-trigger) costs one query.
+    # learn: and web: go to the network every time: their answers follow live pages and list them as sources.
+    cache_key = None
+    if (
+        ANSWER_CACHE_ENABLED
+        and temperature <= ANSWER_CACHE_MAX_TEMPERATURE
+        and c not in {"learn", "web"}
+        and _cacheable_message(message)
+    ):
+        with span("llm.cache"):
+            cache_key = _answer_cache_key(con, model, message, num_predict, temperature, scope, last_topic)
+            cached = answer_cache_get(con, cache_key)
+        if cached is not None:
+            trace = current_trace()
+            if trace is not None:
+                trace.attrs["cached"] = True
+            if on_token is not None:
+                on_token(cached)
+            return ChatResult(cached, stored, model=model, prompt_chars=0, cached=True, route=c or "chat")
+
+    with span("retrieval"):
+        history, kb_material = retrieve_context(
+            con,
+            arg or message,
+            session_id=session_id,
+            before_id=turn_id,
+            kb_hybrid=(c == "kb"),
+            isolate_history=isolate_history,
+        )
+    if c == "kb" and not kb_material:
+        return ChatResult("No KB material matches that query. Use learn: <topic> to add some.", stored)
+
+    route_name = c if c in {"kb", "web", "learn"} else "chat"
+    if route_name == "chat" and len(message.strip()) <= ROUTER_FOLLOWUP_MAX_CHARS:
+        if _is_short_followup(message, model, num_predict, temperature):
+            route_name = "followup"
+    route = resolve_route(route_name, model, num_predict, temperature) or Route(route_name, model, num_predict, temperature)
+    profile = model_registry().profile(route.model, route.num_predict)
+
     web_used = c in {"learn", "web"}
     web_context = ""
+    sources: list[str] = []
 
     if c in {"learn", "web"}:
         if not WEB_ENABLED:
@@ -48,45 +487,95 @@ def generate_reply(con: sqlite3.Connection, model: str, message: str, *, num_pre
         if not arg:
             return ChatResult(f"Usage: {c}: <query/topic>", stored)
 
-        results = ddg_search(arg, max_results=WEB_MAX_RESULTS)
+        query = _rewrite_web_query(arg, last_topic, model, num_predict, temperature)
+        with span("web.search"):
+            results = ddg_search(query, max_results=WEB_MAX_RESULTS)
         if not results:
             return ChatResult("No search results found.", stored)
 
-        pages = []
+        # Drop blocked and persistently failing hosts before any fetch is attempted; their
+        # snippets only fill in if there are not enough readable pages.
+        sched = fetch_scheduler()
+        allowed, blocked = [], []
         for r in results:
-            if len(pages) >= WEB_MAX_PAGES_TO_READ:
-                break
-            url = r.get("url", "")
-            if not url:
-                continue
-            if is_blocked_url(url):
-                snip = (r.get("snippet") or "").strip()
-                if snip:
-                    pages.append({"url": url, "title": r.get("title", ""), "text": f"(Snippet) {snip}"})
-                continue
+            if r.get("url"):
+                skip = is_blocked_url(r["url"]) or sched.should_skip(domain_of(r["url"]))
+                (blocked if skip else allowed).append(r)
+        if blocked:
+            log.info("web: skipped %d blocked or failing results", len(blocked))
+
+        # Fetched concurrently; the scheduler spaces out requests to the same host.
+        allowed = allowed[:WEB_MAX_PAGES_TO_READ]
+        futures = [sched.submit(r["url"]) for r in allowed]
+        pages = []
+        for r, fut in zip(allowed, futures):
+            url = r["url"]
             try:
-                title, text = fetch_page_text_with_retries(url)
+                title, text = fut.result(timeout=WEB_FETCH_WAIT_SECONDS)
                 pages.append({"url": url, "title": title or r.get("title", ""), "text": text})
             except Exception:
                 snip = (r.get("snippet") or "").strip()
                 if snip:
                     pages.append({"url": url, "title": r.get("title", ""), "text": f"(Snippet) {snip}"})
+        for r in blocked:
+            if len(pages) >= WEB_MAX_PAGES_TO_READ:
+                break
+            snip = (r.get("snippet") or "").strip()
+            if snip:
+                pages.append({"url": r["url"], "title": r.get("title", ""), "text": f"(Snippet) {snip}"})
 
+        # Only the passages that match the query go into the prompt, not the head of each page.
+        budget = min(WEB_CONTEXT_BUDGET, profile.prompt_chars // 3)
+        with span("web.passages", pages=len(pages)):
+            selected = select_passages(arg if query == arg else f"{arg} {query}", pages, budget)
         lines = [f"QUERY/TOPIC: {arg}", "", "SOURCES:"]
-        for i, p in enumerate(pages, 1):
+        for i, idx in enumerate(sorted(selected), 1):
+            p = pages[idx]
             lines.append(f"[{i}] {p.get('title', '')}")
             lines.append(f"URL: {p.get('url', '')}")
-            lines.append((p.get("text", "") or "")[:3500])
+            lines.append("\n…\n".join(selected[idx]))
             lines.append("")
         web_context = "\n".join(lines).strip()
+        sources = [pages[idx]["url"] for idx in sorted(selected) if pages[idx].get("url")]
+
+        if c == "learn":
+            added = 0
+            with span("kb.store"):
+                for p in pages:
+                    # Pages are read deeper than they are stored: passage selection needs the whole page,
+                    # the KB only the head of it.
+                    text = (p.get("text") or "")[:WEB_LEARN_CHARS_PER_PAGE]
+                    if text and not text.startswith("(Snippet)"):
+                        added += len(kb_add_doc(con, arg, p.get("url", ""), p.get("title", ""), text))
+            if added:
+                log.info("learn: stored %d KB chunks for %r", added, arg)
+                schedule_embedding()
+
+    with span("prompt.build"):
+        prompt = build_prompt(
+            cap(memory, 6000),
+            message,
+            kb_material=kb_material,
+            web_context=web_context,
+            last_topic=last_topic,
+            web_used=web_used,
+            history=history,
+            max_chars=profile.prompt_chars,
+        )
 
-    prompt = build_prompt(
-        cap(memory, 6000),
-        message,
-        kb_material="",
-        web_context=cap(web_context, 18000),
-        last_topic=last_topic,
-        web_used=web_used,
+    route.num_predict = profile.num_predict
+    with span("llm.request", prompt_chars=len(prompt)):
+        response = _route_generate(route, prompt, num_ctx=profile.num_ctx or None, on_token=on_token)
+    if cache_key and response:
+        try:
+            answer_cache_put(con, cache_key, route.model, response)
+        except sqlite3.Error:
+            log.exception("Failed to store cached answer")
+    return ChatResult(
+        response,
+        stored,
+        model=route.model,
+        prompt_chars=len(prompt),
+        sources=sources,
+        route=route.name,
     )
-    response = ollama_generate(model, prompt, num_predict=num_predict, temperature=temperature)
-    return ChatResult(response, stored)
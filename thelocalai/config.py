@@ -1,37 +1,120 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 APP_TITLE = "TheLocalAI"
 
-OLLAMA_BASE = "http://127.0.0.1:11434"
+# Environment overrides are used by the benchmarks to point at a mock Ollama and a scratch data dir.
+OLLAMA_BASE = os.environ.get("THELOCALAI_OLLAMA_BASE", "http://127.0.0.1:11434").rstrip("/")
 OLLAMA_TAGS_URL = f"{OLLAMA_BASE}/api/tags"
 OLLAMA_GEN_URL = f"{OLLAMA_BASE}/api/generate"
+OLLAMA_EMBED_URL = f"{OLLAMA_BASE}/api/embeddings"
+OLLAMA_SHOW_URL = f"{OLLAMA_BASE}/api/show"
 
 DEFAULT_MODEL = "gemma3:4b"
 
+# Cheap tasks go to a small resident model; "small" resolves to ROUTER_SMALL_MODEL if installed,
+# else the smallest installed chat model up to ROUTER_SMALL_MAX_PARAMS_B. "selected" is the model
+# picked in the UI. Missing num_predict/temperature fall back to the request's values.
+ROUTER_ENABLED = True
+ROUTER_SMALL_MODEL = os.environ.get("THELOCALAI_SMALL_MODEL", "")
+ROUTER_SMALL_MAX_PARAMS_B = 2.0
+ROUTER_FOLLOWUP_MAX_CHARS = 120
+ROUTES = {
+    "intent": {"model": "small", "num_predict": 3, "temperature": 0.0},
+    "web_query": {"model": "small", "num_predict": 24, "temperature": 0.0},
+    "followup": {"model": "small", "num_predict": 160},
+    "chat": {"model": "selected"},
+    "kb": {"model": "selected"},
+    "web": {"model": "selected"},
+    "learn": {"model": "selected"},
+}
+
 APP_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = APP_DIR / "data"
-DATA_DIR.mkdir(exist_ok=True)
+DATA_DIR = Path(os.environ.get("THELOCALAI_DATA_DIR") or (APP_DIR / "data"))
+
+
+def ensure_data_dir() -> None:
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+
 
 DB_PATH = DATA_DIR / "memory.db"
+MODEL_CACHE_PATH = DATA_DIR / "models_cache.json"
 LOG_PATH = DATA_DIR / "thelocalai.log"
+LOG_JSON_PATH = DATA_DIR / "thelocalai.jsonl"
+TRACE_PATH = DATA_DIR / "traces.jsonl"
 
 MAX_USER_CHARS = 4000
 MAX_MEMORY_ROWS = 2000
 
 OLLAMA_CONNECT_TIMEOUT = 5
 OLLAMA_READ_TIMEOUT = 240
+OLLAMA_KEEP_ALIVE = "30m"
+# Match the server's OLLAMA_NUM_PARALLEL; requests beyond it queue in-process, fairly per session.
+OLLAMA_NUM_PARALLEL = max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL") or 1))
 
 DEFAULT_NUM_PREDICT = 320
 DEFAULT_TEMPERATURE = 0.25
 MAX_PROMPT_CHARS = 52000
+CHARS_PER_TOKEN = 3.2
+MODEL_CACHE_MAX_AGE_SECONDS = 6 * 3600
+
+KB_CHUNK_CHARS = 1200
+KB_COMPRESS_LEVEL = 6  # zlib level for stored chunk text
+
+# Idle-time DB upkeep (maintenance.py): FTS5 segment merges, incremental vacuum, WAL truncation.
+MAINT_ENABLED = True
+MAINT_INTERVAL_SECONDS = 15 * 60
+MAINT_IDLE_SECONDS = 60
+MAINT_FTS_MERGE_PAGES = 200  # per merge step
+MAINT_FTS_MERGE_STEPS = 20
+MAINT_VACUUM_PAGES = 2000
+MAINT_CONVERT_MAX_BYTES = 64 * 1024 * 1024  # larger pre-auto_vacuum DBs convert via the CLI only
+
+# "kb ingest <path>" / python -m thelocalai.kb_ingest: local txt/md/html files into the KB.
+KB_INGEST_WORKERS = max(1, min(8, (os.cpu_count() or 2) - 1))
+KB_INGEST_BATCH_CHUNKS = 5000  # rows per transaction
+KB_INGEST_MAX_BYTES = 20 * 1024 * 1024
+
+# Repeat questions at low temperature are answered from SQLite instead of the model.
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_TEMPERATURE = 0.3
+ANSWER_CACHE_TTL_SECONDS = 30 * 60
+ANSWER_CACHE_MAX_ROWS = 500
+
+EMBED_ENABLED = True
+EMBED_MODEL = "nomic-embed-text"
+EMBED_BATCH = 32
+# Transient embedding errors (timeouts, Ollama still starting) pause hybrid search with backoff;
+# only a missing model turns it off for the run.
+EMBED_RETRY_BASE_SECONDS = 5.0
+EMBED_RETRY_MAX_SECONDS = 300.0
+HYBRID_RRF_K = 60
+HYBRID_MIN_SIMILARITY = 0.3
+
+RETRIEVAL_TOP_K = 6
+RETRIEVAL_CANDIDATES = 30
+RETRIEVAL_RECENT_TURNS = 4
+RETRIEVAL_HALF_LIFE_HOURS = 72.0
+RETRIEVAL_HISTORY_BUDGET = 5000
+RETRIEVAL_KB_BUDGET = 6000
+RETRIEVAL_ITEM_CHARS = 900
 
 WEB_ENABLED = True
 WEB_TIMEOUT = 20
 WEB_MAX_RESULTS = 10
 WEB_MAX_PAGES_TO_READ = 5
-WEB_MAX_CHARS_PER_PAGE = 14000
+WEB_MAX_CHARS_PER_PAGE = 40000  # read for passage selection
+WEB_LEARN_CHARS_PER_PAGE = 14000  # stored in the KB per page by learn:
+
+# Web context is built from the query-relevant passages of each page (see passages.py).
+WEB_CONTEXT_BUDGET = 9000
+WEB_PASSAGE_CHARS = 700
+WEB_PASSAGES_PER_SOURCE = 4
+WEB_PASSAGE_DUP_JACCARD = 0.6
+WEB_PASSAGE_BM25_K1 = 1.2
+WEB_PASSAGE_BM25_B = 0.75
 
 BLOCKED_DOMAINS = {
     "researchgate.net",
@@ -43,19 +126,90 @@ BLOCKED_DOMAINS = {
     "medium.com",
 }
 
+# Extra rules, one per line (domains, *.wildcards, ||adblock^, hosts files, @@allow); reloaded when changed.
+BLOCKLIST_PATH = DATA_DIR / "blocklist.txt"
+BLOCKLIST_CHECK_SECONDS = 2.0
+
 OLLAMA_RETRIES = 2
 WEB_FETCH_RETRIES = 1
 
+# Page fetches go through fetcher.py: per-host token buckets, Retry-After and jittered backoff.
+WEB_FETCH_WORKERS = 4
+WEB_HOST_RATE = 0.5  # requests per second per host, after the burst is spent
+WEB_HOST_BURST = 2
+WEB_HOST_MAX_INFLIGHT = 2
+WEB_BACKOFF_BASE_SECONDS = 0.6
+WEB_BACKOFF_MAX_SECONDS = 20.0
+WEB_RETRY_AFTER_MAX_SECONDS = 20.0  # longer waits fail the fetch and cool the host down instead
+WEB_FETCH_WAIT_SECONDS = 90.0  # caller-side bound per page, queueing and retries included
+WEB_RESPECT_ROBOTS = True
+WEB_ROBOTS_TTL_SECONDS = 6 * 3600
+WEB_SEARCH_HOST = "duckduckgo.com"
+
+# Hosts that keep failing are skipped (snippet only) until they have been quiet this long.
+WEB_HOST_SKIP_MIN_ATTEMPTS = 4
+WEB_HOST_SKIP_SUCCESS = 0.25
+WEB_HOST_SKIP_SECONDS = 24 * 3600
+WEB_HOST_STATS_FLUSH_SECONDS = 10.0
+
 SINGLE_INSTANCE_HOST = "127.0.0.1"
 SINGLE_INSTANCE_PORT = 48231
+SINGLE_INSTANCE_TOKEN_PATH = DATA_DIR / "instance.token"
+IPC_TIMEOUT_SECONDS = 2.0
+IPC_MAX_BYTES = 64 * 1024
+
+API_HOST = "127.0.0.1"
+API_PORT = 48232
+API_WORKERS = 4
+API_MAX_BODY_BYTES = 64 * 1024
+
+# API sessions get their own history and last topic; the desktop chat recalls across sessions.
+SESSION_ISOLATE_HISTORY = True
+SESSION_IDLE_SECONDS = 3600
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_COMPRESS = True
+# JSON-lines log alongside the text log, for the tracing/telemetry tooling.
+LOG_JSON = os.environ.get("THELOCALAI_LOG_JSON", "") not in {"", "0", "false"}
+
+TRACE_ENABLED = True
+TRACE_BUFFER_SIZE = 200
+
+# The UI is woken by worker threads; these timers only run while something is active.
+UI_TELEMETRY_BUSY_MS = 700
+UI_TELEMETRY_IDLE_MS = 5000
+UI_FALLBACK_POLL_MS = 80  # only used when Tcl is built without threads
 
 GEN_WATCHDOG_SECONDS = max(OLLAMA_READ_TIMEOUT + 20, 300)
 
+CHATLOG_MAX_LINES = 4000
+CHATLOG_PAGE_ENTRIES = 150
+CHATLOG_SPOOL_PATH = DATA_DIR / "chatlog_spool.jsonl"
+CHATLOG_SPOOL_MAX_ENTRIES = 20000  # older entries are forgotten; the full history is in the turns table
+
+MATRIX_DEGRADED_FPS = 6
+MATRIX_IDLE_SECONDS = 120
+MATRIX_LOAD_PAUSE_RATIO = 0.85
+MATRIX_LOAD_RESUME_RATIO = 0.65
+MATRIX_POWER_CHECK_MS = 2000
+
 VOSK_MODEL_DIR = DATA_DIR / "vosk-model-en-us-0.22"
+# Run TTS, the mic stream and Vosk in a separate process (voice_worker.py) so audio work never
+# competes with Tk for the GIL and a crashing backend only takes down that process.
+VOICE_SUBPROCESS = os.environ.get("THELOCALAI_VOICE_SUBPROCESS", "") not in {"", "0", "false"}
+VOICE_PROCESS_TIMEOUT = 30.0  # first mic start loads the Vosk model
 
 DEV_AUTH_PATH = DATA_DIR / "dev_auth.json"
 DEV_SESSION_MINUTES = 30
 
+# Dev-mode diagnostics panel (diagnostics.py).
+DIAG_REFRESH_MS = 2000
+DIAG_RSS_INTERVAL_MS = 5000
+DIAG_RSS_SAMPLES = 720  # one per DIAG_RSS_INTERVAL_MS while dev mode is unlocked
+DIAG_TRACEMALLOC_FRAMES = 10
+DIAG_TOP_N = 15
+
 THEME = {
     "bg": "#000000",
     "panel_bg": "#050505",
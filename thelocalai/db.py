@@ -1,15 +1,108 @@
 from __future__ import annotations
 
+import json
+import logging
 import re
 import sqlite3
-from typing import List, Tuple
+import time
+import zlib
+from typing import Iterable, List, Optional, Tuple
 
-from .config import DB_PATH, MAX_MEMORY_ROWS
-from .runtime import now_utc_iso
+from .config import (
+    ANSWER_CACHE_MAX_ROWS,
+    ANSWER_CACHE_TTL_SECONDS,
+    DB_PATH,
+    KB_CHUNK_CHARS,
+    KB_COMPRESS_LEVEL,
+    MAX_MEMORY_ROWS,
+    ensure_data_dir,
+)
+from .runtime import now_utc_iso, sentence_chunks
+
+log = logging.getLogger("thelocalai")
+
+
+KB_DOCS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic TEXT NOT NULL,
+        source_url TEXT,
+        title TEXT,
+        body BLOB NOT NULL,
+        created_at TEXT NOT NULL
+    )
+"""
+KB_FTS_SQL = "CREATE VIRTUAL TABLE IF NOT EXISTS kb_fts USING fts5(topic, title, content, url, content='')"
+
+
+def pack_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), KB_COMPRESS_LEVEL)
+
+
+def unpack_text(blob: Optional[bytes]) -> str:
+    return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+
+def _migrate_last_topic(con: sqlite3.Connection) -> None:
+    # Older databases kept the last topic as "__last_topic[:<sid>]" rows in memory.
+    rows = con.execute(
+        "SELECT key, value, created_at FROM memory WHERE substr(key, 1, 12) = '__last_topic' ORDER BY id"
+    ).fetchall()
+    if not rows:
+        return
+    for key, value, created_at in rows:
+        con.execute(
+            "INSERT OR REPLACE INTO last_topic(scope,value,updated_at) VALUES(?,?,?)",
+            (key[len("__last_topic:") :] if key.startswith("__last_topic:") else "", value, created_at),
+        )
+    con.execute("DELETE FROM memory WHERE substr(key, 1, 12) = '__last_topic'")
+    con.commit()
+
+
+def _migrate_kb(con: sqlite3.Connection) -> None:
+    # Databases from before compressed storage have kb_docs.content and a kb_fts that stores its
+    # own copy of every chunk. Rebuild both once, keeping ids so kb_vectors stays valid.
+    cols = {r[1] for r in con.execute("PRAGMA table_info(kb_docs)")}
+    if "content" not in cols:
+        return
+    con.commit()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        if "content" not in {r[1] for r in con.execute("PRAGMA table_info(kb_docs)")}:
+            con.rollback()  # another connection got here first
+            return
+        con.execute(KB_DOCS_SQL.format(name="kb_docs_new"))
+        con.execute("DROP TABLE kb_fts")
+        con.execute(KB_FTS_SQL)
+        cur = con.execute("SELECT id, topic, source_url, title, content, created_at FROM kb_docs ORDER BY id")
+        moved = 0
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                break
+            con.executemany(
+                "INSERT INTO kb_docs_new(id,topic,source_url,title,body,created_at) VALUES(?,?,?,?,?,?)",
+                [(r[0], r[1], r[2], r[3], pack_text(r[4]), r[5]) for r in rows],
+            )
+            con.executemany(
+                "INSERT INTO kb_fts(rowid,topic,title,content,url) VALUES(?,?,?,?,?)",
+                [(r[0], r[1], r[3], r[4], r[2]) for r in rows],
+            )
+            moved += len(rows)
+        con.execute("DROP TABLE kb_docs")
+        con.execute("ALTER TABLE kb_docs_new RENAME TO kb_docs")
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    log.info("Migrated %d KB chunks to compressed storage", moved)
 
 
 def db_connect() -> sqlite3.Connection:
+    ensure_data_dir()
     con = sqlite3.connect(DB_PATH, timeout=10)
+    # Only takes effect when the file is new; maintenance.py converts older databases.
+    con.execute("PRAGMA auto_vacuum=INCREMENTAL;")
     con.execute("PRAGMA journal_mode=WAL;")
     con.execute("PRAGMA synchronous=NORMAL;")
     con.execute("PRAGMA busy_timeout=5000;")
@@ -20,50 +113,145 @@ def db_connect() -> sqlite3.Connection:
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             key TEXT NOT NULL,
             value TEXT NOT NULL,
-            created_at TEXT NOT NULL
+            created_at TEXT NOT NULL,
+            scope TEXT NOT NULL DEFAULT ''
         )
         """
     )
+    # scope is '' for the desktop chat, else the id of an isolated API session.
+    if "scope" not in {r[1] for r in con.execute("PRAGMA table_info(memory)")}:
+        con.execute("ALTER TABLE memory ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
     con.execute("CREATE INDEX IF NOT EXISTS idx_memory_key ON memory(key)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_memory_scope ON memory(scope, key)")
+
+    # Last learn:/web:/kb: topic per scope ('' for the desktop chat, else the isolated session id).
+    # Kept out of memory so per-session rows never push user facts out of its MAX_MEMORY_ROWS trim.
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS last_topic (
+            scope TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    _migrate_last_topic(con)
+
+    # Chunk text is stored once, zlib-compressed, in kb_docs.body. kb_fts is contentless (it keeps
+    # only the index, keyed by kb_docs.id), so rows must be deleted with the FTS 'delete' command.
+    con.execute(KB_DOCS_SQL.format(name="kb_docs"))
+    con.execute(KB_FTS_SQL)
+    _migrate_kb(con)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_kb_topic ON kb_docs(topic)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_kb_url ON kb_docs(source_url)")
 
     con.execute(
         """
-        CREATE TABLE IF NOT EXISTS kb_docs (
+        CREATE TABLE IF NOT EXISTS kb_vectors (
+            doc_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            dim INTEGER NOT NULL,
+            vec BLOB NOT NULL
+        )
+        """
+    )
+
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS turns (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            topic TEXT NOT NULL,
-            source_url TEXT,
-            title TEXT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
             content TEXT NOT NULL,
-            created_at TEXT NOT NULL
+            model TEXT,
+            latency_ms INTEGER,
+            prompt_chars INTEGER,
+            sources TEXT,
+            created_at TEXT NOT NULL,
+            isolated INTEGER NOT NULL DEFAULT 0
         )
         """
     )
-    con.execute("CREATE INDEX IF NOT EXISTS idx_kb_topic ON kb_docs(topic)")
+    # Turns of isolated API sessions never show up in unscoped (desktop) search or listings.
+    if "isolated" not in {r[1] for r in con.execute("PRAGMA table_info(turns)")}:
+        con.execute("ALTER TABLE turns ADD COLUMN isolated INTEGER NOT NULL DEFAULT 0")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, id)")
+    con.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts
+        USING fts5(content, content='turns', content_rowid='id');
+        """
+    )
+    con.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS turns_ai AFTER INSERT ON turns BEGIN
+            INSERT INTO turns_fts(rowid, content) VALUES (new.id, new.content);
+        END
+        """
+    )
+
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_hit REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_answer_cache_last_hit ON answer_cache(last_hit)")
+
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS kb_files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha1 TEXT NOT NULL,
+            chunks INTEGER NOT NULL,
+            ingested_at TEXT NOT NULL
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_kb_files_sha1 ON kb_files(sha1)")
 
     con.execute(
         """
-        CREATE VIRTUAL TABLE IF NOT EXISTS kb_fts
-        USING fts5(topic, title, content, url, doc_id UNINDEXED);
+        CREATE TABLE IF NOT EXISTS host_stats (
+            host TEXT PRIMARY KEY,
+            ok INTEGER NOT NULL DEFAULT 0,
+            fail INTEGER NOT NULL DEFAULT 0,
+            success REAL NOT NULL DEFAULT 1.0,
+            latency_ms REAL NOT NULL DEFAULT 0.0,
+            last_status INTEGER NOT NULL DEFAULT 0,
+            cooldown_until REAL NOT NULL DEFAULT 0.0,
+            updated_at REAL NOT NULL
+        )
         """
     )
     con.commit()
     return con
 
 
-def upsert_memory(con: sqlite3.Connection, key: str, value: str) -> None:
+def upsert_memory(con: sqlite3.Connection, key: str, value: str, session_id: Optional[str] = None) -> None:
+    scope = session_id or ""
     con.execute(
-        "INSERT INTO memory(key,value,created_at) VALUES(?,?,?)",
-        (key, value.strip(), now_utc_iso()),
+        "INSERT INTO memory(key,value,created_at,scope) VALUES(?,?,?,?)",
+        (key, value.strip(), now_utc_iso(), scope),
     )
     con.commit()
+    # Trimmed per scope, so a busy API session can't push the desktop user's facts out.
     con.execute(
-        "DELETE FROM memory WHERE id NOT IN (SELECT id FROM memory ORDER BY id DESC LIMIT ?)",
-        (MAX_MEMORY_ROWS,),
+        "DELETE FROM memory WHERE scope = ? AND id NOT IN (SELECT id FROM memory WHERE scope = ? ORDER BY id DESC LIMIT ?)",
+        (scope, scope, MAX_MEMORY_ROWS),
     )
     con.commit()
 
 
-def load_memory_latest_per_key(con: sqlite3.Connection) -> str:
+def load_memory_latest_per_key(con: sqlite3.Connection, session_id: Optional[str] = None) -> str:
     rows = con.execute(
         """
         SELECT m.key, m.value
@@ -71,10 +259,12 @@ def load_memory_latest_per_key(con: sqlite3.Connection) -> str:
         JOIN (
             SELECT key, MAX(id) AS max_id
             FROM memory
+            WHERE scope = ?
             GROUP BY key
         ) t ON m.id = t.max_id
         ORDER BY m.key ASC
-        """
+        """,
+        (session_id or "",),
     ).fetchall()
     if not rows:
         return ""
@@ -82,17 +272,35 @@ def load_memory_latest_per_key(con: sqlite3.Connection) -> str:
     return "\n".join([f"{k}: {v}" for (k, v) in rows])
 
 
-def list_memory_keys(con: sqlite3.Connection) -> List[str]:
-    rows = con.execute("SELECT DISTINCT key FROM memory WHERE key NOT LIKE '__%' ORDER BY key ASC").fetchall()
+def list_memory_keys(con: sqlite3.Connection, session_id: Optional[str] = None) -> List[str]:
+    rows = con.execute(
+        "SELECT DISTINCT key FROM memory WHERE scope = ? AND key NOT LIKE '__%' ORDER BY key ASC", (session_id or "",)
+    ).fetchall()
     return [r[0] for r in rows if r and r[0]]
 
 
-def get_last_topic(con: sqlite3.Connection) -> str:
-    row = con.execute("SELECT value FROM memory WHERE key='__last_topic' ORDER BY id DESC LIMIT 1").fetchone()
+def get_last_topic(con: sqlite3.Connection, session_id: Optional[str] = None) -> str:
+    # Isolated sessions keep their own last topic; the desktop chat shares the global one.
+    row = con.execute("SELECT value FROM last_topic WHERE scope = ?", (session_id or "",)).fetchone()
     return (row[0] if row else "").strip()
 
 
-def extract_memory(con: sqlite3.Connection, msg: str) -> list[dict]:
+def set_last_topic(con: sqlite3.Connection, value: str, session_id: Optional[str] = None) -> None:
+    con.execute(
+        "INSERT OR REPLACE INTO last_topic(scope,value,updated_at) VALUES(?,?,?)",
+        (session_id or "", value.strip(), now_utc_iso()),
+    )
+    # Session rows are only useful while the session is around; keep the most recent ones
+    # (REPLACE re-inserts, so rowid order is update order).
+    con.execute(
+        "DELETE FROM last_topic WHERE scope != '' AND scope NOT IN "
+        "(SELECT scope FROM last_topic WHERE scope != '' ORDER BY rowid DESC LIMIT ?)",
+        (MAX_MEMORY_ROWS,),
+    )
+    con.commit()
+
+
+def extract_memory(con: sqlite3.Connection, msg: str, session_id: Optional[str] = None) -> list[dict]:
     stored: list[dict] = []
     text = msg.strip()
 
@@ -103,7 +311,7 @@ def extract_memory(con: sqlite3.Connection, msg: str) -> list[dict]:
     )
     if m:
         name = m.group(1).strip()
-        upsert_memory(con, "user_name", name)
+        upsert_memory(con, "user_name", name, session_id)
         stored.append({"key": "user_name", "value": name})
 
     m = re.search(
@@ -113,21 +321,338 @@ def extract_memory(con: sqlite3.Connection, msg: str) -> list[dict]:
     )
     if m:
         dog = m.group(1).strip()
-        upsert_memory(con, "dog_name", dog)
-        upsert_memory(con, "dog_owner", "user")
+        upsert_memory(con, "dog_name", dog, session_id)
+        upsert_memory(con, "dog_owner", "user", session_id)
         stored.append({"key": "dog_name", "value": dog})
         stored.append({"key": "dog_owner", "value": "user"})
 
     return stored
 
 
+def fts_query(text: str) -> str:
+    terms = re.findall(r"\w+", (text or "").lower())
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+def _turn_row(row: tuple) -> dict:
+    tid, session_id, role, content, model, latency_ms, prompt_chars, sources, created_at = row[:9]
+    return {
+        "id": tid,
+        "session_id": session_id,
+        "role": role,
+        "content": content,
+        "model": model,
+        "latency_ms": latency_ms,
+        "prompt_chars": prompt_chars,
+        "sources": json.loads(sources) if sources else [],
+        "created_at": created_at,
+    }
+
+
+_TURN_COLS = "t.id, t.session_id, t.role, t.content, t.model, t.latency_ms, t.prompt_chars, t.sources, t.created_at"
+
+
+def record_turn(
+    con: sqlite3.Connection,
+    session_id: str,
+    role: str,
+    content: str,
+    *,
+    model: Optional[str] = None,
+    latency_ms: Optional[int] = None,
+    prompt_chars: Optional[int] = None,
+    sources: Optional[Iterable[str]] = None,
+    isolated: bool = False,
+) -> int:
+    cur = con.execute(
+        "INSERT INTO turns(session_id,role,content,model,latency_ms,prompt_chars,sources,created_at,isolated) VALUES(?,?,?,?,?,?,?,?,?)",
+        (
+            session_id,
+            role,
+            content,
+            model,
+            latency_ms,
+            prompt_chars,
+            json.dumps(list(sources)) if sources else None,
+            now_utc_iso(),
+            int(bool(isolated)),
+        ),
+    )
+    con.commit()
+    return int(cur.lastrowid)
+
+
+def list_turns(
+    con: sqlite3.Connection,
+    *,
+    session_id: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+    include_isolated: bool = True,
+) -> list[dict]:
+    where, args = [], []
+    if session_id:
+        where.append("t.session_id = ?")
+        args.append(session_id)
+    if not include_isolated:
+        where.append("t.isolated = 0")
+    if before_id:
+        where.append("t.id < ?")
+        args.append(int(before_id))
+    sql = f"SELECT {_TURN_COLS} FROM turns t"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY t.id DESC LIMIT ?"
+    args.append(int(limit))
+    rows = con.execute(sql, args).fetchall()
+    return [_turn_row(r) for r in reversed(rows)]
+
+
+def search_turns(
+    con: sqlite3.Connection,
+    query: str,
+    *,
+    limit: int = 20,
+    offset: int = 0,
+    before_id: Optional[int] = None,
+    session_id: Optional[str] = None,
+) -> list[dict]:
+    q = fts_query(query)
+    if not q:
+        return []
+    where, args = ["turns_fts MATCH ?", "t.id < ?"], [q, int(before_id) if before_id else 2**62]
+    if session_id:
+        where.append("t.session_id = ?")
+        args.append(session_id)
+    else:
+        where.append("t.isolated = 0")
+    rows = con.execute(
+        f"""
+        SELECT {_TURN_COLS}, bm25(turns_fts) AS score
+        FROM turns_fts JOIN turns t ON t.id = turns_fts.rowid
+        WHERE {" AND ".join(where)}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+        """,
+        (*args, int(limit), int(offset)),
+    ).fetchall()
+    out = []
+    for r in rows:
+        d = _turn_row(r)
+        d["score"] = float(r[9])
+        out.append(d)
+    return out
+
+
+def search_kb(con: sqlite3.Connection, query: str, *, limit: int = 20) -> list[dict]:
+    q = fts_query(query)
+    if not q:
+        return []
+    rows = con.execute(
+        """
+        SELECT d.id, d.topic, d.title, d.source_url, d.body, d.created_at,
+               bm25(kb_fts, 2.0, 1.5, 1.0, 0.5) AS score
+        FROM kb_fts JOIN kb_docs d ON d.id = kb_fts.rowid
+        WHERE kb_fts MATCH ?
+        ORDER BY score
+        LIMIT ?
+        """,
+        (q, int(limit)),
+    ).fetchall()
+    return [
+        {
+            "id": r[0],
+            "topic": r[1],
+            "title": r[2],
+            "url": r[3],
+            "content": unpack_text(r[4]),
+            "created_at": r[5],
+            "score": float(r[6]),
+        }
+        for r in rows
+    ]
+
+
+def list_sessions(con: sqlite3.Connection, *, limit: int = 20, offset: int = 0, session_id: Optional[str] = None) -> list[dict]:
+    where, args = "WHERE isolated = 0", []
+    if session_id:
+        where, args = "WHERE session_id = ?", [session_id]
+    rows = con.execute(
+        f"""
+        SELECT session_id, COUNT(*), MIN(created_at), MAX(id)
+        FROM turns
+        {where}
+        GROUP BY session_id
+        ORDER BY MAX(id) DESC
+        LIMIT ? OFFSET ?
+        """,
+        (*args, int(limit), int(offset)),
+    ).fetchall()
+    return [{"session_id": r[0], "turns": r[1], "started_at": r[2]} for r in rows]
+
+
+def kb_delete_url(con: sqlite3.Connection, url: str) -> int:
+    rows = con.execute("SELECT id, topic, title, body, source_url FROM kb_docs WHERE source_url = ?", (url,)).fetchall()
+    if not rows:
+        return 0
+    ids = [r[0] for r in rows]
+    marks = ",".join("?" * len(ids))
+    # Contentless FTS: the delete must repeat the exact values that were indexed.
+    con.executemany(
+        "INSERT INTO kb_fts(kb_fts,rowid,topic,title,content,url) VALUES('delete',?,?,?,?,?)",
+        [(r[0], r[1], r[2], unpack_text(r[3]), r[4]) for r in rows],
+    )
+    con.execute(f"DELETE FROM kb_vectors WHERE doc_id IN ({marks})", ids)
+    con.execute(f"DELETE FROM kb_docs WHERE id IN ({marks})", ids)
+    return len(ids)
+
+
+def kb_add_doc(
+    con: sqlite3.Connection,
+    topic: str,
+    url: str,
+    title: str,
+    content: str,
+    *,
+    chunks: Optional[List[str]] = None,
+    commit: bool = True,
+) -> list[int]:
+    # Bulk callers pass pre-split chunks and commit once per batch.
+    content = (content or "").strip()
+    if not content and not chunks:
+        return []
+    if url:
+        kb_delete_url(con, url)
+    now = now_utc_iso()
+    ids: list[int] = []
+    for chunk in chunks if chunks is not None else sentence_chunks(content, max_len=KB_CHUNK_CHARS):
+        cur = con.execute(
+            "INSERT INTO kb_docs(topic,source_url,title,body,created_at) VALUES(?,?,?,?,?)",
+            (topic, url, title, pack_text(chunk), now),
+        )
+        doc_id = int(cur.lastrowid)
+        con.execute(
+            "INSERT INTO kb_fts(rowid,topic,title,content,url) VALUES(?,?,?,?,?)",
+            (doc_id, topic, title, chunk, url),
+        )
+        ids.append(doc_id)
+    if commit:
+        con.commit()
+    return ids
+
+
+def kb_get_docs(con: sqlite3.Connection, ids: list[int]) -> dict[int, dict]:
+    if not ids:
+        return {}
+    marks = ",".join("?" * len(ids))
+    rows = con.execute(
+        f"SELECT id, topic, title, source_url, body, created_at FROM kb_docs WHERE id IN ({marks})",
+        list(ids),
+    ).fetchall()
+    return {
+        r[0]: {"id": r[0], "topic": r[1], "title": r[2], "url": r[3], "content": unpack_text(r[4]), "created_at": r[5]}
+        for r in rows
+    }
+
+
 def kb_clear(con: sqlite3.Connection) -> None:
     con.execute("DELETE FROM kb_docs")
-    con.execute("DELETE FROM kb_fts")
+    con.execute("INSERT INTO kb_fts(kb_fts) VALUES('delete-all')")
+    con.execute("DELETE FROM kb_vectors")
+    con.execute("DELETE FROM kb_files")
+    con.commit()
+
+
+def kb_files_under(con: sqlite3.Connection, root: str) -> dict[str, tuple]:
+    # {path: (mtime_ns, size, sha1, chunks)} for files previously ingested from below root.
+    prefix = root.rstrip("/\\")
+    rows = con.execute(
+        "SELECT path, mtime_ns, size, sha1, chunks FROM kb_files WHERE path = ? OR substr(path, 1, ?) IN (?, ?)",
+        (prefix, len(prefix) + 1, prefix + "/", prefix + "\\"),
+    ).fetchall()
+    return {r[0]: (r[1], r[2], r[3], r[4]) for r in rows}
+
+
+def kb_file_by_sha1(con: sqlite3.Connection, sha1: str) -> Optional[str]:
+    row = con.execute("SELECT path FROM kb_files WHERE sha1 = ? AND chunks > 0 LIMIT 1", (sha1,)).fetchone()
+    return row[0] if row else None
+
+
+def kb_file_duplicates(con: sqlite3.Connection, sha1: str) -> list[str]:
+    # Files recorded as copies of sha1 but not indexed themselves.
+    rows = con.execute("SELECT path FROM kb_files WHERE sha1 = ? AND chunks = 0 ORDER BY path", (sha1,)).fetchall()
+    return [r[0] for r in rows]
+
+
+def kb_file_put(con: sqlite3.Connection, path: str, mtime_ns: int, size: int, sha1: str, chunks: int) -> None:
+    con.execute(
+        "INSERT OR REPLACE INTO kb_files(path,mtime_ns,size,sha1,chunks,ingested_at) VALUES(?,?,?,?,?,?)",
+        (path, mtime_ns, size, sha1, chunks, now_utc_iso()),
+    )
+
+
+def kb_file_delete(con: sqlite3.Connection, path: str, url: str) -> int:
+    con.execute("DELETE FROM kb_files WHERE path = ?", (path,))
+    return kb_delete_url(con, url)
+
+
+def content_fingerprint(con: sqlite3.Connection) -> str:
+    # Changes whenever memory facts or KB chunks are added, replaced or cleared.
+    mem = con.execute("SELECT COUNT(*), MAX(id) FROM memory WHERE substr(key, 1, 2) != '__'").fetchone()
+    kb = con.execute("SELECT COUNT(*), MAX(id) FROM kb_docs").fetchone()
+    return f"m{mem[0]}:{mem[1] or 0}|k{kb[0]}:{kb[1] or 0}"
+
+
+def answer_cache_get(con: sqlite3.Connection, key: str) -> Optional[str]:
+    now = time.time()
+    row = con.execute(
+        "SELECT response FROM answer_cache WHERE key = ? AND created_at >= ?",
+        (key, now - ANSWER_CACHE_TTL_SECONDS),
+    ).fetchone()
+    if not row:
+        return None
+    con.execute("UPDATE answer_cache SET last_hit = ?, hits = hits + 1 WHERE key = ?", (now, key))
+    con.commit()
+    return row[0]
+
+
+def answer_cache_put(con: sqlite3.Connection, key: str, model: str, response: str) -> None:
+    now = time.time()
+    con.execute(
+        "INSERT OR REPLACE INTO answer_cache(key,model,response,created_at,last_hit,hits) VALUES(?,?,?,?,?,0)",
+        (key, model, response, now, now),
+    )
+    # TTL first, then least-recently-used beyond the row cap.
+    con.execute("DELETE FROM answer_cache WHERE created_at < ?", (now - ANSWER_CACHE_TTL_SECONDS,))
+    con.execute(
+        "DELETE FROM answer_cache WHERE key NOT IN (SELECT key FROM answer_cache ORDER BY last_hit DESC LIMIT ?)",
+        (ANSWER_CACHE_MAX_ROWS,),
+    )
+    con.commit()
+
+
+def answer_cache_clear(con: sqlite3.Connection) -> None:
+    con.execute("DELETE FROM answer_cache")
+    con.commit()
+
+
+HOST_STATS_COLUMNS = ("host", "ok", "fail", "success", "latency_ms", "last_status", "cooldown_until", "updated_at")
+
+
+def host_stats_load(con: sqlite3.Connection) -> list[dict]:
+    rows = con.execute(f"SELECT {','.join(HOST_STATS_COLUMNS)} FROM host_stats").fetchall()
+    return [dict(zip(HOST_STATS_COLUMNS, row)) for row in rows]
+
+
+def host_stats_save(con: sqlite3.Connection, rows: Iterable[dict]) -> None:
+    con.executemany(
+        f"INSERT OR REPLACE INTO host_stats({','.join(HOST_STATS_COLUMNS)}) VALUES({','.join('?' * len(HOST_STATS_COLUMNS))})",
+        [tuple(r[c] for c in HOST_STATS_COLUMNS) for r in rows],
+    )
     con.commit()
 
 
-def db_counts_fast() -> Tuple[int, int]:
+def db_counts_fast() -> Tuple[int, int, int]:
     try:
         con = sqlite3.connect(DB_PATH, timeout=1)
         try:
@@ -138,7 +663,11 @@ def db_counts_fast() -> Tuple[int, int]:
             kb = con.execute("SELECT COUNT(*) FROM kb_docs").fetchone()[0]
         except Exception:
             kb = 0
+        try:
+            turns = con.execute("SELECT MAX(id) FROM turns").fetchone()[0] or 0
+        except Exception:
+            turns = 0
         con.close()
-        return int(mem), int(kb)
+        return int(mem), int(kb), int(turns)
     except Exception:
-        return (0, 0)
+        return (0, 0, 0)
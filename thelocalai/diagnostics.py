@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import gc
+import linecache
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Deque, List, Optional, Tuple
+
+from .config import DIAG_RSS_SAMPLES, DIAG_TOP_N, DIAG_TRACEMALLOC_FRAMES
+from .runtime import optional_import
+
+# Allocations made by the profiler itself, or by imports, are noise when hunting leaks.
+_NOISE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> Optional[int]:
+    psutil = optional_import("psutil")
+    if psutil is not None:
+        try:
+            return int(psutil.Process().memory_info().rss)
+        except Exception:
+            pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class RssHistory:
+    def __init__(self, maxlen: int = DIAG_RSS_SAMPLES):
+        self.samples: Deque[Tuple[float, int]] = deque(maxlen=maxlen)
+
+    def sample(self) -> Optional[int]:
+        rss = rss_bytes()
+        if rss is not None:
+            self.samples.append((time.time(), rss))
+        return rss
+
+    def growth_per_hour(self) -> Optional[float]:
+        if len(self.samples) < 2:
+            return None
+        (t0, r0), (t1, r1) = self.samples[0], self.samples[-1]
+        return (r1 - r0) / max(1.0, t1 - t0) * 3600.0
+
+
+rss_history = RssHistory()
+
+
+def tracemalloc_running() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def start_tracemalloc(frames: int = DIAG_TRACEMALLOC_FRAMES) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracemalloc() -> None:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def tracemalloc_summary() -> str:
+    if not tracemalloc.is_tracing():
+        return "tracemalloc: off (Start tracemalloc or Snapshot to record allocations)"
+    current, peak = tracemalloc.get_traced_memory()
+    return f"tracemalloc: on, traced {fmt_size(current)} (peak {fmt_size(peak)})"
+
+
+def take_snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces(_NOISE)
+
+
+def fmt_size(n: float) -> str:
+    if abs(n) < 1024:
+        return f"{n:.0f} B"
+    for unit in ("KB", "MB"):
+        n /= 1024.0
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+    return f"{n / 1024.0:.2f} GB"
+
+
+def top_allocators(snapshot: tracemalloc.Snapshot, limit: int = DIAG_TOP_N) -> List[str]:
+    lines = []
+    for stat in snapshot.statistics("lineno")[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{fmt_size(stat.size):>9}  {stat.count:>7}  {_short_path(frame.filename)}:{frame.lineno}")
+    return lines
+
+
+def snapshot_diff(old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, limit: int = DIAG_TOP_N) -> List[str]:
+    # Largest growth first: where memory went between the two snapshots.
+    lines = []
+    for stat in new.compare_to(old, "lineno")[:limit]:
+        if not stat.size_diff:
+            continue
+        frame = stat.traceback[0]
+        lines.append(
+            f"{'+' if stat.size_diff > 0 else '-'}{fmt_size(abs(stat.size_diff)):>9}  "
+            f"{stat.count_diff:>+7}  {_short_path(frame.filename)}:{frame.lineno}"
+        )
+    return lines
+
+
+def _short_path(path: str) -> str:
+    for root in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if path.startswith(root):
+            return path[len(root) :].lstrip("/\\")
+    return path
+
+
+def thread_inventory() -> List[str]:
+    # One line per live thread with where it currently is, to spot piled-up workers.
+    frames = sys._current_frames()
+    lines = []
+    for t in sorted(threading.enumerate(), key=lambda t: t.name):
+        frame = frames.get(t.ident)
+        where = f"{_short_path(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}" if frame else "-"
+        lines.append(f"{t.name[:28]:<28} {'daemon' if t.daemon else 'normal':<6}  {where}")
+    return lines
+
+
+def thread_name_counts() -> Counter:
+    # Numbered names ("Thread-7 (_run)", "fetch_3") are grouped, so repeated spawns show up as one growing count.
+    return Counter(re.sub(r"[-_]\d+", "", t.name) for t in threading.enumerate())
+
+
+def widget_counts(root) -> Counter:
+    counts: Counter = Counter()
+    stack = [root]
+    while stack:
+        w = stack.pop()
+        counts[w.winfo_class()] += 1
+        stack.extend(w.winfo_children())
+    return counts
+
+
+def gc_summary() -> str:
+    gen = gc.get_count()
+    return f"gc counts {gen[0]}/{gen[1]}/{gen[2]}, garbage {len(gc.garbage)}"
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+from .config import (
+    EMBED_BATCH,
+    EMBED_ENABLED,
+    EMBED_MODEL,
+    EMBED_RETRY_BASE_SECONDS,
+    EMBED_RETRY_MAX_SECONDS,
+    HYBRID_MIN_SIMILARITY,
+    HYBRID_RRF_K,
+)
+from .db import db_connect, kb_get_docs, search_kb, unpack_text
+from .integrations import ollama_embed
+from .runtime import optional_import
+
+log = logging.getLogger("thelocalai")
+
+# Failure/backoff state, shared by the chat, API and embedding threads.
+_state_lock = threading.Lock()
+_disabled_reason: Optional[str] = None
+_failures = 0
+_retry_at = 0.0
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+_cache_lock = threading.Lock()
+_cache: dict = {"key": None, "ids": [], "mat": None}
+
+
+def embeddings_available() -> bool:
+    with _state_lock:
+        return EMBED_ENABLED and _disabled_reason is None and time.monotonic() >= _retry_at
+
+
+def _model_missing(e: Exception) -> bool:
+    msg = str(e)
+    return bool(re.search(r"\) 404:", msg)) or "not found" in msg.lower()
+
+
+def _normalize(vec: List[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return array("f", (x / norm for x in vec))
+
+
+def embed_text(text: str, model: str = EMBED_MODEL) -> Optional[array]:
+    global _disabled_reason, _failures, _retry_at
+    if not embeddings_available():
+        return None
+    try:
+        vec = _normalize(ollama_embed(model, text))
+    except Exception as e:
+        if _model_missing(e):
+            # The embedding model isn't pulled; retrying won't help until it is.
+            with _state_lock:
+                _disabled_reason = str(e)
+            log.warning("Embeddings disabled for this run: %s", e)
+        else:
+            with _state_lock:
+                _failures += 1
+                delay = min(EMBED_RETRY_MAX_SECONDS, EMBED_RETRY_BASE_SECONDS * 2 ** (_failures - 1))
+                _retry_at = time.monotonic() + delay
+            log.warning("Embedding failed, retrying in %.0fs: %s", delay, e)
+        return None
+    with _state_lock:
+        _failures = 0
+    return vec
+
+
+def embed_pending(con: sqlite3.Connection, model: str = EMBED_MODEL, limit: int = 10_000) -> int:
+    done = 0
+    while done < limit and embeddings_available():
+        rows = con.execute(
+            """
+            SELECT d.id, d.title, d.body
+            FROM kb_docs d LEFT JOIN kb_vectors v ON v.doc_id = d.id AND v.model = ?
+            WHERE v.doc_id IS NULL
+            ORDER BY d.id
+            LIMIT ?
+            """,
+            (model, EMBED_BATCH),
+        ).fetchall()
+        if not rows:
+            break
+        batch = []
+        for doc_id, title, body in rows:
+            vec = embed_text(f"{title or ''}\n{unpack_text(body)}".strip(), model)
+            if vec is None:
+                break
+            batch.append((doc_id, model, len(vec), vec.tobytes()))
+        if batch:
+            con.executemany("INSERT OR REPLACE INTO kb_vectors(doc_id,model,dim,vec) VALUES(?,?,?,?)", batch)
+            con.commit()
+            done += len(batch)
+        if len(batch) < len(rows):
+            break
+    if done:
+        log.info("Embedded %d new KB chunks with %s", done, model)
+    return done
+
+
+def schedule_embedding(model: str = EMBED_MODEL) -> None:
+    global _worker
+    if not embeddings_available():
+        return
+
+    def _run():
+        con = None
+        try:
+            con = db_connect()
+            embed_pending(con, model)
+        except Exception:
+            log.exception("Background embedding failed")
+        finally:
+            if con:
+                con.close()
+
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run, daemon=True)
+        _worker.start()
+
+
+def _load_matrix(con: sqlite3.Connection, model: str):
+    key_row = con.execute("SELECT COUNT(*), MAX(doc_id) FROM kb_vectors WHERE model = ?", (model,)).fetchone()
+    key = (model, key_row[0], key_row[1])
+    with _cache_lock:
+        if _cache["key"] == key:
+            return _cache["ids"], _cache["mat"]
+
+    ids: list[int] = []
+    blobs: list[bytes] = []
+    dim = 0
+    for doc_id, d, blob in con.execute("SELECT doc_id, dim, vec FROM kb_vectors WHERE model = ? ORDER BY doc_id", (model,)):
+        if dim and d != dim:
+            continue
+        dim = d
+        ids.append(doc_id)
+        blobs.append(blob)
+
+    np = optional_import("numpy")
+    if np is not None:
+        mat = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(ids), dim) if ids else None
+    else:
+        mat = []
+        for blob in blobs:
+            vec = array("f")
+            vec.frombytes(blob)
+            mat.append(vec)
+
+    with _cache_lock:
+        _cache.update(key=key, ids=ids, mat=mat)
+    return ids, mat
+
+
+def vector_search(con: sqlite3.Connection, query: str, *, limit: int = 20, model: str = EMBED_MODEL) -> List[Tuple[int, float]]:
+    ids, mat = _load_matrix(con, model)
+    if not ids:
+        return []
+    q = embed_text(query, model)
+    if q is None:
+        return []
+
+    np = optional_import("numpy")
+    if np is not None and not isinstance(mat, list):
+        qv = np.frombuffer(q.tobytes(), dtype=np.float32)
+        if qv.shape[0] != mat.shape[1]:
+            return []
+        sims = mat @ qv
+        k = min(limit, len(ids))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(ids[i], float(sims[i])) for i in top]
+
+    if len(q) != len(mat[0]):
+        return []
+    scored = [(ids[i], sum(a * b for a, b in zip(vec, q))) for i, vec in enumerate(mat)]
+    scored.sort(key=lambda t: t[1], reverse=True)
+    return scored[:limit]
+
+
+def hybrid_search_kb(con: sqlite3.Connection, query: str, *, limit: int = 20) -> list[dict]:
+    # Reciprocal rank fusion of bm25 and cosine rankings; either side may be empty.
+    lexical = search_kb(con, query, limit=limit)
+    semantic = vector_search(con, query, limit=limit) if embeddings_available() else []
+    semantic = [(doc_id, sim) for doc_id, sim in semantic if sim >= HYBRID_MIN_SIMILARITY]
+
+    fused: dict[int, float] = {}
+    for rank, d in enumerate(lexical):
+        fused[d["id"]] = fused.get(d["id"], 0.0) + 1.0 / (HYBRID_RRF_K + rank + 1)
+    for rank, (doc_id, _) in enumerate(semantic):
+        fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (HYBRID_RRF_K + rank + 1)
+
+    docs = {d["id"]: d for d in lexical}
+    missing = [i for i in fused if i not in docs]
+    docs.update(kb_get_docs(con, missing))
+
+    out = []
+    for doc_id, score in sorted(fused.items(), key=lambda t: t[1], reverse=True)[:limit]:
+        d = docs.get(doc_id)
+        if d:
+            out.append({**d, "score": score})
+    return out
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib import robotparser
+from urllib.parse import urlparse
+
+from .config import (
+    WEB_BACKOFF_BASE_SECONDS,
+    WEB_BACKOFF_MAX_SECONDS,
+    WEB_FETCH_RETRIES,
+    WEB_FETCH_WAIT_SECONDS,
+    WEB_FETCH_WORKERS,
+    WEB_HOST_BURST,
+    WEB_HOST_MAX_INFLIGHT,
+    WEB_HOST_RATE,
+    WEB_HOST_SKIP_MIN_ATTEMPTS,
+    WEB_HOST_SKIP_SECONDS,
+    WEB_HOST_SKIP_SUCCESS,
+    WEB_HOST_STATS_FLUSH_SECONDS,
+    WEB_RESPECT_ROBOTS,
+    WEB_RETRY_AFTER_MAX_SECONDS,
+    WEB_ROBOTS_TTL_SECONDS,
+)
+from .runtime import domain_of, is_blocked_url
+from .tracing import record_span
+
+log = logging.getLogger("thelocalai")
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Statuses that mean "this whole host wants us to slow down", not just this URL.
+THROTTLE_STATUS = {429, 503}
+_EWMA = 0.3
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+@dataclass
+class HostState:
+    host: str
+    tokens: float
+    refilled: float = field(default_factory=time.monotonic)
+    cooldown_until: float = 0.0  # monotonic
+    inflight: int = 0
+    parked: List["_Job"] = field(default_factory=list, repr=False)
+    ok: int = 0
+    fail: int = 0
+    success: float = 1.0  # EWMA of ok (1) / failed (0) fetches
+    latency_ms: float = 0.0  # EWMA of successful fetches
+    last_status: int = 0
+    updated_at: float = 0.0  # wall clock, for persistence
+    robots: Optional[robotparser.RobotFileParser] = field(default=None, repr=False)
+    robots_checked: float = float("-inf")
+    robots_pending: Optional[threading.Event] = field(default=None, repr=False)
+    dirty: bool = False
+
+    def to_row(self) -> dict:
+        return {
+            "host": self.host,
+            "ok": self.ok,
+            "fail": self.fail,
+            "success": round(self.success, 4),
+            "latency_ms": round(self.latency_ms, 1),
+            "last_status": self.last_status,
+            "cooldown_until": time.time() + max(0.0, self.cooldown_until - time.monotonic()),
+            "updated_at": self.updated_at,
+        }
+
+
+@dataclass
+class _Job:
+    url: str
+    host: str
+    future: Future
+    ctx: contextvars.Context
+    attempt: int = 0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Either delta-seconds or an HTTP date.
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    # Equal jitter: half fixed, half random, so retries from one burst spread out.
+    d = min(WEB_BACKOFF_MAX_SECONDS, WEB_BACKOFF_BASE_SECONDS * (2**attempt))
+    return d / 2 + random.uniform(0, d / 2)
+
+
+def _status_of(exc: Exception) -> Tuple[int, Optional[float]]:
+    resp = getattr(exc, "response", None)
+    if resp is None:
+        return 0, None
+    return int(getattr(resp, "status_code", 0) or 0), parse_retry_after(resp.headers.get("Retry-After"))
+
+
+class FetchScheduler:
+    # Page fetches are queued here instead of being run inline. A single scheduler thread hands
+    # jobs to a small worker pool when their host has a token, is under its in-flight cap and is
+    # not cooling down; retries are re-queued with a delay, so no worker sleeps through a backoff.
+    def __init__(
+        self,
+        *,
+        workers: int = WEB_FETCH_WORKERS,
+        rate: float = WEB_HOST_RATE,
+        burst: float = WEB_HOST_BURST,
+        max_inflight: int = WEB_HOST_MAX_INFLIGHT,
+        retries: int = WEB_FETCH_RETRIES,
+        fetch: Optional[Callable[[str], Tuple[str, str]]] = None,
+        persist: bool = True,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_inflight = max(1, max_inflight)
+        self.retries = retries
+        self.persist = persist
+        self._fetch = fetch
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fetch")
+        self._cv = threading.Condition()
+        self._heap: List[Tuple[float, int, _Job]] = []
+        self._seq = itertools.count()
+        self._hosts: Dict[str, HostState] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._loaded = not persist
+        self._flushed = time.monotonic()
+
+    def _host(self, host: str) -> HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            st = self._hosts[host] = HostState(host, tokens=self.burst)
+        return st
+
+    def _refill(self, st: HostState, now: float) -> None:
+        st.tokens = min(self.burst, st.tokens + (now - st.refilled) * self.rate)
+        st.refilled = now
+
+    def _ready_at(self, st: HostState, now: float) -> float:
+        self._refill(st, now)
+        t = max(now, st.cooldown_until)
+        if st.tokens < 1.0:
+            t = max(t, now + (1.0 - st.tokens) / self.rate)
+        return t
+
+    def _load(self) -> None:
+        # Called with the condition held, on first use.
+        self._loaded = True
+        try:
+            from .db import db_connect, host_stats_load
+
+            con = db_connect()
+            try:
+                rows = host_stats_load(con)
+            finally:
+                con.close()
+        except Exception as e:
+            log.warning("Could not load host stats: %s", e)
+            return
+        now_wall, now = time.time(), time.monotonic()
+        for row in rows:
+            st = self._host(row["host"])
+            st.ok, st.fail, st.success = row["ok"], row["fail"], row["success"]
+            st.latency_ms, st.last_status, st.updated_at = row["latency_ms"], row["last_status"], row["updated_at"]
+            st.cooldown_until = now + max(0.0, row["cooldown_until"] - now_wall)
+
+    def flush(self) -> None:
+        with self._cv:
+            rows = [st.to_row() for st in self._hosts.values() if st.dirty]
+            for st in self._hosts.values():
+                st.dirty = False
+            self._flushed = time.monotonic()
+        if not rows or not self.persist:
+            return
+        try:
+            from .db import db_connect, host_stats_save
+
+            con = db_connect()
+            try:
+                host_stats_save(con, rows)
+            finally:
+                con.close()
+        except Exception as e:
+            log.warning("Could not save host stats: %s", e)
+
+    def should_skip(self, host: str) -> bool:
+        with self._cv:
+            if not self._loaded:
+                self._load()
+            st = self._hosts.get(host)
+            if st is None:
+                return False
+            if st.cooldown_until - time.monotonic() > WEB_RETRY_AFTER_MAX_SECONDS:
+                return True
+            return (
+                st.ok + st.fail >= WEB_HOST_SKIP_MIN_ATTEMPTS
+                and st.success < WEB_HOST_SKIP_SUCCESS
+                and time.time() - st.updated_at < WEB_HOST_SKIP_SECONDS
+            )
+
+    def submit(self, url: str) -> Future:
+        fut: Future = Future()
+        host = domain_of(url)
+        if not host or is_blocked_url(url):
+            fut.set_exception(FetchError(f"Blocked domain (skipped): {host}"))
+            return fut
+        job = _Job(url, host, fut, contextvars.copy_context())
+        with self._cv:
+            if not self._loaded:
+                self._load()
+            self._push(job, time.monotonic())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="fetch-scheduler", daemon=True)
+                self._thread.start()
+        return fut
+
+    def fetch(self, url: str) -> Tuple[str, str]:
+        return self.submit(url).result(timeout=WEB_FETCH_WAIT_SECONDS)
+
+    def reserve(self, host: str) -> float:
+        # For callers that must make the request themselves (the search API): take the host's
+        # next token and return how long to wait before using it.
+        with self._cv:
+            st = self._host(host)
+            now = time.monotonic()
+            wait = self._ready_at(st, now) - now
+            st.tokens -= 1.0
+            return wait
+
+    def note_result(self, host: str, ok: bool, *, status: int = 0, latency_ms: float = 0.0, retry_after: Optional[float] = None) -> None:
+        with self._cv:
+            st = self._host(host)
+            self._record(st, ok, status, latency_ms)
+            if not ok and status in THROTTLE_STATUS:
+                delay = retry_after if retry_after is not None else backoff_delay(min(st.fail, 5))
+                st.cooldown_until = max(st.cooldown_until, time.monotonic() + delay)
+            self._cv.notify()
+
+    def _push(self, job: _Job, when: float) -> None:
+        heapq.heappush(self._heap, (when, next(self._seq), job))
+        self._cv.notify()
+
+    def _record(self, st: HostState, ok: bool, status: int, latency_ms: float) -> None:
+        if ok:
+            st.ok += 1
+            st.latency_ms = latency_ms if st.ok == 1 else st.latency_ms + _EWMA * (latency_ms - st.latency_ms)
+        else:
+            st.fail += 1
+        st.success += _EWMA * ((1.0 if ok else 0.0) - st.success)
+        st.last_status = status
+        st.updated_at = time.time()
+        st.dirty = True
+
+    def _loop(self) -> None:
+        with self._cv:
+            while True:
+                if not self._heap:
+                    self._cv.wait()
+                    continue
+                now = time.monotonic()
+                when, _, job = self._heap[0]
+                if when > now:
+                    self._cv.wait(when - now)
+                    continue
+                heapq.heappop(self._heap)
+                st = self._host(job.host)
+                if st.inflight >= self.max_inflight:
+                    st.parked.append(job)
+                    continue
+                ready = self._ready_at(st, now)
+                if ready - now > WEB_RETRY_AFTER_MAX_SECONDS:
+                    # Cooling down after a long Retry-After (or that backed up): fail now rather than
+                    # hold the caller for minutes; should_skip() keeps new searches off the host.
+                    job.future.set_exception(FetchError(f"Host {job.host} is rate limited for another {ready - now:.0f}s"))
+                    continue
+                if ready > now:
+                    self._push(job, ready)
+                    continue
+                st.tokens -= 1.0
+                st.inflight += 1
+                self._pool.submit(job.ctx.run, self._run, job)
+
+    def _allowed_by_robots(self, job: _Job) -> bool:
+        # One robots.txt request per host at a time: other workers for the host wait for its result.
+        with self._cv:
+            st = self._hosts[job.host]
+            pending = st.robots_pending
+            owner = pending is None and time.monotonic() - st.robots_checked > WEB_ROBOTS_TTL_SECONDS
+            if owner:
+                pending = st.robots_pending = threading.Event()
+        if owner:
+            rp = None
+            parts = urlparse(job.url)
+            try:
+                from .integrations import http_session
+
+                r = http_session().get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=5)
+                if r.status_code == 200:
+                    rp = robotparser.RobotFileParser()
+                    rp.parse(r.text.splitlines())
+            except Exception:
+                pass  # unreachable robots.txt: treat as allowed
+            with self._cv:
+                st.robots, st.robots_checked, st.robots_pending = rp, time.monotonic(), None
+            pending.set()
+        elif pending is not None:
+            pending.wait(10.0)
+        with self._cv:
+            rp = st.robots
+        return rp is None or rp.can_fetch("*", job.url)
+
+    def _run(self, job: _Job) -> None:
+        fetch = self._fetch
+        if fetch is None:
+            from .integrations import fetch_page_text as fetch
+        started = time.perf_counter()
+        status, retry_after = 0, None
+        try:
+            if WEB_RESPECT_ROBOTS and not self._allowed_by_robots(job):
+                raise FetchError(f"Disallowed by robots.txt: {job.url}")
+            result = fetch(job.url)
+            ok, err = True, None
+        except Exception as e:
+            ok, err = False, e
+            status, retry_after = _status_of(e)
+        ms = (time.perf_counter() - started) * 1000.0
+        record_span("web.fetch", ms, host=job.host, status=status or (200 if ok else 0), attempt=job.attempt)
+
+        with self._cv:
+            st = self._hosts[job.host]
+            st.inflight -= 1
+            if st.parked:
+                self._push(st.parked.pop(0), time.monotonic())
+            if not isinstance(err, FetchError):  # a robots.txt refusal says nothing about the host's health
+                self._record(st, ok, status, ms)
+            if not ok:
+                delay = retry_after if retry_after is not None else backoff_delay(job.attempt)
+                if status in THROTTLE_STATUS:
+                    st.cooldown_until = max(st.cooldown_until, time.monotonic() + delay)
+                retryable = not isinstance(err, FetchError) and (status == 0 or status in RETRYABLE_STATUS)
+                if retryable and job.attempt < self.retries and delay <= WEB_RETRY_AFTER_MAX_SECONDS:
+                    job.attempt += 1
+                    self._push(job, time.monotonic() + delay)
+                    return
+            idle = not self._heap and all(h.inflight == 0 for h in self._hosts.values())
+            due = idle or time.monotonic() - self._flushed > WEB_HOST_STATS_FLUSH_SECONDS
+
+        if ok:
+            job.future.set_result(result)
+        elif isinstance(err, FetchError):
+            job.future.set_exception(err)
+        else:
+            job.future.set_exception(
+                FetchError(f"Failed to fetch page after {job.attempt + 1} attempts: {job.url} | last error: {err}")
+            )
+        if due:
+            self.flush()
+
+    def stats(self) -> List[dict]:
+        with self._cv:
+            rows = [st.to_row() for st in self._hosts.values()]
+        rows.sort(key=lambda r: r["ok"] + r["fail"], reverse=True)
+        return rows
+
+
+_scheduler: Optional[FetchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def fetch_scheduler() -> FetchScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler()
+        return _scheduler
@@ -1,46 +1,74 @@
 from __future__ import annotations
 
+import json
 import logging
 import re
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
-
-import requests
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
 from .config import (
     ABOUT_TEXT,
     APP_TITLE,
     DEFAULT_MODEL,
     OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_EMBED_URL,
     OLLAMA_GEN_URL,
+    OLLAMA_KEEP_ALIVE,
     OLLAMA_READ_TIMEOUT,
     OLLAMA_RETRIES,
+    OLLAMA_SHOW_URL,
     OLLAMA_TAGS_URL,
-    WEB_FETCH_RETRIES,
     WEB_MAX_CHARS_PER_PAGE,
     WEB_MAX_RESULTS,
+    WEB_RETRY_AFTER_MAX_SECONDS,
+    WEB_SEARCH_HOST,
     WEB_TIMEOUT,
 )
-from .runtime import domain_of, is_blocked_url, truncate_prompt
+from .limiter import ollama_limiter
+from .runtime import optional_import, truncate_prompt
+from .tracing import record_span
+
+if TYPE_CHECKING:
+    import requests
 
 log = logging.getLogger("thelocalai")
 
-try:
-    from ddgs import DDGS  # type: ignore
-except Exception:
-    DDGS = None  # type: ignore
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
 
-try:
-    from bs4 import BeautifulSoup  # type: ignore
-except Exception:
-    BeautifulSoup = None  # type: ignore
+def http_session() -> requests.Session:
+    # One pooled session shared by the UI workers and the headless API threads.
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+
+            s = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
 
 
 def ddg_search(query: str, max_results: int = WEB_MAX_RESULTS) -> List[Dict[str, str]]:
+    DDGS = optional_import("ddgs", "DDGS")
     if DDGS is None:
         log.warning("ddgs not installed; web search disabled for this run.")
         return []
+    from .fetcher import fetch_scheduler
+
+    sched = fetch_scheduler()
+    wait = sched.reserve(WEB_SEARCH_HOST)
+    if wait > WEB_RETRY_AFTER_MAX_SECONDS:
+        log.warning("ddg_search skipped: search is rate limited for another %.0fs", wait)
+        return []
+    if wait > 0:
+        time.sleep(wait)
     results: List[Dict[str, str]] = []
+    started = time.perf_counter()
     try:
         with DDGS() as ddgs:
             for r in ddgs.text(query, max_results=max_results):
@@ -50,8 +78,12 @@ def ddg_search(query: str, max_results: int = WEB_MAX_RESULTS) -> List[Dict[str,
                 if url:
                     results.append({"title": title, "url": url, "snippet": body})
     except Exception as e:
+        # ddgs signals throttling with its RatelimitException rather than an HTTP status.
+        throttled = "ratelimit" in type(e).__name__.lower() or "429" in str(e)
+        sched.note_result(WEB_SEARCH_HOST, False, status=429 if throttled else 0)
         log.warning("ddg_search failed: %s", e)
         return []
+    sched.note_result(WEB_SEARCH_HOST, True, latency_ms=(time.perf_counter() - started) * 1000.0)
     return results
 
 
@@ -62,11 +94,17 @@ def fetch_page_text(url: str, timeout: int = WEB_TIMEOUT) -> Tuple[str, str]:
             "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         )
     }
-    r = requests.get(url, headers=headers, timeout=timeout)
+    r = http_session().get(url, headers=headers, timeout=timeout)
     r.raise_for_status()
     r.encoding = r.apparent_encoding
-    html = r.text
+    title, text = html_to_text(r.text)
+    if len(text) > WEB_MAX_CHARS_PER_PAGE:
+        text = text[:WEB_MAX_CHARS_PER_PAGE] + " …"
+    return title, text
 
+
+def html_to_text(html: str) -> Tuple[str, str]:
+    BeautifulSoup = optional_import("bs4", "BeautifulSoup")
     if BeautifulSoup is None:
         title = ""
         mt = re.search(r"<title[^>]*>(.*?)</title>", html, flags=re.IGNORECASE | re.DOTALL)
@@ -83,66 +121,162 @@ def fetch_page_text(url: str, timeout: int = WEB_TIMEOUT) -> Tuple[str, str]:
         title = soup.title.get_text(" ", strip=True) if soup.title else ""
         text = soup.get_text(" ", strip=True)
         text = re.sub(r"\s+", " ", text).strip()
-
-    if len(text) > WEB_MAX_CHARS_PER_PAGE:
-        text = text[:WEB_MAX_CHARS_PER_PAGE] + " …"
     return title, text
 
 
-def fetch_page_text_with_retries(url: str) -> Tuple[str, str]:
-    if is_blocked_url(url):
-        raise RuntimeError(f"Blocked domain (skipped): {domain_of(url)}")
-    last: Optional[Exception] = None
-    for attempt in range(WEB_FETCH_RETRIES + 1):
-        try:
-            return fetch_page_text(url)
-        except Exception as e:
-            last = e
-            time.sleep(0.6 * (2**attempt))
-    raise RuntimeError(f"Failed to fetch page after retries: {url} | last error: {last}")
+def ollama_tags(timeout: int = 5) -> List[dict]:
+    r = http_session().get(OLLAMA_TAGS_URL, timeout=timeout)
+    r.raise_for_status()
+    return [m for m in r.json().get("models", []) if m.get("name")]
 
 
 def ollama_list_models(timeout: int = 5) -> List[str]:
     try:
-        r = requests.get(OLLAMA_TAGS_URL, timeout=timeout)
-        r.raise_for_status()
-        data = r.json()
-        models = [m.get("name") for m in data.get("models", []) if m.get("name")]
-        return sorted(set(models))
+        return sorted({m["name"] for m in ollama_tags(timeout)})
     except Exception as e:
         log.warning("ollama_list_models failed: %s", e)
         return []
 
 
-def ollama_generate(model: str, prompt: str, *, num_predict: int, temperature: float) -> str:
+def ollama_show(model: str, timeout: int = 10) -> dict:
+    r = http_session().post(OLLAMA_SHOW_URL, json={"model": model}, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def ollama_warmup(model: str, keep_alive: str = OLLAMA_KEEP_ALIVE, *, num_ctx: Optional[int] = None) -> int:
+    # An empty prompt makes Ollama load the weights and return without generating. num_ctx must match
+    # what generate calls send, or the first real request reloads the model with the new context size.
+    started = time.perf_counter()
+    payload: dict = {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}
+    if num_ctx:
+        payload["options"] = {"num_ctx": int(num_ctx)}
+    r = http_session().post(
+        OLLAMA_GEN_URL,
+        json=payload,
+        timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT),
+    )
+    if r.status_code != 200:
+        try:
+            err = r.json().get("error") or r.text
+        except Exception:
+            err = r.text
+        raise RuntimeError(f"Ollama warm-up failed ({model}) {r.status_code}: {str(err)[:400]}")
+    load_ns = int(r.json().get("load_duration") or 0)
+    return load_ns // 1_000_000 if load_ns else int((time.perf_counter() - started) * 1000)
+
+
+def _record_ollama_timings(obj: dict) -> None:
+    # Ollama reports durations in nanoseconds on the final response object.
+    for key, name in (("load_duration", "llm.load"), ("prompt_eval_duration", "llm.prompt_eval"), ("eval_duration", "llm.eval")):
+        ns = obj.get(key)
+        if ns:
+            count_key = key.replace("_duration", "_count")
+            record_span(name, int(ns) / 1e6, tokens=obj.get(count_key))
+
+
+def _ollama_stream(r: requests.Response, on_token: Callable[[str], None]) -> str:
+    out: list[str] = []
+    for line in r.iter_lines():
+        if not line:
+            continue
+        obj = json.loads(line)
+        if obj.get("error"):
+            raise RuntimeError(f"Ollama stream error: {obj['error']}")
+        tok = obj.get("response") or ""
+        if tok:
+            out.append(tok)
+            on_token(tok)
+        if obj.get("done"):
+            _record_ollama_timings(obj)
+            break
+    return "".join(out).strip()
+
+
+def ollama_generate(
+    model: str,
+    prompt: str,
+    *,
+    num_predict: int,
+    temperature: float,
+    num_ctx: Optional[int] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
+    options = {"num_predict": int(num_predict), "temperature": float(temperature)}
+    if num_ctx:
+        options["num_ctx"] = int(num_ctx)
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
-        "options": {"num_predict": int(num_predict), "temperature": float(temperature)},
+        "stream": on_token is not None,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": options,
     }
 
     last: Optional[Exception] = None
+    emitted = False
+    sink_error: Optional[Exception] = None
+
+    def _emit(tok: str) -> None:
+        nonlocal emitted, sink_error
+        emitted = True
+        try:
+            on_token(tok)  # type: ignore[misc]
+        except Exception as e:
+            sink_error = e
+            raise
+
     for attempt in range(OLLAMA_RETRIES + 1):
         try:
-            r = requests.post(
-                OLLAMA_GEN_URL,
-                json=payload,
-                timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT),
-            )
-            if r.status_code != 200:
-                try:
-                    err = r.json().get("error") or r.text
-                except Exception:
-                    err = r.text
-                raise RuntimeError(f"Ollama error ({model}) {r.status_code}: {str(err)[:400]}")
-            return (r.json().get("response") or "").strip()
+            # Ollama only runs OLLAMA_NUM_PARALLEL generations at once; queue here, fairly per session.
+            with ollama_limiter().slot():
+                r = http_session().post(
+                    OLLAMA_GEN_URL,
+                    json=payload,
+                    timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT),
+                    stream=on_token is not None,
+                )
+                if r.status_code != 200:
+                    try:
+                        err = r.json().get("error") or r.text
+                    except Exception:
+                        err = r.text
+                    raise RuntimeError(f"Ollama error ({model}) {r.status_code}: {str(err)[:400]}")
+                if on_token is not None:
+                    return _ollama_stream(r, _emit)
+                obj = r.json()
+                _record_ollama_timings(obj)
+                return (obj.get("response") or "").strip()
         except Exception as e:
+            if e is sink_error:
+                # The caller's sink failed (e.g. an API client hung up); not an Ollama error.
+                raise
             last = e
+            if emitted:
+                # Part of the answer already reached the caller; a retry would duplicate it.
+                break
             time.sleep(0.5 * (2**attempt))
     raise RuntimeError(f"Ollama failed after retries: {last}")
 
 
+def ollama_embed(model: str, text: str) -> List[float]:
+    r = http_session().post(
+        OLLAMA_EMBED_URL,
+        json={"model": model, "prompt": text},
+        timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT),
+    )
+    if r.status_code != 200:
+        try:
+            err = r.json().get("error") or r.text
+        except Exception:
+            err = r.text
+        raise RuntimeError(f"Ollama embeddings error ({model}) {r.status_code}: {str(err)[:400]}")
+    vec = r.json().get("embedding") or []
+    if not vec:
+        raise RuntimeError(f"Ollama returned an empty embedding ({model})")
+    return [float(x) for x in vec]
+
+
 def build_prompt(
     memory: str,
     user_msg: str,
@@ -150,6 +284,8 @@ def build_prompt(
     web_context: str = "",
     last_topic: str = "",
     web_used: bool = False,
+    history: str = "",
+    max_chars: Optional[int] = None,
 ) -> str:
     parts = [
         "SYSTEM:",
@@ -175,6 +311,8 @@ def build_prompt(
         parts.append(f"SESSION last_topic: {last_topic}\n")
     if memory.strip():
         parts.append("MEMORY:\n" + memory + "\n")
+    if history.strip():
+        parts.append("CONVERSATION CONTEXT (earlier turns, for reference):\n" + history + "\n")
     if kb_material.strip():
         parts.append("KB:\n" + kb_material + "\n")
     if web_context.strip():
@@ -182,4 +320,4 @@ def build_prompt(
 
     parts.append("USER:\n" + user_msg.strip())
     parts.append("\nASSISTANT:")
-    return truncate_prompt("\n".join(parts))
+    return truncate_prompt("\n".join(parts), max_chars)
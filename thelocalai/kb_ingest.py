@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .config import KB_CHUNK_CHARS, KB_INGEST_BATCH_CHUNKS, KB_INGEST_MAX_BYTES, KB_INGEST_WORKERS
+from .db import db_connect, kb_add_doc, kb_file_by_sha1, kb_file_delete, kb_file_duplicates, kb_file_put, kb_files_under
+from .runtime import sentence_chunks
+
+log = logging.getLogger("thelocalai")
+
+TEXT_SUFFIXES = {".txt", ".text", ".rst", ".log"}
+MARKDOWN_SUFFIXES = {".md", ".markdown"}
+HTML_SUFFIXES = {".html", ".htm"}
+SUFFIXES = TEXT_SUFFIXES | MARKDOWN_SUFFIXES | HTML_SUFFIXES
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", ".venv"}
+
+# Below this many changed files the pool start-up costs more than it saves.
+_POOL_MIN_FILES = 8
+
+_MD_CODE_FENCE = re.compile(r"^\s*(```|~~~).*$", re.MULTILINE)
+_MD_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_MARKUP = re.compile(r"^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+\.\s+)|[*_`]{1,3}", re.MULTILINE)
+
+
+@dataclass
+class IngestStats:
+    root: str
+    files: int = 0
+    unchanged: int = 0
+    indexed: int = 0
+    duplicates: int = 0
+    removed: int = 0
+    errors: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Ingested {self.root}: {self.indexed} files indexed ({self.chunks} chunks), "
+            f"{self.unchanged} unchanged, {self.duplicates} duplicates, {self.removed} removed, "
+            f"{self.errors} errors in {self.seconds:.1f}s."
+        )
+
+
+def file_url(path: str) -> str:
+    return Path(path).as_uri()
+
+
+def _markdown_text(raw: str) -> Tuple[str, str]:
+    m = re.search(r"^\s{0,3}#\s+(.+)$", raw, re.MULTILINE)
+    title = m.group(1).strip() if m else ""
+    text = _MD_CODE_FENCE.sub(" ", raw)
+    text = _MD_LINK.sub(r"\1", text)
+    text = _MD_MARKUP.sub("", text)
+    return title, text
+
+
+def extract_file(path: str) -> Tuple[str, str, str, List[str]]:
+    # Runs in a pool worker: read, hash, convert and chunk one file. Returns (path, sha1, title, chunks).
+    data = Path(path).read_bytes()
+    sha1 = hashlib.sha1(data).hexdigest()
+    raw = data.decode("utf-8", errors="replace")
+    suffix = Path(path).suffix.lower()
+    title = ""
+    if suffix in HTML_SUFFIXES:
+        from .integrations import html_to_text
+
+        title, text = html_to_text(raw)
+    elif suffix in MARKDOWN_SUFFIXES:
+        title, text = _markdown_text(raw)
+    else:
+        text = raw
+    text = re.sub(r"\s+", " ", text).strip()
+    chunks = sentence_chunks(text, max_len=KB_CHUNK_CHARS) if text else []
+    return path, sha1, title or Path(path).stem, chunks
+
+
+def iter_files(root: Path) -> Iterator[Tuple[str, int, int]]:
+    # (path, mtime_ns, size) for every supported file below root, skipping hidden and vendor dirs.
+    if root.is_file():
+        st = root.stat()
+        yield str(root), st.st_mtime_ns, st.st_size
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".") and d not in SKIP_DIRS]
+        for name in filenames:
+            if name.startswith(".") or Path(name).suffix.lower() not in SUFFIXES:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_size <= KB_INGEST_MAX_BYTES:
+                yield path, st.st_mtime_ns, st.st_size
+
+
+def ingest_path(
+    path: str,
+    *,
+    topic: Optional[str] = None,
+    workers: int = KB_INGEST_WORKERS,
+    full: bool = False,
+    con=None,
+) -> IngestStats:
+    root = Path(path).expanduser().resolve()
+    if not root.exists():
+        raise FileNotFoundError(f"No such file or folder: {root}")
+    topic = topic or root.stem or str(root)
+    stats = IngestStats(str(root))
+    started = time.perf_counter()
+    own = con is None
+    con = con or db_connect()
+    try:
+        known = kb_files_under(con, str(root))
+        seen = set()
+        todo: List[Tuple[str, int, int]] = []
+        for p, mtime_ns, size in iter_files(root):
+            stats.files += 1
+            seen.add(p)
+            prev = known.get(p)
+            if not full and prev and prev[0] == mtime_ns and prev[1] == size:
+                stats.unchanged += 1
+            else:
+                todo.append((p, mtime_ns, size))
+
+        # sha1s whose indexed copy was removed or edited; a recorded duplicate may need to take over.
+        orphaned = set()
+        for p in set(known) - seen:
+            if known[p][3]:
+                orphaned.add(known[p][2])
+            kb_file_delete(con, p, file_url(p))
+            stats.removed += 1
+
+        meta = {p: (m, s) for p, m, s in todo}
+        seen_sha1 = set()
+        pending = 0
+
+        def _store(result: Tuple[str, str, str, List[str]]) -> None:
+            nonlocal pending
+            p, sha1, title, chunks = result
+            mtime_ns, size = meta[p]
+            prev = known.get(p)
+            if not full and prev and prev[2] == sha1:
+                # Touched but not edited.
+                kb_file_put(con, p, mtime_ns, size, sha1, prev[3])
+                stats.unchanged += 1
+                return
+            if prev and prev[3]:
+                orphaned.add(prev[2])
+            dup_of = kb_file_by_sha1(con, sha1)
+            if sha1 in seen_sha1 or (dup_of and dup_of != p):
+                kb_file_delete(con, p, file_url(p))
+                kb_file_put(con, p, mtime_ns, size, sha1, 0)
+                stats.duplicates += 1
+                return
+            seen_sha1.add(sha1)
+            ids = kb_add_doc(con, topic, file_url(p), title, "", chunks=chunks, commit=False)
+            kb_file_put(con, p, mtime_ns, size, sha1, len(ids))
+            stats.indexed += 1
+            stats.chunks += len(ids)
+            pending += len(ids) + 1
+            if pending >= KB_INGEST_BATCH_CHUNKS:
+                con.commit()
+                pending = 0
+
+        # Extraction runs in worker processes; all writes stay on this connection, in large transactions.
+        paths = [p for p, _, _ in todo]
+        # spawn, not fork: this usually runs from a thread of a process that has other threads (and Tk).
+        pool = None
+        if len(paths) >= _POOL_MIN_FILES and workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            if pool is not None:
+                results = pool.map(_extract_safe, paths, chunksize=max(1, len(paths) // (workers * 4)))
+            else:
+                results = map(_extract_safe, paths)
+            for r in results:
+                if r is None:
+                    stats.errors += 1
+                else:
+                    _store(r)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # Duplicates are only recorded, not indexed. If the indexed copy went away, index the first
+        # duplicate that is still readable so its content stays in the KB.
+        for sha1 in orphaned:
+            if kb_file_by_sha1(con, sha1):
+                continue
+            for p in kb_file_duplicates(con, sha1):
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    kb_file_delete(con, p, file_url(p))
+                    continue
+                r = _extract_safe(p)
+                if r is None:
+                    continue
+                if known.pop(p, None) is not None and p not in meta:
+                    stats.unchanged -= 1
+                meta[p] = (st.st_mtime_ns, st.st_size)
+                _store(r)
+                break
+        con.commit()
+    finally:
+        if own:
+            con.close()
+    stats.seconds = time.perf_counter() - started
+    log.info("kb ingest: %s", stats.summary())
+    return stats
+
+
+def _extract_safe(path: str) -> Optional[Tuple[str, str, str, List[str]]]:
+    try:
+        return extract_file(path)
+    except Exception as e:
+        log.warning("kb ingest: could not read %s: %s", path, e)
+        return None
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m thelocalai.kb_ingest", description="Index local txt/md/html files into the knowledge base.")
+    p.add_argument("path", help="file or folder to ingest")
+    p.add_argument("--topic", help="KB topic for the chunks (default: the folder name)")
+    p.add_argument("--workers", type=int, default=KB_INGEST_WORKERS)
+    p.add_argument("--full", action="store_true", help="re-read every file, ignoring mtime/hash")
+    args = p.parse_args(argv)
+    try:
+        stats = ingest_path(args.path, topic=args.topic, workers=args.workers, full=args.full)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(stats.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+from .config import OLLAMA_NUM_PARALLEL
+from .tracing import record_span
+
+_session: contextvars.ContextVar[str] = contextvars.ContextVar("thelocalai_session", default="")
+
+
+@contextmanager
+def session_scope(session_id: str) -> Iterator[None]:
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session() -> str:
+    return _session.get()
+
+
+class FairLimiter:
+    # At most `slots` holders at once. When full, a freed slot goes to the next session in
+    # round-robin order rather than to whichever thread asked first, so one busy client
+    # cannot starve the others.
+    def __init__(self, slots: int):
+        self.slots = max(1, int(slots))
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting: Dict[str, Deque[threading.Event]] = {}
+        self._order: Deque[str] = deque()
+        self.granted = 0
+        self.queued = 0
+        self.max_wait_ms = 0.0
+
+    @contextmanager
+    def slot(self, session_id: Optional[str] = None) -> Iterator[None]:
+        sid = session_id if session_id is not None else _session.get()
+        ev: Optional[threading.Event] = None
+        with self._lock:
+            self.granted += 1
+            if self._active < self.slots and not self._order:
+                self._active += 1
+            else:
+                self.queued += 1
+                ev = threading.Event()
+                waiters = self._waiting.setdefault(sid, deque())
+                if not waiters:
+                    self._order.append(sid)
+                waiters.append(ev)
+        if ev is not None:
+            started = time.perf_counter()
+            ev.wait()
+            waited = (time.perf_counter() - started) * 1000.0
+            self.max_wait_ms = max(self.max_wait_ms, waited)
+            record_span("llm.queue", waited, session=sid)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            if not self._order:
+                self._active -= 1
+                return
+            sid = self._order.popleft()
+            waiters = self._waiting[sid]
+            ev = waiters.popleft()
+            if waiters:
+                self._order.append(sid)
+            else:
+                del self._waiting[sid]
+        # The slot passes straight to the waiter; _active stays the same.
+        ev.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "active": self._active,
+                "waiting": {sid: len(w) for sid, w in self._waiting.items()},
+                "granted": self.granted,
+                "queued": self.queued,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+            }
+
+
+_limiter: Optional[FairLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def ollama_limiter() -> FairLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = FairLimiter(OLLAMA_NUM_PARALLEL)
+        return _limiter
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from .config import (
+    DB_PATH,
+    MAINT_CONVERT_MAX_BYTES,
+    MAINT_ENABLED,
+    MAINT_FTS_MERGE_PAGES,
+    MAINT_FTS_MERGE_STEPS,
+    MAINT_IDLE_SECONDS,
+    MAINT_INTERVAL_SECONDS,
+    MAINT_VACUUM_PAGES,
+)
+from .db import db_connect
+from .runtime import now_utc_iso
+from .tracing import record_span
+
+log = logging.getLogger("thelocalai")
+
+FTS_TABLES = ("kb_fts", "turns_fts")
+
+_activity_lock = threading.Lock()
+_active = 0
+_last_activity = time.monotonic()
+
+
+@contextmanager
+def activity() -> Iterator[None]:
+    # Wraps user-facing work (chat turns); maintenance only runs once this has been quiet a while.
+    global _active, _last_activity
+    with _activity_lock:
+        _active += 1
+    try:
+        yield
+    finally:
+        with _activity_lock:
+            _active -= 1
+            _last_activity = time.monotonic()
+
+
+def idle_seconds() -> float:
+    with _activity_lock:
+        return 0.0 if _active else time.monotonic() - _last_activity
+
+
+def busy() -> bool:
+    with _activity_lock:
+        return _active > 0
+
+
+def run_maintenance(con: sqlite3.Connection, *, should_stop: Callable[[], bool] = lambda: False) -> dict:
+    # Small steps, committing between them, so a chat turn arriving mid-run waits for one step at most.
+    started = time.perf_counter()
+    res: dict = {"at": now_utc_iso(), "merge_steps": {}, "freed_pages": 0}
+
+    for table in FTS_TABLES:
+        steps = 0
+        while steps < MAINT_FTS_MERGE_STEPS and not should_stop():
+            before = con.total_changes
+            con.execute(f"INSERT INTO {table}({table}, rank) VALUES('merge', ?)", (MAINT_FTS_MERGE_PAGES,))
+            con.commit()
+            steps += 1
+            # Per the FTS5 docs, fewer than 2 changes means further merges would do nothing.
+            if con.total_changes - before < 2:
+                break
+        res["merge_steps"][table] = steps
+
+    if not should_stop():
+        # Databases still in auto_vacuum=NONE are left to convert_to_incremental().
+        if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            free = con.execute("PRAGMA freelist_count").fetchone()[0]
+            # Through execute() the pragma frees one page per step of the cursor; executescript runs it to completion.
+            con.executescript(f"PRAGMA incremental_vacuum({int(MAINT_VACUUM_PAGES)});")
+            res["freed_pages"] = free - con.execute("PRAGMA freelist_count").fetchone()[0]
+        con.execute("PRAGMA optimize")
+
+    if not should_stop():
+        wal_busy, wal_pages, moved = con.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        res.update(wal_busy=bool(wal_busy), wal_pages=wal_pages, checkpointed=moved)
+
+    page_size = con.execute("PRAGMA page_size").fetchone()[0]
+    res["db_bytes"] = con.execute("PRAGMA page_count").fetchone()[0] * page_size
+    try:
+        res["wal_bytes"] = os.path.getsize(f"{DB_PATH}-wal")
+    except OSError:
+        res["wal_bytes"] = 0
+    res["interrupted"] = should_stop()
+    res["ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+    record_span("db.maintenance", res["ms"])
+    return res
+
+
+def convert_to_incremental(con: sqlite3.Connection, *, max_bytes: Optional[int] = MAINT_CONVERT_MAX_BYTES) -> bool:
+    # Databases created before auto_vacuum was enabled need one full VACUUM to switch mode. It rewrites
+    # the whole file under an exclusive lock and can't be interrupted, so it runs once as the worker's
+    # first job (small files only) or from the CLI, never from the idle loop.
+    if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    size = con.execute("PRAGMA page_count").fetchone()[0] * con.execute("PRAGMA page_size").fetchone()[0]
+    if max_bytes is not None and size > max_bytes:
+        log.info(
+            "DB is %.0f MB and not in incremental auto_vacuum mode; run `python -m thelocalai.maintenance --convert` to convert it.",
+            size / 1e6,
+        )
+        return False
+    started = time.perf_counter()
+    con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    con.execute("VACUUM")
+    log.info("DB converted to incremental auto_vacuum (%.0f MB) in %.0f ms", size / 1e6, (time.perf_counter() - started) * 1000.0)
+    return True
+
+
+def describe(res: Optional[dict]) -> str:
+    if not res:
+        return "not run yet"
+    merges = "+".join(str(n) for n in res["merge_steps"].values()) or "0"
+    return (
+        f"{res['at'][11:16]} merge {merges} steps, freed {res['freed_pages']} pages, db {res['db_bytes'] / 1e6:.1f} MB, "
+        f"wal {res['wal_bytes'] / 1e6:.1f} MB, {res['ms']:.0f} ms{' (interrupted)' if res['interrupted'] else ''}"
+    )
+
+
+class MaintenanceWorker:
+    def __init__(self, *, interval: float = MAINT_INTERVAL_SECONDS, idle: float = MAINT_IDLE_SECONDS):
+        self.interval = interval
+        self.idle = idle
+        self.last: Optional[dict] = None
+        self._last_run = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _interrupted(self) -> bool:
+        return self._stop.is_set() or busy()
+
+    def _loop(self) -> None:
+        if sys.platform.startswith("linux"):
+            try:
+                # Linux schedules threads individually, so this lowers only the maintenance thread.
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+            except (AttributeError, OSError):
+                pass
+        self._prepare()
+        while not self._stop.wait(min(30.0, self.idle)):
+            if time.monotonic() - self._last_run < self.interval or idle_seconds() < self.idle:
+                continue
+            self.run_now()
+
+    def _prepare(self) -> None:
+        # The first connection runs db.py's one-time migrations; together with the auto_vacuum
+        # conversion that can take seconds on an old database, so neither happens on the Tk thread.
+        con = None
+        try:
+            con = db_connect()
+            convert_to_incremental(con)
+        except sqlite3.Error as e:
+            log.warning("DB auto_vacuum conversion failed: %s", e)
+        finally:
+            if con is not None:
+                con.close()
+
+    def run_now(self) -> Optional[dict]:
+        self._last_run = time.monotonic()
+        con = None
+        try:
+            con = db_connect()
+            res = run_maintenance(con, should_stop=self._interrupted)
+        except sqlite3.Error as e:
+            log.warning("DB maintenance failed: %s", e)
+            return None
+        finally:
+            if con is not None:
+                con.close()
+        self.last = res
+        log.info("DB maintenance: %s", describe(res))
+        return res
+
+
+_worker: Optional[MaintenanceWorker] = None
+_worker_lock = threading.Lock()
+
+
+def maintenance_worker() -> MaintenanceWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = MaintenanceWorker()
+        return _worker
+
+
+def start_maintenance() -> None:
+    if MAINT_ENABLED:
+        maintenance_worker().start()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m thelocalai.maintenance", description="Run database maintenance once.")
+    p.add_argument("--convert", action="store_true", help="switch an older database to incremental auto_vacuum (full VACUUM, any size)")
+    args = p.parse_args(argv)
+    con = db_connect()
+    try:
+        if args.convert and not convert_to_incremental(con, max_bytes=None):
+            print("already in incremental auto_vacuum mode")
+        print(describe(run_maintenance(con)))
+    finally:
+        con.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
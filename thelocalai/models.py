@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from .config import CHARS_PER_TOKEN, DEFAULT_NUM_PREDICT, MAX_PROMPT_CHARS, MODEL_CACHE_MAX_AGE_SECONDS, MODEL_CACHE_PATH
+from .integrations import ollama_show, ollama_tags
+
+log = logging.getLogger("thelocalai")
+
+
+@dataclass
+class ModelInfo:
+    name: str
+    digest: str = ""
+    size: int = 0
+    family: str = ""
+    parameter_size: str = ""
+    quantization: str = ""
+    context_length: int = 0
+
+    @property
+    def params_b(self) -> float:
+        m = re.match(r"^\s*([\d.]+)\s*([KMB])", self.parameter_size or "", re.IGNORECASE)
+        if not m:
+            return 0.0
+        scale = {"K": 1e-6, "M": 1e-3, "B": 1.0}[m.group(2).upper()]
+        return float(m.group(1)) * scale
+
+
+@dataclass
+class ModelProfile:
+    num_ctx: int
+    num_predict: int
+    prompt_chars: int
+
+
+@dataclass
+class _CacheFile:
+    updated_at: float = 0.0
+    models: Dict[str, dict] = field(default_factory=dict)
+
+
+def profile_for(info: Optional[ModelInfo], num_predict: int = DEFAULT_NUM_PREDICT) -> ModelProfile:
+    if info is None:
+        # Unknown model: leave num_ctx to Ollama's default.
+        return ModelProfile(num_ctx=0, num_predict=int(num_predict), prompt_chars=MAX_PROMPT_CHARS)
+    # Small models get small contexts: prompt-eval cost grows with num_ctx even when it is mostly empty.
+    params = info.params_b
+    if params and params <= 2.0:
+        num_ctx = 4096
+    elif params and params <= 9.0:
+        num_ctx = 8192
+    else:
+        num_ctx = 16384
+    if info.context_length:
+        num_ctx = min(num_ctx, info.context_length)
+    num_predict = max(32, min(int(num_predict), num_ctx // 4))
+    prompt_chars = int((num_ctx - num_predict) * CHARS_PER_TOKEN)
+    return ModelProfile(num_ctx=num_ctx, num_predict=num_predict, prompt_chars=min(prompt_chars, MAX_PROMPT_CHARS))
+
+
+class ModelRegistry:
+    def __init__(self, path=MODEL_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._cache = _CacheFile()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            self._cache = _CacheFile(updated_at=float(raw.get("updated_at", 0.0)), models=dict(raw.get("models", {})))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning("Model cache unreadable, ignoring: %s", e)
+
+    def _save(self) -> None:
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(asdict(self._cache), indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception as e:
+            log.warning("Could not write model cache: %s", e)
+
+    @property
+    def stale(self) -> bool:
+        return (time.time() - self._cache.updated_at) > MODEL_CACHE_MAX_AGE_SECONDS
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._cache.models)
+
+    def get(self, name: str) -> Optional[ModelInfo]:
+        with self._lock:
+            raw = self._cache.models.get(name)
+        return ModelInfo(**raw) if raw else None
+
+    def profile(self, name: str, num_predict: int = DEFAULT_NUM_PREDICT) -> ModelProfile:
+        return profile_for(self.get(name), num_predict)
+
+    def refresh(self) -> List[str]:
+        tags = ollama_tags()
+        with self._lock:
+            known = dict(self._cache.models)
+
+        models: Dict[str, dict] = {}
+        for t in tags:
+            name = t["name"]
+            details = t.get("details") or {}
+            info = ModelInfo(
+                name=name,
+                digest=t.get("digest", ""),
+                size=int(t.get("size") or 0),
+                family=details.get("family", ""),
+                parameter_size=details.get("parameter_size", ""),
+                quantization=details.get("quantization_level", ""),
+            )
+            old = known.get(name)
+            if old and old.get("digest") == info.digest and old.get("context_length"):
+                info.context_length = int(old["context_length"])
+            else:
+                # /api/show is only needed for new or re-pulled models.
+                try:
+                    show = ollama_show(name)
+                    for key, value in (show.get("model_info") or {}).items():
+                        if key.endswith(".context_length"):
+                            info.context_length = int(value)
+                            break
+                except Exception as e:
+                    log.warning("ollama_show failed for %s: %s", name, e)
+            models[name] = asdict(info)
+
+        with self._lock:
+            self._cache = _CacheFile(updated_at=time.time(), models=models)
+            self._save()
+        return sorted(models)
+
+    def refresh_async(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception as e:
+                log.warning("Model registry refresh failed: %s", e)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_run, daemon=True).start()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def model_registry() -> ModelRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from .config import (
+    WEB_PASSAGE_BM25_B,
+    WEB_PASSAGE_BM25_K1,
+    WEB_PASSAGE_CHARS,
+    WEB_PASSAGE_DUP_JACCARD,
+    WEB_PASSAGES_PER_SOURCE,
+)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by can do does for from had has have how i if in into is it its
+    of on or so than that the their them then there these they this to was we were what when
+    where which who why will with you your about
+    """.split()
+)
+
+
+@dataclass
+class Passage:
+    source: int
+    position: int
+    text: str
+    tokens: List[str] = field(repr=False)
+    terms: Counter = field(repr=False)
+    score: float = 0.0
+
+
+def terms_of(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS and (len(w) > 1 or w.isdigit())]
+
+
+def _pieces(text: str, window: int) -> List[str]:
+    # Sentences, with run-on text (menus, tables) hard-split on whitespace.
+    out: List[str] = []
+    for s in _SENTENCE.split(text):
+        s = s.strip()
+        while len(s) > window:
+            cut = s.rfind(" ", 0, window)
+            cut = cut if cut > window // 2 else window
+            out.append(s[:cut].strip())
+            s = s[cut:].strip()
+        if s:
+            out.append(s)
+    return out
+
+
+def split_passages(text: str, window: int = WEB_PASSAGE_CHARS) -> List[str]:
+    # Windows of whole sentences; consecutive windows share one sentence so answers that
+    # straddle a boundary survive in at least one of them.
+    pieces = _pieces(text or "", window)
+    windows: List[str] = []
+    i = 0
+    while i < len(pieces):
+        j, size = i, 0
+        while j < len(pieces) and (size == 0 or size + len(pieces[j]) + 1 <= window):
+            size += len(pieces[j]) + 1
+            j += 1
+        windows.append(" ".join(pieces[i:j]))
+        if j >= len(pieces):
+            break
+        i = j - 1 if j - 1 > i else j
+    return windows
+
+
+def _shingles(terms: Sequence[str], n: int = 3) -> set:
+    if len(terms) < n:
+        return {tuple(terms)} if terms else set()
+    return {tuple(terms[k : k + n]) for k in range(len(terms) - n + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def score_passages(query: str, passages: List[Passage]) -> None:
+    q_terms = list(dict.fromkeys(terms_of(query)))
+    if not q_terms or not passages:
+        return
+    n = len(passages)
+    avg_len = sum(sum(p.terms.values()) for p in passages) / n or 1.0
+    df: Dict[str, int] = {t: sum(1 for p in passages if t in p.terms) for t in q_terms}
+    idf = {t: math.log(1.0 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in q_terms}
+    k1, b = WEB_PASSAGE_BM25_K1, WEB_PASSAGE_BM25_B
+    for p in passages:
+        length = sum(p.terms.values())
+        bm25 = 0.0
+        hit = 0
+        for t in q_terms:
+            tf = p.terms.get(t, 0)
+            if not tf:
+                continue
+            hit += 1
+            bm25 += idf[t] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        # Passages covering more of the query beat ones repeating a single term.
+        coverage = hit / len(q_terms)
+        p.score = bm25 * (0.5 + 0.5 * coverage) / (1.0 + 0.02 * p.position)
+
+
+def select_passages(query: str, pages: List[dict], budget: int) -> Dict[int, List[str]]:
+    # {page index: [passage, ...]} in page order, chosen best-first until the budget is spent.
+    passages: List[Passage] = []
+    for idx, page in enumerate(pages):
+        for pos, text in enumerate(split_passages(page.get("text") or "")):
+            tokens = terms_of(text)
+            passages.append(Passage(idx, pos, text, tokens, Counter(tokens)))
+    if not passages:
+        return {}
+
+    score_passages(query, passages)
+    if not any(p.score > 0 for p in passages):
+        # Nothing matches the query terms: fall back to the head of each page.
+        for p in passages:
+            p.score = 1.0 / (1 + p.position)
+    ranked = sorted((p for p in passages if p.score > 0), key=lambda p: p.score, reverse=True)
+
+    chosen: List[Passage] = []
+    seen: List[set] = []
+    per_source: Counter = Counter()
+    used = 0
+    for p in ranked:
+        if per_source[p.source] >= WEB_PASSAGES_PER_SOURCE:
+            continue
+        cost = len(p.text) + 1
+        if used + cost > budget:
+            continue
+        sh = _shingles(p.tokens)
+        # Mirrors and syndicated copies repeat the same paragraph across sources.
+        if any(_jaccard(sh, other) >= WEB_PASSAGE_DUP_JACCARD for other in seen):
+            continue
+        chosen.append(p)
+        seen.append(sh)
+        per_source[p.source] += 1
+        used += cost
+
+    out: Dict[int, List[str]] = {}
+    for p in sorted(chosen, key=lambda p: (p.source, p.position)):
+        out.setdefault(p.source, []).append(p.text)
+    return out
@@ -1,46 +1,84 @@
 from __future__ import annotations
 
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import random
 import re
+import shutil
 import sys
 import threading
 import time
 import traceback
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 from urllib.parse import urlparse
 
-import tkinter as tk
-from tkinter import messagebox
+from .config import (
+    APP_TITLE,
+    LOG_BACKUP_COUNT,
+    LOG_COMPRESS,
+    LOG_JSON,
+    LOG_JSON_PATH,
+    LOG_MAX_BYTES,
+    LOG_PATH,
+    MAX_PROMPT_CHARS,
+    TRACE_PATH,
+    ensure_data_dir,
+)
 
-from .config import APP_TITLE, BLOCKED_DOMAINS, LOG_PATH, MAX_PROMPT_CHARS
+_optional_modules: dict[str, Any] = {}
+_optional_lock = threading.Lock()
+
+
+def optional_import(module: str, attr: Optional[str] = None) -> Any:
+    # Optional backends are imported on first use (not at startup); failures are cached as None.
+    key = f"{module}:{attr or ''}"
+    with _optional_lock:
+        if key not in _optional_modules:
+            try:
+                mod = __import__(module, fromlist=[attr] if attr else [])
+                _optional_modules[key] = getattr(mod, attr) if attr else mod
+            except Exception:
+                _optional_modules[key] = None
+        return _optional_modules[key]
 
 
 def now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def new_session_id() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S") + "-" + os.urandom(2).hex()
+
+
 def domain_of(url: str) -> str:
     try:
-        netloc = (urlparse(url).netloc or "").lower()
-        if netloc.startswith("www."):
-            netloc = netloc[4:]
-        return netloc
+        host = (urlparse(url).hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        return host
     except Exception:
         return ""
 
 
 def is_blocked_url(url: str) -> bool:
+    from .blocklist import blocklist
+
     d = domain_of(url)
-    return d in BLOCKED_DOMAINS if d else False
+    return blocklist().is_blocked(d) if d else False
 
 
-def truncate_prompt(s: str) -> str:
-    if len(s) <= MAX_PROMPT_CHARS:
+def truncate_prompt(s: str, max_chars: Optional[int] = None) -> str:
+    limit = min(max_chars or MAX_PROMPT_CHARS, MAX_PROMPT_CHARS)
+    if len(s) <= limit:
         return s
-    head = s[: int(MAX_PROMPT_CHARS * 0.75)]
-    tail = s[-int(MAX_PROMPT_CHARS * 0.20) :]
+    head = s[: int(limit * 0.75)]
+    tail = s[-int(limit * 0.20) :]
     return head + "\n\n[...TRUNCATED...]\n\n" + tail
 
 
@@ -49,27 +87,118 @@ def cap(text: str, n: int) -> str:
     return text if len(text) <= n else text[:n] + " …"
 
 
-def setup_logging() -> None:
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        obj = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            obj["trace_id"] = trace_id
+        if record.exc_info:
+            obj["exc"] = self.formatException(record.exc_info)
+        return json.dumps(obj, ensure_ascii=False)
+
+
+TRACE_LOGGER = "thelocalai.trace"
+
+
+class TraceLineFormatter(logging.Formatter):
+    # Trace records carry the trace dict as msg; it is serialized here, on the listener thread.
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False)
+
+
+class _RawQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _rotating_handler(path, formatter: logging.Formatter) -> logging.Handler:
+    h = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    if LOG_COMPRESS:
+        h.namer = lambda name: name + ".gz"
+        h.rotator = _gzip_rotator
+    h.setFormatter(formatter)
+    return h
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(*, json_lines: bool = LOG_JSON) -> None:
+    # Callers only enqueue records; file/console I/O, rotation and gzip happen on the listener thread.
+    global _listener
     logger = logging.getLogger("thelocalai")
+    if logger.handlers:
+        return
+    ensure_data_dir()
     logger.setLevel(logging.INFO)
-    fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
+    fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(threadName)s | %(message)s")
+
+    handlers: list[logging.Handler] = [_rotating_handler(LOG_PATH, fmt)]
+    if json_lines:
+        handlers.append(_rotating_handler(LOG_JSON_PATH, JsonLineFormatter()))
+    if sys.stdout is not None:
+        sh = logging.StreamHandler(sys.stdout)
+        sh.setFormatter(fmt)
+        handlers.append(sh)
+    # Finished traces share the queue but only go to traces.jsonl, rotated like the logs.
+    for h in handlers:
+        h.addFilter(lambda r: r.name != TRACE_LOGGER)
+    th = _rotating_handler(TRACE_PATH, TraceLineFormatter())
+    th.addFilter(lambda r: r.name == TRACE_LOGGER)
+    handlers.append(th)
+
+    from .tracing import TraceIdFilter
+
+    qh = logging.handlers.QueueHandler(queue.SimpleQueue())
+    qh.setLevel(logging.INFO)
+    # Runs on the calling thread, where the active trace is still visible.
+    qh.addFilter(TraceIdFilter())
+    logger.addHandler(qh)
 
-    fh = logging.FileHandler(LOG_PATH, encoding="utf-8")
-    fh.setFormatter(fmt)
-    fh.setLevel(logging.INFO)
+    trace_logger = logging.getLogger(TRACE_LOGGER)
+    trace_logger.propagate = False
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.addHandler(_RawQueueHandler(qh.queue))
 
-    sh = logging.StreamHandler(sys.stdout)
-    sh.setFormatter(fmt)
-    sh.setLevel(logging.INFO)
+    _listener = logging.handlers.QueueListener(qh.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
-    if not logger.handlers:
-        logger.addHandler(fh)
-        logger.addHandler(sh)
+
+def shutdown_logging() -> None:
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for h in listener.handlers:
+        try:
+            h.close()
+        except Exception:
+            pass
 
 
-def install_exception_hooks(log: logging.Logger) -> None:
+def install_exception_hooks(log: logging.Logger, *, popups: bool = True) -> None:
     def _show_crash_popup(title: str, body: str) -> None:
+        if not popups:
+            return
         try:
+            import tkinter as tk
+            from tkinter import messagebox
+
             root = tk._default_root
             if root is None:
                 tmp = tk.Tk()
@@ -98,6 +227,19 @@ def install_exception_hooks(log: logging.Logger) -> None:
         threading.excepthook = _thread_excepthook
 
 
+def system_load_ratio() -> Optional[float]:
+    psutil = optional_import("psutil")
+    if psutil is not None:
+        try:
+            return float(psutil.cpu_percent(interval=None)) / 100.0
+        except Exception:
+            pass
+    try:
+        return os.getloadavg()[0] / max(1, os.cpu_count() or 1)
+    except Exception:
+        return None
+
+
 def random_matrix_speed() -> int:
     r = random.random()
     if r < 0.12:
@@ -5,17 +5,27 @@ import hashlib
 import hmac
 import json
 import os
+import logging
 import socket
 import sys
+import threading
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Callable, Optional
 
-import tkinter as tk
-from tkinter import messagebox
+from .config import (
+    APP_TITLE,
+    DEV_AUTH_PATH,
+    IPC_MAX_BYTES,
+    IPC_TIMEOUT_SECONDS,
+    SINGLE_INSTANCE_HOST,
+    SINGLE_INSTANCE_PORT,
+    SINGLE_INSTANCE_TOKEN_PATH,
+)
 
-from .config import APP_TITLE, DEV_AUTH_PATH, SINGLE_INSTANCE_HOST, SINGLE_INSTANCE_PORT
+log = logging.getLogger("thelocalai")
 
 _instance_socket: Optional[socket.socket] = None
+_instance_token: Optional[str] = None
 
 
 def _pbkdf2_hash_password(password: str, salt: bytes) -> str:
@@ -49,32 +59,113 @@ def dev_auth_check_password(password: str) -> bool:
         return False
 
 
-def acquire_single_instance_lock() -> None:
-    global _instance_socket
+def try_single_instance_lock() -> bool:
+    global _instance_socket, _instance_token
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         if os.name == "nt":
             s.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
         s.bind((SINGLE_INSTANCE_HOST, SINGLE_INSTANCE_PORT))
-        s.listen(1)
-        _instance_socket = s
+        s.listen(5)
     except OSError:
         try:
             s.close()
         except Exception:
             pass
-        root = tk.Tk()
-        root.withdraw()
-        messagebox.showinfo(APP_TITLE, f"{APP_TITLE} is already running.")
-        root.destroy()
+        return False
+    _instance_socket = s
+    # Other local processes may connect to the port; only ones that can read our data dir are trusted.
+    _instance_token = base64.urlsafe_b64encode(os.urandom(18)).decode("ascii")
+    try:
+        SINGLE_INSTANCE_TOKEN_PATH.write_text(_instance_token, encoding="utf-8")
+    except OSError as e:
+        log.warning("Could not write instance token (IPC disabled): %s", e)
+        _instance_token = None
+    return True
+
+
+def acquire_single_instance_lock(message: str = "") -> None:
+    if try_single_instance_lock():
+        return
+    if forward_to_running_instance(message):
         sys.exit(0)
 
+    import tkinter as tk
+    from tkinter import messagebox
+
+    root = tk.Tk()
+    root.withdraw()
+    messagebox.showinfo(APP_TITLE, f"{APP_TITLE} is already running.")
+    root.destroy()
+    sys.exit(0)
+
+
+def forward_to_running_instance(message: str = "") -> bool:
+    try:
+        token = SINGLE_INSTANCE_TOKEN_PATH.read_text(encoding="utf-8").strip()
+    except OSError:
+        return False
+    req = {"v": 1, "token": token, "cmd": "message" if message.strip() else "raise", "text": message.strip()}
+    try:
+        with socket.create_connection((SINGLE_INSTANCE_HOST, SINGLE_INSTANCE_PORT), timeout=IPC_TIMEOUT_SECONDS) as c:
+            c.sendall(json.dumps(req).encode("utf-8") + b"\n")
+            reply = c.makefile("rb").readline(IPC_MAX_BYTES)
+        return bool(json.loads(reply.decode("utf-8") or "{}").get("ok"))
+    except (OSError, ValueError):
+        return False
+
+
+def serve_instance_ipc(on_request: Callable[[dict], None]) -> None:
+    sock = _instance_socket
+    if sock is None or _instance_token is None:
+        return
+
+    def _handle(conn: socket.socket) -> None:
+        ok = False
+        try:
+            conn.settimeout(IPC_TIMEOUT_SECONDS)
+            line = conn.makefile("rb").readline(IPC_MAX_BYTES)
+            req = json.loads(line.decode("utf-8"))
+            if isinstance(req, dict) and hmac.compare_digest(str(req.get("token", "")), _instance_token or ""):
+                on_request({"cmd": str(req.get("cmd") or "raise"), "text": str(req.get("text") or "")})
+                ok = True
+            else:
+                log.warning("IPC: rejected request with a bad token")
+            conn.sendall(json.dumps({"ok": ok}).encode("utf-8") + b"\n")
+        except Exception as e:
+            log.warning("IPC: request failed: %s", e)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _accept_loop() -> None:
+        while True:
+            try:
+                conn, _addr = sock.accept()
+            except OSError:
+                return  # lock socket closed on shutdown
+            _handle(conn)
+
+    threading.Thread(target=_accept_loop, name="instance-ipc", daemon=True).start()
+
 
 def release_single_instance_lock() -> None:
-    global _instance_socket
+    global _instance_socket, _instance_token
     try:
         if _instance_socket:
+            try:
+                _instance_socket.shutdown(socket.SHUT_RDWR)  # wakes the blocked accept() on Linux
+            except OSError:
+                pass
             _instance_socket.close()
     except Exception:
         pass
+    if _instance_token:
+        try:
+            SINGLE_INSTANCE_TOKEN_PATH.unlink()
+        except OSError:
+            pass
     _instance_socket = None
+    _instance_token = None
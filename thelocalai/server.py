@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional
+
+from .config import (
+    API_HOST,
+    API_MAX_BODY_BYTES,
+    API_PORT,
+    API_WORKERS,
+    APP_TITLE,
+    DEFAULT_MODEL,
+    DEFAULT_NUM_PREDICT,
+    DEFAULT_TEMPERATURE,
+    MAX_USER_CHARS,
+)
+from .maintenance import start_maintenance
+from .models import model_registry
+from .sessions import chat_engine
+from .tracing import recent_traces, stage_percentiles
+
+log = logging.getLogger("thelocalai")
+
+
+class PooledHTTPServer(HTTPServer):
+    def __init__(self, addr, handler, *, workers: int = API_WORKERS):
+        super().__init__(addr, handler)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = f"{APP_TITLE}API/1"
+
+    def log_message(self, fmt, *args):
+        log.info("api %s - %s", self.address_string(), fmt % args)
+
+    def _send_json(self, status: int, obj: dict) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Optional[dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > API_MAX_BODY_BYTES:
+            self._send_json(413 if length > 0 else 400, {"error": "missing or oversized body"})
+            return None
+        try:
+            obj = json.loads(self.rfile.read(length).decode("utf-8"))
+        except Exception:
+            self._send_json(400, {"error": "invalid JSON"})
+            return None
+        if not isinstance(obj, dict):
+            self._send_json(400, {"error": "expected a JSON object"})
+            return None
+        return obj
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"ok": True})
+        elif self.path == "/api/models":
+            registry = model_registry()
+            if not registry.names():
+                try:
+                    registry.refresh()
+                except Exception as e:
+                    log.warning("Model registry refresh failed: %s", e)
+            elif registry.stale:
+                registry.refresh_async()
+            self._send_json(200, {"models": [asdict(registry.get(n)) for n in registry.names()]})
+        elif self.path == "/api/traces":
+            stages = {k: {"p50_ms": v[0], "p95_ms": v[1], "n": v[2]} for k, v in stage_percentiles().items()}
+            self._send_json(200, {"stages": stages, "recent": recent_traces()})
+        elif self.path == "/api/sessions":
+            self._send_json(200, chat_engine().stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+        req = self._read_json()
+        if req is None:
+            return
+
+        message = str(req.get("message") or "").strip()
+        if not message:
+            self._send_json(400, {"error": "message is required"})
+            return
+        if len(message) > MAX_USER_CHARS:
+            self._send_json(400, {"error": f"message too long (max {MAX_USER_CHARS})"})
+            return
+
+        model = str(req.get("model") or DEFAULT_MODEL)
+        # Each client session gets its own history; concurrent sessions share Ollama fairly.
+        session_id = str(req.get("session_id") or self.headers.get("X-Session-Id") or "api")[:64]
+        try:
+            num_predict = int(req.get("num_predict", DEFAULT_NUM_PREDICT))
+            temperature = float(req.get("temperature", DEFAULT_TEMPERATURE))
+        except (TypeError, ValueError):
+            self._send_json(400, {"error": "num_predict/temperature must be numeric"})
+            return
+
+        engine = chat_engine()
+        kwargs = dict(num_predict=num_predict, temperature=temperature)
+        if not req.get("stream"):
+            try:
+                result = engine.chat(session_id, model, message, **kwargs)
+            except Exception as e:
+                log.exception("api chat failed")
+                self._send_json(502, {"error": str(e)})
+                return
+            self._send_json(200, asdict(result))
+            return
+
+        # NDJSON stream: one {"delta": ...} per token, then a final object with "done": true.
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def _line(obj: dict) -> None:
+            self.wfile.write(json.dumps(obj).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        try:
+            result = engine.chat(session_id, model, message, on_token=lambda tok: _line({"delta": tok}), **kwargs)
+            _line({"done": True, **asdict(result)})
+        except (BrokenPipeError, ConnectionResetError):
+            log.info("api client disconnected mid-stream")
+        except Exception as e:
+            log.exception("api chat stream failed")
+            try:
+                _line({"done": True, "error": str(e)})
+            except Exception:
+                pass
+
+
+def serve(host: str = API_HOST, port: int = API_PORT, *, workers: int = API_WORKERS) -> None:
+    httpd = PooledHTTPServer((host, port), ApiHandler, workers=workers)
+    start_maintenance()
+    log.info("%s headless API listening on http://%s:%s (%d workers)", APP_TITLE, host, port, workers)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        log.info("%s headless API stopped", APP_TITLE)
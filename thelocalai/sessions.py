@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+from .chat_logic import ChatResult, generate_reply
+from .config import SESSION_IDLE_SECONDS, SESSION_ISOLATE_HISTORY
+from .db import db_connect
+from .limiter import ollama_limiter, session_scope
+from .tracing import Trace
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    created: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    turns: int = 0
+    pending: int = 0
+    errors: int = 0
+    latencies_ms: Deque[int] = field(default_factory=lambda: deque(maxlen=50), repr=False)
+
+    def to_dict(self) -> dict:
+        lat = sorted(self.latencies_ms)
+        return {
+            "session_id": self.session_id,
+            "turns": self.turns,
+            "pending": self.pending,
+            "errors": self.errors,
+            "last_used": self.last_used,
+            "p50_ms": lat[len(lat) // 2] if lat else None,
+        }
+
+
+class ChatEngine:
+    # Runs generate_reply for many sessions at once. Turns within one session are serialized
+    # (its history must be written before the next turn reads it); different sessions proceed in
+    # parallel and share Ollama through the fair limiter in limiter.py.
+    def __init__(self, *, isolate_history: bool = SESSION_ISOLATE_HISTORY):
+        self.isolate_history = isolate_history
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, SessionState] = {}
+        self._local = threading.local()
+
+    def _db(self) -> sqlite3.Connection:
+        # Worker threads are long-lived, so each keeps one connection for its lifetime.
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = db_connect()
+            self._local.con = con
+        return con
+
+    def session(self, session_id: str) -> SessionState:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = SessionState(session_id)
+            return state
+
+    def chat(
+        self,
+        session_id: str,
+        model: str,
+        message: str,
+        *,
+        num_predict: int,
+        temperature: float,
+        on_token: Optional[Callable[[str], None]] = None,
+        trace: Optional[Trace] = None,
+        con: Optional[sqlite3.Connection] = None,
+    ) -> ChatResult:
+        state = self.session(session_id)
+        with self._lock:
+            state.pending += 1
+        try:
+            with state.lock, session_scope(session_id):
+                result = generate_reply(
+                    con or self._db(),
+                    model,
+                    message,
+                    num_predict=num_predict,
+                    temperature=temperature,
+                    session_id=session_id,
+                    on_token=on_token,
+                    trace=trace,
+                    isolate_history=self.isolate_history,
+                )
+        except Exception:
+            with self._lock:
+                state.errors += 1
+            raise
+        finally:
+            with self._lock:
+                state.pending -= 1
+                state.last_used = time.time()
+        with self._lock:
+            state.turns += 1
+            if result.latency_ms is not None:
+                state.latencies_ms.append(result.latency_ms)
+        return result
+
+    def prune(self, idle_seconds: float = SESSION_IDLE_SECONDS) -> int:
+        cutoff = time.time() - idle_seconds
+        with self._lock:
+            stale = [sid for sid, s in self._sessions.items() if s.pending == 0 and s.last_used < cutoff]
+            for sid in stale:
+                del self._sessions[sid]
+        return len(stale)
+
+    def stats(self) -> dict:
+        self.prune()
+        with self._lock:
+            sessions = [s.to_dict() for s in self._sessions.values()]
+        sessions.sort(key=lambda d: d["last_used"], reverse=True)
+        return {"sessions": sessions, "limiter": ollama_limiter().stats()}
+
+
+_engine: Optional[ChatEngine] = None
+_engine_lock = threading.Lock()
+
+
+def chat_engine() -> ChatEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ChatEngine()
+        return _engine
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import TRACE_BUFFER_SIZE, TRACE_ENABLED
+from .runtime import TRACE_LOGGER, now_utc_iso
+
+log = logging.getLogger("thelocalai")
+# Handled by runtime.setup_logging: queued, then written and rotated on the log listener thread.
+trace_log = logging.getLogger(TRACE_LOGGER)
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float
+    duration_ms: float
+    attrs: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    kind: str
+    trace_id: str = field(default_factory=lambda: os.urandom(6).hex())
+    started_at: str = field(default_factory=now_utc_iso)
+    t0: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    attrs: Dict[str, object] = field(default_factory=dict)
+    finished: bool = False
+    duration_ms: Optional[float] = None
+
+    def add(self, name: str, duration_ms: float, *, start: Optional[float] = None, **attrs) -> None:
+        start_ms = ((start if start is not None else time.perf_counter() - duration_ms / 1000.0) - self.t0) * 1000.0
+        self.spans.append(Span(name, round(start_ms, 2), round(duration_ms, 2), attrs))
+
+    @property
+    def total_ms(self) -> float:
+        if self.duration_ms is not None:
+            return self.duration_ms
+        return (time.perf_counter() - self.t0) * 1000.0
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms, 2),
+            "attrs": dict(self.attrs),
+            "spans": [{"name": s.name, "start_ms": s.start_ms, "ms": s.duration_ms, **s.attrs} for s in self.spans],
+        }
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("thelocalai_trace", default=None)
+_lock = threading.Lock()
+_recent: "deque[Trace]" = deque(maxlen=TRACE_BUFFER_SIZE)
+_stage_samples: Dict[str, "deque[float]"] = {}
+
+
+def begin_trace(kind: str, **attrs) -> Trace:
+    return Trace(kind=kind, attrs=dict(attrs))
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[None]:
+    trace = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add(name, (time.perf_counter() - started) * 1000.0, start=started, **attrs)
+
+
+class TraceIdFilter(logging.Filter):
+    # Tags log records with the active trace so JSON log lines can be joined to traces.jsonl.
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = _current.get()
+        if trace is not None:
+            record.trace_id = trace.trace_id
+        return True
+
+
+def record_span(name: str, duration_ms: float, **attrs) -> None:
+    # Attach to the active trace, or feed the stage stats directly (e.g. TTS on its own thread).
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, duration_ms, **attrs)
+        return
+    with _lock:
+        _stage_samples.setdefault(name, deque(maxlen=TRACE_BUFFER_SIZE)).append(duration_ms)
+
+
+def finish_trace(trace: Trace) -> None:
+    if trace.finished:
+        return
+    trace.finished = True
+    trace.duration_ms = trace.total_ms
+    trace.add("total", trace.duration_ms, start=trace.t0)
+    with _lock:
+        _recent.append(trace)
+        for s in trace.spans:
+            _stage_samples.setdefault(s.name, deque(maxlen=TRACE_BUFFER_SIZE)).append(s.duration_ms)
+    if TRACE_ENABLED:
+        trace_log.info(trace.to_dict())
+
+
+def recent_traces(limit: int = 20) -> List[dict]:
+    with _lock:
+        return [t.to_dict() for t in list(_recent)[-limit:]]
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def stage_percentiles() -> Dict[str, Tuple[float, float, int]]:
+    with _lock:
+        samples = {k: sorted(v) for k, v in _stage_samples.items() if v}
+    return {k: (_percentile(v, 0.50), _percentile(v, 0.95), len(v)) for k, v in samples.items()}
@@ -4,7 +4,7 @@ import tkinter as tk
 from tkinter import ttk
 
 from .config import APP_TITLE, DEFAULT_MODEL, THEME
-from .ui_components import ChatLog, MatrixRain
+from .ui_components import ChatLog, MatrixPowerScheduler, MatrixRain
 
 
 def configure_ttk() -> None:
@@ -41,6 +41,7 @@ def build_ui(app) -> None:
 
     ttk.Button(header, text="Unlock Dev", command=app.unlock_dev_mode).pack(side=tk.LEFT, padx=(10, 0))
     ttk.Button(header, text="Lock", command=app.lock_dev_mode).pack(side=tk.LEFT, padx=(6, 0))
+    ttk.Button(header, text="Diagnostics", command=app.open_diagnostics).pack(side=tk.LEFT, padx=(6, 0))
 
     ttk.Checkbutton(
         header,
@@ -85,6 +86,16 @@ def build_ui(app) -> None:
     app.model_var = tk.StringVar(value=DEFAULT_MODEL)
     app.model_combo = ttk.Combobox(toolbar, textvariable=app.model_var, values=[DEFAULT_MODEL], state="readonly", width=28)
     app.model_combo.pack(side=tk.LEFT, padx=(6, 10))
+    app.model_combo.bind("<<ComboboxSelected>>", app._on_model_selected)
+
+    app.model_state_var = tk.StringVar(value="")
+    tk.Label(
+        toolbar,
+        textvariable=app.model_state_var,
+        bg=THEME["bg"],
+        fg=THEME["green_dim"],
+        font=("Consolas", 9),
+    ).pack(side=tk.LEFT, padx=(0, 10))
 
     ttk.Button(toolbar, text="Refresh", command=app.refresh_models).pack(side=tk.LEFT, padx=(0, 8))
     ttk.Button(toolbar, text="Clear Chat", command=app._clear_chat).pack(side=tk.LEFT, padx=(0, 8))
@@ -128,4 +139,5 @@ def build_ui(app) -> None:
     app.matrix_canvas.pack(fill=tk.BOTH, expand=True)
 
     app.matrix = MatrixRain(app.matrix_canvas)
+    app.matrix_power = MatrixPowerScheduler(app.root, app.matrix)
     app.matrix_canvas.bind("<Configure>", app._on_matrix_resize)
@@ -1,20 +1,159 @@
 from __future__ import annotations
 
+import json
+import queue
 import random
+import threading
 import time
-from typing import Optional
+from collections import deque
+from typing import Any, Callable, Optional
 
 import tkinter as tk
 from tkinter import ttk
 
-from .config import THEME
-from .runtime import random_matrix_speed
+from .config import (
+    CHATLOG_MAX_LINES,
+    CHATLOG_PAGE_ENTRIES,
+    CHATLOG_SPOOL_MAX_ENTRIES,
+    CHATLOG_SPOOL_PATH,
+    DIAG_REFRESH_MS,
+    MATRIX_DEGRADED_FPS,
+    MATRIX_IDLE_SECONDS,
+    MATRIX_LOAD_PAUSE_RATIO,
+    MATRIX_LOAD_RESUME_RATIO,
+    MATRIX_POWER_CHECK_MS,
+    THEME,
+    UI_FALLBACK_POLL_MS,
+)
+from .diagnostics import (
+    fmt_size,
+    rss_history,
+    snapshot_diff,
+    start_tracemalloc,
+    stop_tracemalloc,
+    take_snapshot,
+    top_allocators,
+    tracemalloc_running,
+    tracemalloc_summary,
+)
+from .runtime import random_matrix_speed, system_load_ratio
+
+
+class UiDispatcher:
+    # Worker threads put(); the first put since the last drain generates one virtual event,
+    # and the Tk side hands everything queued so far to the handler in a single pass.
+    EVENT = "<<TheLocalAIDispatch>>"
+
+    def __init__(self, root: tk.Tk, handler: Callable[[list], None]):
+        self.root = root
+        self.handler = handler
+        self.closed = False
+        self._q: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._wake_pending = False
+        self._poll_after: Optional[str] = None
+        self.wakeups = 0
+        self.delivered = 0
+
+        try:
+            # Without a thread-enabled Tcl, event_generate from other threads is unsafe.
+            self.threaded = bool(int(root.tk.eval("set tcl_platform(threaded)")))
+        except Exception:
+            self.threaded = False
+        root.bind(self.EVENT, self._on_wake, add="+")
+        # Items put before mainloop starts may have failed to wake it; pick them up once it runs.
+        root.after_idle(self._drain)
+        if not self.threaded:
+            self._poll_after = root.after(UI_FALLBACK_POLL_MS, self._poll)
+
+    def qsize(self) -> int:
+        return self._q.qsize()
+
+    def put(self, item: Any) -> None:
+        if self.closed:
+            return
+        self._q.put(item)
+        if not self.threaded:
+            return
+        with self._lock:
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        try:
+            self.root.event_generate(self.EVENT, when="tail")
+        except Exception:
+            # Root already destroyed, or Tk refused the cross-thread call.
+            with self._lock:
+                self._wake_pending = False
+
+    def _on_wake(self, _evt=None):
+        with self._lock:
+            self._wake_pending = False
+        self.wakeups += 1
+        self._drain()
+
+    def _poll(self):
+        self._poll_after = None
+        if self.closed:
+            return
+        self._drain()
+        self._poll_after = self.root.after(UI_FALLBACK_POLL_MS, self._poll)
+
+    def _drain(self):
+        if self.closed:
+            return
+        items = []
+        while True:
+            try:
+                items.append(self._q.get_nowait())
+            except queue.Empty:
+                break
+        if items:
+            self.delivered += len(items)
+            self.handler(items)
+
+    def close(self):
+        self.closed = True
+        if self._poll_after:
+            try:
+                self.root.after_cancel(self._poll_after)
+            except Exception:
+                pass
+            self._poll_after = None
 
 
 class ChatLog(tk.Frame):
-    def __init__(self, master: tk.Widget):
+    TAGS = {"system", "error", "user", "assistant"}
+
+    def __init__(
+        self,
+        master: tk.Widget,
+        *,
+        max_lines: int = CHATLOG_MAX_LINES,
+        spool_path=CHATLOG_SPOOL_PATH,
+        spool_max_entries: int = CHATLOG_SPOOL_MAX_ENTRIES,
+    ):
         super().__init__(master, bg=THEME["bg"])
 
+        self.max_lines = max(50, int(max_lines))
+        self.spool_path = spool_path
+        self.spool_max_entries = max(CHATLOG_PAGE_ENTRIES, int(spool_max_entries))
+
+        self._pending: list[tuple[str, str]] = []
+        self._flush_after: Optional[str] = None
+        self._page_after: Optional[str] = None
+
+        # Old entries beyond max_lines are spooled to disk and paged back in on scroll-to-top.
+        # Entry indices: [_spool_first, _spooled) are on disk; the widget shows [_view_start, _next_index).
+        # _spool_offsets[i - _spool_first] is where entry i starts in the spool file.
+        self._spool = open(self.spool_path, "w+b")
+        self._spool_offsets: list[int] = []
+        self._spool_first = 0
+        self._spooled = 0
+        self._view_start = 0
+        self._next_index = 0
+        self._view_lines: deque[int] = deque()
+
         self.text = tk.Text(
             self,
             wrap=tk.WORD,
@@ -30,7 +169,7 @@ class ChatLog(tk.Frame):
             undo=False,
         )
         self.vbar = ttk.Scrollbar(self, orient="vertical", command=self.text.yview)
-        self.text.configure(yscrollcommand=self.vbar.set)
+        self.text.configure(yscrollcommand=self._on_yscroll)
 
         self.vbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -63,10 +202,39 @@ class ChatLog(tk.Frame):
         self.text.tag_add("sel", "1.0", "end-1c")
         return "break"
 
+    @property
+    def line_count(self) -> int:
+        return sum(self._view_lines)
+
+    @property
+    def spooled_entries(self) -> int:
+        return self._spooled
+
     def clear(self):
+        self._pending.clear()
         self.text.config(state=tk.NORMAL)
         self.text.delete("1.0", tk.END)
         self.text.config(state=tk.DISABLED)
+        self._spool.seek(0)
+        self._spool.truncate()
+        self._spool_offsets.clear()
+        self._spool_first = 0
+        self._spooled = 0
+        self._view_start = 0
+        self._next_index = 0
+        self._view_lines.clear()
+
+    def close(self):
+        for timer in (self._flush_after, self._page_after):
+            try:
+                if timer:
+                    self.after_cancel(timer)
+            except Exception:
+                pass
+        try:
+            self._spool.close()
+        except Exception:
+            pass
 
     def write(self, text: str, kind: str = "assistant"):
         text = (text or "")
@@ -75,12 +243,125 @@ class ChatLog(tk.Frame):
         if not text.endswith("\n\n"):
             text += "\n"
 
-        tag = kind if kind in {"system", "error", "user", "assistant"} else "assistant"
+        tag = kind if kind in self.TAGS else "assistant"
+        self._pending.append((text, tag))
+        if self._flush_after is None:
+            self._flush_after = self.after_idle(self._flush)
 
+    def flush(self):
+        if self._flush_after is not None:
+            try:
+                self.after_cancel(self._flush_after)
+            except Exception:
+                pass
+        self._flush()
+
+    def _flush(self):
+        self._flush_after = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        follow = self.text.yview()[1] >= 0.999
+
+        self.text.config(state=tk.NORMAL)
+        for text, tag in pending:
+            self.text.insert(tk.END, text, tag)
+            self._view_lines.append(text.count("\n"))
+            self._next_index += 1
+        # While the user is scrolled up (or reading paged-in history) allow twice the bound and only
+        # trim what is above the view, keeping it on the same line; past 4x trim regardless.
+        self._trim_top(self.max_lines if follow else 2 * self.max_lines, keep_view=not follow)
+        self.text.config(state=tk.DISABLED)
+        if follow:
+            self.text.see(tk.END)
+
+    def _trim_top(self, limit: int, *, keep_view: bool = False):
+        excess = self.line_count - limit
+        if excess <= 0:
+            return
+        top, room = 1, None
+        if keep_view:
+            top = int(self.text.index("@0,0").split(".")[0])
+            if self.line_count <= 4 * self.max_lines:
+                room = top - 1
+        drop_lines = 0
+        while self._view_lines and drop_lines < excess and len(self._view_lines) > 1:
+            n = self._view_lines[0]
+            if room is not None and drop_lines + n > room:
+                break
+            if self._view_start >= self._spooled:
+                text = self.text.get("1.0 + %d lines" % drop_lines, "1.0 + %d lines" % (drop_lines + n))
+                self._spool_append(text, self._tag_at("1.0 + %d lines" % drop_lines))
+            self._view_lines.popleft()
+            self._view_start += 1
+            drop_lines += n
+        if drop_lines:
+            self.text.delete("1.0", "1.0 + %d lines" % drop_lines)
+            if keep_view:
+                self.text.yview("%d.0" % max(1, top - drop_lines))
+        self._spool_trim()
+
+    def _spool_trim(self):
+        # The spool is bounded too: past spool_max_entries (+25% slack, so the rewrite is rare)
+        # the oldest entries are forgotten and the file is compacted.
+        drop = (self._spooled - self._spool_first) - self.spool_max_entries
+        if drop <= self.spool_max_entries // 4:
+            return
+        self._spool.flush()
+        base = self._spool_offsets[drop]
+        self._spool.seek(base)
+        rest = self._spool.read()
+        self._spool.seek(0)
+        self._spool.write(rest)
+        self._spool.truncate()
+        self._spool_offsets = [off - base for off in self._spool_offsets[drop:]]
+        self._spool_first += drop
+
+    def _tag_at(self, index: str) -> str:
+        for tag in self.text.tag_names(index):
+            if tag in self.TAGS:
+                return tag
+        return "assistant"
+
+    def _spool_append(self, text: str, tag: str):
+        self._spool.seek(0, 2)
+        self._spool_offsets.append(self._spool.tell())
+        self._spool.write(json.dumps({"k": tag, "t": text}, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._spooled += 1
+
+    def _spool_read(self, start: int, stop: int) -> list[tuple[str, str]]:
+        if start >= stop:
+            return []
+        self._spool.flush()
+        self._spool.seek(self._spool_offsets[start - self._spool_first])
+        out: list[tuple[str, str]] = []
+        for _ in range(stop - start):
+            obj = json.loads(self._spool.readline().decode("utf-8"))
+            out.append((obj.get("t", ""), obj.get("k", "assistant")))
+        return out
+
+    def _on_yscroll(self, first, last):
+        self.vbar.set(first, last)
+        if float(first) <= 0.0 and self._view_start > self._spool_first and self._page_after is None:
+            self._page_after = self.after_idle(self._page_in)
+
+    def _page_in(self):
+        self._page_after = None
+        if self._view_start <= self._spool_first:
+            return
+        start = max(self._spool_first, self._view_start - CHATLOG_PAGE_ENTRIES)
+        entries = self._spool_read(start, self._view_start)
+        added = 0
         self.text.config(state=tk.NORMAL)
-        self.text.insert(tk.END, text, tag)
+        for text, tag in reversed(entries):
+            self.text.insert("1.0", text, tag)
+            n = text.count("\n")
+            self._view_lines.appendleft(n)
+            added += n
         self.text.config(state=tk.DISABLED)
-        self.text.see(tk.END)
+        self._view_start = start
+        # Keep the line the user was looking at in place.
+        self.text.yview("%d.0" % (added + 1))
 
     def copy_selection(self):
         try:
@@ -97,7 +378,9 @@ class ChatLog(tk.Frame):
 
     def copy_all(self):
         try:
-            all_text = self.text.get("1.0", "end-1c")
+            self.flush()
+            head = self._spool_read(self._spool_first, max(self._spool_first, self._view_start))
+            all_text = "".join(t for t, _ in head) + self.text.get("1.0", "end-1c")
             self.clipboard_clear()
             self.clipboard_append(all_text)
         except Exception:
@@ -122,8 +405,13 @@ class MatrixRain:
         self.max_cols = 160
 
         self.base_fps = 18
+        self.low_power_fps = 12
+        self.degraded_fps = MATRIX_DEGRADED_FPS
         self.fps = self.base_fps
         self._after_id: Optional[str] = None
+        self._low_power = False
+        self._pause_reasons: set[str] = set()
+        self._throttle_reasons: set[str] = set()
         self._frame = 0
 
         self.columns_x: list[int] = []
@@ -194,36 +482,88 @@ class MatrixRain:
                 col_items.append(item)
             self.item_ids.append(col_items)
 
+    @property
+    def paused(self) -> bool:
+        return bool(self._pause_reasons)
+
+    @property
+    def power_state(self) -> str:
+        if self._pause_reasons:
+            return "paused(" + ",".join(sorted(self._pause_reasons)) + ")"
+        if self._throttle_reasons:
+            return "degraded(" + ",".join(sorted(self._throttle_reasons)) + ")"
+        return "low-power" if self._low_power else "full"
+
+    def _fps_ceiling(self) -> int:
+        if self._throttle_reasons:
+            return self.degraded_fps
+        return self.low_power_fps if self._low_power else self.base_fps
+
+    def _fps_floor(self) -> int:
+        return min(self.degraded_fps, self._fps_ceiling())
+
     def set_low_power(self, enabled: bool):
-        self.fps = 12 if enabled else self.base_fps
+        self._low_power = enabled
+        self.fps = min(self.fps, self._fps_ceiling())
+
+    def throttle(self, reason: str, enabled: bool):
+        if enabled:
+            self._throttle_reasons.add(reason)
+            self.fps = min(self.fps, self._fps_ceiling())
+        else:
+            self._throttle_reasons.discard(reason)
+
+    def pause(self, reason: str):
+        if reason in self._pause_reasons:
+            return
+        self._pause_reasons.add(reason)
+        self._cancel_tick()
+
+    def resume(self, reason: str):
+        if reason not in self._pause_reasons:
+            return
+        self._pause_reasons.discard(reason)
+        if self.running and not self._pause_reasons and self._after_id is None:
+            # Restart slowly and let _adapt ramp back up instead of jumping to full rate.
+            self._last_tick = time.perf_counter()
+            self.fps = self._fps_floor()
+            self._tick()
 
     def start(self):
         if self.running:
             return
         self.running = True
         self.reset()
-        self._tick()
+        if not self._pause_reasons:
+            self._tick()
 
     def stop(self):
         self.running = False
+        self._cancel_tick()
+        self.canvas.delete("matrix")
+
+    def _cancel_tick(self):
         if self._after_id:
             try:
                 self.canvas.after_cancel(self._after_id)
             except Exception:
                 pass
         self._after_id = None
-        self.canvas.delete("matrix")
 
     def _adapt(self):
-        if self.avg_dt_ms > 70:
+        ceiling = self._fps_ceiling()
+        late_ms = self.avg_dt_ms - (1000.0 / max(1, self.fps))
+        if late_ms > 25:
             self._skip_mod = min(4, self._skip_mod + 1)
-            self.fps = max(12, self.fps - 1)
-        elif self.avg_dt_ms < 38:
+            self.fps = max(self._fps_floor(), self.fps - 1)
+        elif late_ms < 8:
             self._skip_mod = max(2, self._skip_mod - 1)
-            self.fps = min(self.base_fps, self.fps + 1)
+            self.fps = min(ceiling, self.fps + 1)
+        self.fps = min(self.fps, ceiling)
 
     def _tick(self):
-        if not self.running:
+        self._after_id = None
+        if not self.running or self._pause_reasons:
             return
 
         now = time.perf_counter()
@@ -271,3 +611,240 @@ class MatrixRain:
 
         self._frame += 1
         self._after_id = self.canvas.after(int(1000 / max(1, self.fps)), self._tick)
+
+
+class MatrixPowerScheduler:
+    def __init__(self, root: tk.Tk, matrix: MatrixRain):
+        self.root = root
+        self.matrix = matrix
+        self.load_ratio: Optional[float] = None
+        self._last_activity = time.monotonic()
+        self._after_id: Optional[str] = None
+        self._focus_after: Optional[str] = None
+
+        root.bind("<Unmap>", self._on_unmap, add="+")
+        root.bind("<Map>", self._on_map, add="+")
+        root.bind("<FocusIn>", self._on_focus_change, add="+")
+        root.bind("<FocusOut>", self._on_focus_change, add="+")
+        root.bind("<Key>", self._on_activity, add="+")
+        root.bind("<Motion>", self._on_activity, add="+")
+        root.bind("<Button>", self._on_activity, add="+")
+        matrix.canvas.bind("<Visibility>", self._on_visibility, add="+")
+
+    def start(self):
+        system_load_ratio()  # prime psutil's cpu_percent baseline
+        self._check()
+
+    def stop(self):
+        for timer in (self._after_id, self._focus_after):
+            try:
+                if timer:
+                    self.root.after_cancel(timer)
+            except Exception:
+                pass
+        self._after_id = None
+        self._focus_after = None
+
+    def _on_unmap(self, evt):
+        if evt.widget is self.root:
+            self.matrix.pause("hidden")
+
+    def _on_map(self, evt):
+        if evt.widget is self.root:
+            self.matrix.resume("hidden")
+
+    def _on_visibility(self, evt):
+        if str(getattr(evt, "state", "")) == "VisibilityFullyObscured":
+            self.matrix.pause("occluded")
+        else:
+            self.matrix.resume("occluded")
+
+    def _on_focus_change(self, _evt=None):
+        # Focus moves between child widgets too; check once the dust settles.
+        if self._focus_after:
+            return
+        self._focus_after = self.root.after(60, self._apply_focus)
+
+    def _apply_focus(self):
+        self._focus_after = None
+        try:
+            focused = self.root.focus_get() is not None
+        except Exception:
+            focused = True
+        self.matrix.throttle("unfocused", not focused)
+
+    def _on_activity(self, _evt=None):
+        self._last_activity = time.monotonic()
+        self.matrix.throttle("idle", False)
+
+    def _check(self):
+        idle = (time.monotonic() - self._last_activity) > MATRIX_IDLE_SECONDS
+        self.matrix.throttle("idle", idle)
+
+        self.load_ratio = system_load_ratio()
+        if self.load_ratio is not None:
+            if self.load_ratio >= MATRIX_LOAD_PAUSE_RATIO:
+                self.matrix.pause("load")
+            elif self.load_ratio <= MATRIX_LOAD_RESUME_RATIO:
+                self.matrix.resume("load")
+
+        self._after_id = self.root.after(MATRIX_POWER_CHECK_MS, self._check)
+
+
+class DiagnosticsWindow(tk.Toplevel):
+    # Dev-mode memory/leak panel. The app supplies report(), which renders its own counters;
+    # this window adds the RSS graph, tracemalloc controls and snapshot diffing.
+    # Auto-refresh only redraws cheap counters; snapshots are taken on request, off the Tk thread.
+    def __init__(self, master: tk.Misc, report: Callable[[], str], *, on_destroy: Optional[Callable[[], None]] = None):
+        super().__init__(master, bg=THEME["bg"])
+        self.title("Diagnostics")
+        self.geometry("900x700")
+        self.report = report
+        self.on_destroy = on_destroy
+        self.baseline = None
+        self.snapshot_lines: list[str] = []
+        self._after_id: Optional[str] = None
+        self._job: Optional[threading.Thread] = None
+        self._job_result: Optional[list[str]] = None
+
+        bar = tk.Frame(self, bg=THEME["panel_bg"])
+        bar.pack(fill=tk.X)
+        self.trace_btn = ttk.Button(bar, command=self._toggle_tracemalloc)
+        self.trace_btn.pack(side=tk.LEFT, padx=(8, 0), pady=6)
+        ttk.Button(bar, text="Snapshot", command=self._snapshot).pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Button(bar, text="Diff vs snapshot", command=self._diff).pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Button(bar, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=(6, 0))
+        self.rss_label = tk.StringVar(value="RSS -")
+        tk.Label(bar, textvariable=self.rss_label, bg=THEME["panel_bg"], fg=THEME["green_dim"], font=("Consolas", 10)).pack(
+            side=tk.RIGHT, padx=8
+        )
+
+        self.graph = tk.Canvas(self, height=90, bg=THEME["bg"], highlightthickness=1, highlightbackground=THEME["border"])
+        self.graph.pack(fill=tk.X, padx=8, pady=(6, 0))
+
+        self.text = tk.Text(
+            self,
+            wrap=tk.NONE,
+            font=("Consolas", 10),
+            bg=THEME["bg"],
+            fg=THEME["green"],
+            highlightthickness=1,
+            highlightbackground=THEME["border"],
+            padx=8,
+            pady=8,
+            undo=False,
+        )
+        self.text.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.text.config(state=tk.DISABLED)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def close(self):
+        if self._after_id:
+            try:
+                self.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self.baseline = None
+        if self.on_destroy is not None:
+            self.on_destroy()
+        self.destroy()
+
+    def _toggle_tracemalloc(self):
+        if tracemalloc_running():
+            stop_tracemalloc()
+            self.baseline = None
+            self.snapshot_lines = []
+        else:
+            start_tracemalloc()
+        self.refresh()
+
+    def _snapshot(self):
+        start_tracemalloc()
+
+        def job() -> list[str]:
+            snap = take_snapshot()
+            self.baseline = snap
+            return ["Top allocators at snapshot (size, count, where)"] + [f"  {line}" for line in top_allocators(snap)]
+
+        self._start_job("snapshot", job)
+
+    def _diff(self):
+        baseline = self.baseline
+        if baseline is None or not tracemalloc_running():
+            self.snapshot_lines = ["(take a snapshot first)"]
+            self.refresh()
+            return
+
+        def job() -> list[str]:
+            current = take_snapshot()
+            lines = ["Diff vs snapshot (size, count, where)"]
+            lines += [f"  {line}" for line in snapshot_diff(baseline, current)] or ["  (no change)"]
+            lines.append("Top allocators now (size, count, where)")
+            lines += [f"  {line}" for line in top_allocators(current)]
+            return lines
+
+        self._start_job("diff", job)
+
+    def _start_job(self, label: str, job: Callable[[], list[str]]):
+        # A snapshot of a large heap can take a long time; refresh() picks the result up when it lands.
+        if self._job is not None and self._job.is_alive():
+            return
+        self.snapshot_lines = [f"({label} in progress...)"]
+        self._job_result = None
+
+        def run():
+            try:
+                result = job()
+            except Exception as e:
+                result = [f"({label} failed: {e})"]
+            self._job_result = result
+
+        self._job = threading.Thread(target=run, name="diag-snapshot", daemon=True)
+        self._job.start()
+        self.refresh()
+
+    def refresh(self):
+        if self._after_id:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        if self._job_result is not None:
+            self.snapshot_lines, self._job_result = self._job_result, None
+        self.trace_btn.config(text="Stop tracemalloc" if tracemalloc_running() else "Start tracemalloc")
+        self._draw_graph()
+
+        body = self.report() + "\n" + tracemalloc_summary() + "\n"
+        if self.snapshot_lines:
+            body += "\n".join(self.snapshot_lines) + "\n"
+        top = self.text.yview()[0]
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", body)
+        self.text.config(state=tk.DISABLED)
+        self.text.yview_moveto(top)
+
+        self._after_id = self.after(DIAG_REFRESH_MS, self.refresh)
+
+    def _draw_graph(self):
+        # Samples come from the app's fixed-interval sampler; drawing never adds one.
+        samples = list(rss_history.samples)
+        self.graph.delete("all")
+        if not samples:
+            return
+        values = [rss for _, rss in samples]
+        lo, hi = min(values), max(values)
+        growth = rss_history.growth_per_hour()
+        growth_txt = f", {'+' if growth >= 0 else '-'}{fmt_size(abs(growth))}/h" if growth is not None else ""
+        self.rss_label.set(f"RSS {fmt_size(values[-1])} (min {fmt_size(lo)}, max {fmt_size(hi)}{growth_txt})")
+        if len(values) < 2:
+            return
+        w = max(2, self.graph.winfo_width() - 4)
+        h = max(2, int(self.graph.cget("height")) - 8)
+        span = max(1, hi - lo)
+        points: list[float] = []
+        for i, v in enumerate(values):
+            points.append(2 + i * w / (len(values) - 1))
+            points.append(4 + h - (v - lo) * h / span)
+        self.graph.create_line(*points, fill=THEME["green"])
@@ -8,19 +8,20 @@ import re
 import subprocess
 import sys
 import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
-log = logging.getLogger("thelocalai")
+from .runtime import optional_import
+from .tracing import record_span
 
-try:
-    import numpy as np  # type: ignore
-except Exception:
-    np = None  # type: ignore
+log = logging.getLogger("thelocalai")
 
 
 class TTS:
-    def __init__(self):
+    def __init__(self, *, record: Callable[..., None] = record_span):
+        # The voice process passes a recorder that forwards spans to the app.
+        self.record = record
         self.q: "queue.Queue[str]" = queue.Queue()
         self._stop = threading.Event()
         self._thread = threading.Thread(target=self._worker, daemon=True)
@@ -74,8 +75,10 @@ class TTS:
             if not text:
                 continue
             try:
+                started = time.perf_counter()
                 if not self._speak_once(text):
                     log.warning("TTS: no backend succeeded for this utterance.")
+                self.record("tts.speak", (time.perf_counter() - started) * 1000.0, chars=len(text))
             except Exception:
                 log.exception("TTS: speak failed")
 
@@ -131,9 +134,11 @@ class TTS:
 
 
 class SpeechToText:
-    def __init__(self, model_dir: Path, *, sample_rate: int = 16000):
+    def __init__(self, model_dir: Path, *, sample_rate: int = 16000, on_text: Optional[Callable[[str], None]] = None):
         self.sample_rate = sample_rate
         self.model_dir = model_dir
+        # When set, recognized text is pushed to the caller instead of waiting in in_q.
+        self.on_text = on_text
 
         self.enabled = False
         self.listening = False
@@ -146,7 +151,7 @@ class SpeechToText:
 
     def _init_vosk(self) -> None:
         try:
-            if np is None:
+            if optional_import("numpy") is None:
                 raise RuntimeError("numpy not installed (required for mic audio conversion)")
 
             from vosk import KaldiRecognizer, Model  # type: ignore
@@ -170,6 +175,7 @@ class SpeechToText:
             return True
 
         try:
+            import numpy as np  # type: ignore
             import sounddevice as sd  # type: ignore
 
             def callback(indata, frames, time_info, status):
@@ -182,7 +188,9 @@ class SpeechToText:
                     try:
                         obj = json.loads(self._rec.Result())
                         text = (obj.get("text") or "").strip()
-                        if text:
+                        if text and self.on_text is not None:
+                            self.on_text(text)
+                        elif text:
                             self.in_q.put(text)
                     except Exception:
                         pass
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+from .config import VOICE_PROCESS_TIMEOUT, VOICE_SUBPROCESS
+from .tracing import record_span
+from .voice import TTS, SpeechToText
+
+log = logging.getLogger("thelocalai")
+
+# Messages are tuples over a multiprocessing Pipe.
+#   app -> worker: ("speak", text) | ("listen", req_id, model_dir, sample_rate) | ("unlisten",) | ("shutdown",)
+#   worker -> app: ("reply", req_id, value) | ("stt", text) | ("span", name, ms, attrs)
+
+
+def _worker_main(conn) -> None:
+    # Runs in the voice process: owns the TTS engine, the recognizer and the mic stream.
+    send_lock = threading.Lock()
+
+    def send(msg: tuple) -> None:
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (OSError, EOFError, BrokenPipeError):
+                pass
+
+    tts = TTS(record=lambda name, ms, **attrs: send(("span", name, ms, attrs)))
+    stt: Optional[SpeechToText] = None
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            break
+        op = msg[0]
+        if op == "speak":
+            tts.speak(msg[1])
+        elif op == "listen":
+            _, req_id, model_dir, sample_rate = msg
+            if stt is None:
+                stt = SpeechToText(Path(model_dir), sample_rate=sample_rate, on_text=lambda text: send(("stt", text)))
+            send(("reply", req_id, {"enabled": stt.enabled, "listening": stt.enabled and stt.start_listening()}))
+        elif op == "unlisten":
+            if stt is not None:
+                stt.stop_listening()
+        elif op == "shutdown":
+            break
+    if stt is not None:
+        stt.stop_listening()
+    tts.shutdown()
+
+
+class VoiceProcess:
+    # Parent-side handle. The process is started on first use and again after a crash, so a
+    # misbehaving audio backend costs a restart instead of the app.
+    def __init__(self):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._proc = None
+        self._conn = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self.on_text: Optional[Callable[[str], None]] = None
+        self.on_exit: Optional[Callable[[int], None]] = None
+        self.restarts = 0
+
+    def _ensure(self):
+        if self._proc is not None and self._proc.is_alive():
+            return self._conn
+        if self._proc is not None:
+            self.restarts += 1
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child,), name="thelocalai-voice", daemon=True)
+        proc.start()
+        child.close()
+        self._proc, self._conn = proc, parent
+        threading.Thread(target=self._reader, args=(proc, parent), name="voice-reader", daemon=True).start()
+        log.info("Voice process started (pid %s)", proc.pid)
+        return parent
+
+    def send(self, msg: tuple, *, start: bool = True) -> bool:
+        with self._lock:
+            if not start and (self._proc is None or not self._proc.is_alive()):
+                return False
+            try:
+                self._ensure().send(msg)
+                return True
+            except (OSError, EOFError, BrokenPipeError) as e:
+                log.warning("Voice process unreachable: %s", e)
+                return False
+
+    def request(self, op: str, *args, timeout: float = VOICE_PROCESS_TIMEOUT):
+        req_id = next(self._ids)
+        fut: Future = Future()
+        self._pending[req_id] = fut
+        try:
+            if not self.send((op, req_id) + args):
+                return None
+            return fut.result(timeout=timeout)
+        except Exception as e:
+            log.warning("Voice process did not answer %s: %s", op, e)
+            return None
+        finally:
+            self._pending.pop(req_id, None)
+
+    def _reader(self, proc, conn) -> None:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            op = msg[0]
+            if op == "reply":
+                fut = self._pending.get(msg[1])
+                if fut is not None and not fut.done():
+                    fut.set_result(msg[2])
+            elif op == "stt" and self.on_text is not None:
+                self.on_text(msg[1])
+            elif op == "span":
+                record_span(msg[1], msg[2], **msg[3])
+        for fut in list(self._pending.values()):
+            if not fut.done():
+                fut.set_exception(RuntimeError("voice process exited"))
+        proc.join(timeout=1.0)
+        with self._lock:
+            current = proc is self._proc
+        if current and proc.exitcode not in (0, None):
+            log.warning("Voice process exited with code %s", proc.exitcode)
+            if self.on_exit is not None:
+                self.on_exit(proc.exitcode)
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        with self._lock:
+            proc, conn = self._proc, self._conn
+            self._proc = self._conn = None
+        if proc is None:
+            return
+        try:
+            conn.send(("shutdown",))
+        except (OSError, EOFError, BrokenPipeError):
+            pass
+        proc.join(timeout)
+        if proc.is_alive():
+            # A backend stuck in runAndWait or a driver call: don't let it hold up exit.
+            proc.terminate()
+            proc.join(timeout)
+        conn.close()
+
+
+class TTSProxy:
+    # Same surface as voice.TTS; utterances are spoken by the voice process.
+    def __init__(self, process: VoiceProcess):
+        self.process = process
+
+    def speak(self, text: str) -> None:
+        text = (text or "").strip()
+        if text:
+            self.process.send(("speak", text))
+
+    def shutdown(self) -> None:
+        self.process.shutdown()
+
+
+class SpeechToTextProxy:
+    # Same surface as voice.SpeechToText; recognition runs in the voice process and text comes
+    # back through on_text. Vosk availability is only known once the process has tried to load it.
+    def __init__(self, process: VoiceProcess, model_dir: Path, *, sample_rate: int = 16000, on_text: Optional[Callable[[str], None]] = None):
+        self.process = process
+        self.model_dir = model_dir
+        self.sample_rate = sample_rate
+        self.enabled = True
+        self.listening = False
+        process.on_text = on_text
+
+    def start_listening(self) -> bool:
+        if self.listening:
+            return True
+        res = self.process.request("listen", str(self.model_dir), self.sample_rate)
+        if res is None:
+            return False
+        self.enabled = bool(res["enabled"])
+        self.listening = bool(res["listening"])
+        return self.listening
+
+    def stop_listening(self) -> None:
+        self.listening = False
+        self.process.send(("unlisten",), start=False)
+
+
+_process: Optional[VoiceProcess] = None
+_process_lock = threading.Lock()
+
+
+def voice_process() -> VoiceProcess:
+    global _process
+    with _process_lock:
+        if _process is None:
+            _process = VoiceProcess()
+        return _process
+
+
+def shutdown_voice_process() -> None:
+    with _process_lock:
+        proc = _process
+    if proc is not None:
+        proc.shutdown()
+
+
+def make_tts() -> Union[TTS, TTSProxy]:
+    return TTSProxy(voice_process()) if VOICE_SUBPROCESS else TTS()
+
+
+def make_stt(model_dir: Path, on_text: Callable[[str], None]) -> Union[SpeechToText, SpeechToTextProxy]:
+    if VOICE_SUBPROCESS:
+        return SpeechToTextProxy(voice_process(), model_dir, on_text=on_text)
+    return SpeechToText(model_dir, on_text=on_text)